@@ -0,0 +1,42 @@
+"""Added dirty_cell table
+
+Revision ID: 0f6b2d8e4a19
+Revises: e3a1f0b7c9d2
+Create Date: 2026-10-18 16:27:54.903127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0f6b2d8e4a19'
+down_revision = 'e3a1f0b7c9d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dirty_cell',
+        sa.Column('iteration_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('top_resource_group_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['iteration_id'], ['resource_allocator.iteration.id'], ),
+        sa.ForeignKeyConstraint(
+            ['top_resource_group_id'], ['resource_allocator.resource_group.id'],
+        ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'iteration_id', 'date', 'top_resource_group_id',
+            name='dirty_cell_iteration_id_date_top_resource_group_id_key',
+        ),
+        schema='resource_allocator'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dirty_cell', schema='resource_allocator')
@@ -0,0 +1,35 @@
+"""Added user_last_write table
+
+Revision ID: 4e8b1c6d9a27
+Revises: c41d8a7f2e60
+Create Date: 2026-10-19 10:14:52.630915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8b1c6d9a27'
+down_revision = 'c41d8a7f2e60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_last_write',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('last_write_time', sa.DateTime(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['resource_allocator.user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id'),
+        schema='resource_allocator'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_last_write', schema='resource_allocator')
@@ -0,0 +1,28 @@
+"""Added allocation_job.time_budget_ms
+
+Revision ID: 5b7c9e1d2f04
+Revises: 8d4e2f61a7c3
+Create Date: 2026-10-18 13:41:07.552910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7c9e1d2f04'
+down_revision = '8d4e2f61a7c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'allocation_job',
+        sa.Column('time_budget_ms', sa.Integer(), nullable=True),
+        schema='resource_allocator',
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('allocation_job', 'time_budget_ms', schema='resource_allocator')
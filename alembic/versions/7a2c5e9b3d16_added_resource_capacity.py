@@ -0,0 +1,52 @@
+"""Added resource.capacity and made the allocation resource index non-unique
+
+Revision ID: 7a2c5e9b3d16
+Revises: 0f6b2d8e4a19
+Create Date: 2026-10-18 17:42:11.508316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2c5e9b3d16'
+down_revision = '0f6b2d8e4a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'resource',
+        sa.Column('capacity', sa.Integer(), server_default='1', nullable=False),
+        schema='resource_allocator',
+    )
+    op.drop_constraint(
+        'allocation_iteration_id_date_allocated_resource_id_key',
+        'allocation',
+        schema='resource_allocator',
+        type_='unique',
+    )
+    op.create_index(
+        'ix_allocation_iteration_id_date_allocated_resource_id',
+        'allocation',
+        ['iteration_id', 'date', 'allocated_resource_id'],
+        unique=False,
+        schema='resource_allocator',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_allocation_iteration_id_date_allocated_resource_id',
+        table_name='allocation',
+        schema='resource_allocator',
+    )
+    op.create_unique_constraint(
+        'allocation_iteration_id_date_allocated_resource_id_key',
+        'allocation',
+        ['iteration_id', 'date', 'allocated_resource_id'],
+        schema='resource_allocator',
+    )
+    op.drop_column('resource', 'capacity', schema='resource_allocator')
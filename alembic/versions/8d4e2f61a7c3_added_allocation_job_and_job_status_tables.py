@@ -0,0 +1,81 @@
+"""Added allocation_job and job_status tables
+
+Revision ID: 8d4e2f61a7c3
+Revises: 31c436b2a62c
+Create Date: 2026-10-18 10:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e2f61a7c3'
+down_revision = '31c436b2a62c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job_status',
+        sa.Column('job_status', sa.String(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_status'),
+        schema='resource_allocator'
+    )
+    status_table = sa.Table(
+        "job_status", sa.MetaData(), schema="resource_allocator", autoload_with=op.get_bind(),
+    )
+    op.bulk_insert(
+        status_table,
+        [
+            {"job_status": "Queued"},
+            {"job_status": "Running"},
+            {"job_status": "Completed"},
+            {"job_status": "Failed"},
+        ],
+    )
+
+    op.create_table(
+        'allocation_job',
+        sa.Column('iteration_id', sa.Integer(), nullable=False),
+        sa.Column('request_id', sa.Integer(), nullable=True),
+        sa.Column('strategy', sa.String(), server_default='greedy', nullable=False),
+        sa.Column('job_status_id', sa.Integer(), nullable=False),
+        sa.Column('dates_total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('dates_done', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('allocations_made', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('started_time', sa.DateTime(), nullable=True),
+        sa.Column('finished_time', sa.DateTime(), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['iteration_id'], ['resource_allocator.iteration.id'], ),
+        sa.ForeignKeyConstraint(['request_id'], ['resource_allocator.request.id'], ),
+        sa.ForeignKeyConstraint(['job_status_id'], ['resource_allocator.job_status.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        schema='resource_allocator'
+    )
+    op.create_index(
+        op.f('ix_resource_allocator_allocation_job_job_status_id'),
+        'allocation_job',
+        ['job_status_id'],
+        unique=False,
+        schema='resource_allocator',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f('ix_resource_allocator_allocation_job_job_status_id'),
+        table_name='allocation_job',
+        schema='resource_allocator',
+    )
+    op.drop_table('allocation_job', schema='resource_allocator')
+    op.drop_table('job_status', schema='resource_allocator')
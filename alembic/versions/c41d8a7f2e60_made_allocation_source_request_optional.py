@@ -0,0 +1,37 @@
+"""Made allocation.source_request_id optional for allocations made by hand
+
+Revision ID: c41d8a7f2e60
+Revises: 7a2c5e9b3d16
+Create Date: 2026-10-18 19:05:37.214806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d8a7f2e60'
+down_revision = '7a2c5e9b3d16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'allocation',
+        'source_request_id',
+        existing_type=sa.INTEGER(),
+        nullable=True,
+        schema='resource_allocator',
+    )
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM resource_allocator.allocation WHERE source_request_id IS NULL')
+    op.alter_column(
+        'allocation',
+        'source_request_id',
+        existing_type=sa.INTEGER(),
+        nullable=False,
+        schema='resource_allocator',
+    )
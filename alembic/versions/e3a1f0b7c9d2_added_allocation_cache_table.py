@@ -0,0 +1,34 @@
+"""Added allocation_cache table
+
+Revision ID: e3a1f0b7c9d2
+Revises: 5b7c9e1d2f04
+Create Date: 2026-10-18 15:02:33.184519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a1f0b7c9d2'
+down_revision = '5b7c9e1d2f04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'allocation_cache',
+        sa.Column('fingerprint', sa.String(), nullable=False),
+        sa.Column('solution', sa.JSON(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_time', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('fingerprint'),
+        schema='resource_allocator'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('allocation_cache', schema='resource_allocator')
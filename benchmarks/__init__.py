@@ -0,0 +1,3 @@
+"""
+Benchmarks for resource_allocator on synthetic data
+"""
@@ -0,0 +1,231 @@
+"""
+Benchmark of automatic allocation on synthetic data
+
+Generates a data set in a separate schema, runs each phase of an automatic allocation - load, solve
+and persist - and reports wall time, query count and peak traced memory per phase as JSON. The solve
+phase also reports the seconds spent on scoring and on selection.
+A previous report can be given as a baseline to flag regressions. The schema is emptied when done
+
+Usage:
+    python -m benchmarks.allocation --size large --output result.json
+    python -m benchmarks.allocation --size large --baseline result.json
+"""
+
+import argparse
+from contextlib import contextmanager
+import json
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateSchema
+
+from benchmarks.generate import DataSize, generate_data, sizes
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.engine import (
+    build_snapshot,
+    collect_allocations,
+    solve_subproblems,
+    strategies,
+)
+from resource_allocator.managers.allocation import AllocationManager
+from resource_allocator.managers.iteration import IterationManager
+from resource_allocator.models import metadata, populate_enums
+from resource_allocator.utils.db import change_schema
+
+
+phase_names = ["load", "solve", "persist"]
+
+
+@contextmanager
+def measure(engine: Engine, phases: dict, name: str, trace_memory: bool = True):
+    """
+    Record the wall time, number of SQL statements and peak traced memory of a block under
+    phases[name]
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    if trace_memory:
+        tracemalloc.start()
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start_time
+        peak_memory = None
+        if trace_memory:
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        event.remove(engine, "before_cursor_execute", count)
+        phases[name] = {
+            "seconds": seconds,
+            "queries": len(statements),
+            "peak_memory": peak_memory,
+        }
+
+
+def run_benchmark(
+    sess: Session,
+    size: DataSize,
+    strategy: str = "greedy",
+    trace_memory: bool = True,
+) -> dict:
+    """
+    Generate a data set and allocate it phase by phase. Subproblems are solved serially so that
+    the seconds spent on scoring and selection can be told apart. Nothing is committed
+
+    Args:
+        sess: session bound to a schema with empty tables
+        size: size of the data set
+        strategy: name of the selection strategy - one of engine.strategies
+        trace_memory: whether to trace peak memory - tracing slows down every phase
+
+    Returns:
+        dict: report with the parameters, the measurements of each phase and the result
+    """
+    engine = sess.get_bind()
+    phases = dict()
+
+    with measure(engine, phases, "generate", trace_memory=False):
+        iteration_id = generate_data(sess, size)
+
+    with measure(engine, phases, "load", trace_memory):
+        *records, previous = AllocationManager._load_records(iteration_id)
+        snapshot = build_snapshot(*records)
+
+    timings = dict()
+    with measure(engine, phases, "solve", trace_memory):
+        solutions = solve_subproblems(
+            snapshot.topology,
+            snapshot.problems,
+            strategy=strategy,
+            timings=timings,
+            previous=previous,
+        )
+
+    phases["solve"].update({
+        f"{key}_seconds": timings.get(key, 0.0)
+        for key in ("score", "select")
+    })
+
+    with measure(engine, phases, "persist", trace_memory):
+        allocation, declined = collect_allocations(snapshot, solutions)
+        _ = AllocationManager._persist_allocations(iteration_id, allocation, declined)
+        IterationManager.modify_item(iteration_id, {"is_allocated": True})
+
+    return {
+        "parameters": {**size.to_dict(), "strategy": strategy},
+        "phases": phases,
+        "requests": len(snapshot.request_ids),
+        "subproblems": len(snapshot.problems),
+        "allocations": len(allocation),
+        "declined": len(declined),
+        "total_points": sum(item.points for item in allocation),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.2) -> dict:
+    """
+    Compare the phases of a report against a baseline report
+
+    Args:
+        report: result of run_benchmark
+        baseline: earlier result of run_benchmark with the same parameters
+        tolerance: relative increase of seconds or peak memory that counts as a regression. Any
+            increase of the query count is a regression [default: 0.2]
+
+    Returns:
+        dict: per-phase and per-metric baseline, current value and relative change plus a list of
+            "regressions" as "phase.metric" strings
+    """
+    result = {"phases": dict(), "regressions": []}
+    for phase in phase_names:
+        current, previous = report["phases"].get(phase), baseline["phases"].get(phase)
+        if not current or not previous:
+            continue
+
+        result["phases"][phase] = dict()
+        for metric, value in current.items():
+            base = previous.get(metric)
+            if value is None or base is None:
+                continue
+
+            change = (value - base) / base if base else float(value > 0)
+            result["phases"][phase][metric] = {
+                "baseline": base,
+                "current": value,
+                "change": change,
+            }
+            limit = 0 if metric == "queries" else tolerance
+            if change > limit:
+                result["regressions"].append(f"{phase}.{metric}")
+
+    if report["parameters"] != baseline["parameters"]:
+        result["warning"] = "Parameters differ from the baseline"
+
+    return result
+
+
+def main(args: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--size", choices=list(sizes), default="small")
+    parser.add_argument("--users", type=int, help="Override the number of users of --size")
+    parser.add_argument("--desks", type=int, help="Override the number of desks of --size")
+    parser.add_argument("--days", type=int, help="Override the number of days of --size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategy", choices=list(strategies), default="greedy")
+    parser.add_argument("--schema", default="resource_allocator_benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace peak memory")
+    parser.add_argument("--output", help="File to write the JSON report to instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parsed = parser.parse_args(args)
+
+    overrides = {
+        key: value
+        for key in ("users", "desks", "days")
+        if (value := getattr(parsed, key)) is not None
+    }
+    size = DataSize(**{**sizes[parsed.size].to_dict(), **overrides, "seed": parsed.seed})
+
+    Config.from_environment()
+    change_schema(metadata, schema=parsed.schema)
+    sess = get_session()
+    engine = sess.get_bind()
+    with engine.begin() as conn:
+        conn.execute(CreateSchema(parsed.schema, if_not_exists=True))
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        populate_enums(sess)
+        report = run_benchmark(sess, size, parsed.strategy, trace_memory=not parsed.no_memory)
+    finally:
+        sess.rollback()
+        metadata.drop_all(engine)
+
+    if parsed.baseline:
+        with open(parsed.baseline) as file:
+            report["comparison"] = compare(report, json.load(file), parsed.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if parsed.output:
+        with open(parsed.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    return 1 if report.get("comparison", {}).get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
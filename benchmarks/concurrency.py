@@ -0,0 +1,174 @@
+"""
+Concurrent load test of the API
+
+Generates a data set in a separate schema, serves the app on a local port and sends the same GET
+request from several client threads - first to a server that handles one request at a time, then
+to one that handles each request in its own thread with its own session. Reports the requests per
+second of each mode and the speed-up as JSON. A local database answers almost instantly, so
+--latency-ms adds a delay to every statement to stand in for the round trip to a remote one. The
+schema is emptied when done
+
+Usage:
+    python -m benchmarks.concurrency --requests 500 --clients 16 --latency-ms 2
+    python -m benchmarks.concurrency --path /iterations/ --output result.json
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.schema import CreateSchema
+from werkzeug.serving import make_server
+
+from benchmarks.generate import DataSize, generate_data, sizes
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.main import create_app
+from resource_allocator.managers.user import AuthManager
+from resource_allocator.models import metadata, populate_enums
+from resource_allocator.utils.db import change_schema
+
+
+def run_load(
+    app: Flask,
+    path: str,
+    headers: dict[str, str],
+    threaded: bool,
+    requests: int,
+    clients: int,
+) -> dict:
+    """
+    Serve the app on a free local port and send GET requests to path from several client threads
+
+    Args:
+        app: Flask application
+        path: path to request
+        headers: request headers
+        threaded: whether the server handles each request in its own thread
+        requests: total number of requests
+        clients: number of client threads
+
+    Returns:
+        dict: seconds, requests per second and the number of failed requests
+    """
+    server = make_server("127.0.0.1", 0, app, threaded=threaded)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}{path}"
+
+    def send(_) -> bool:
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+                _ = response.read()
+                return response.status == 200
+        except urllib.error.URLError:
+            return False
+
+    try:
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            results = list(executor.map(send, range(requests)))
+
+        seconds = time.perf_counter() - start_time
+    finally:
+        server.shutdown()
+        thread.join()
+
+    return {
+        "seconds": seconds,
+        "requests_per_second": requests / seconds,
+        "errors": results.count(False),
+    }
+
+
+def main(args: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--size", choices=list(sizes), default="small")
+    parser.add_argument("--path", default="/resources/")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Milliseconds added to every statement sent by the server",
+    )
+    parser.add_argument("--schema", default="resource_allocator_benchmark")
+    parser.add_argument("--output", help="File to write the JSON report to instead of stdout")
+    parsed = parser.parse_args(args)
+
+    config = Config.from_environment()
+    change_schema(metadata, schema=parsed.schema)
+    sess = get_session()
+    engine = sess.get_bind()
+    with engine.begin() as conn:
+        conn.execute(CreateSchema(parsed.schema, if_not_exists=True))
+
+    def delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(parsed.latency_ms / 1000)
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        #   Server threads use sessions of their own - the data has to be committed
+        populate_enums(sess)
+        size = DataSize(**{**sizes[parsed.size].to_dict(), "days": 1})
+        _ = generate_data(sess, size)
+        user = AuthManager.register({
+            "email": "load_test@example.com",
+            "password": "password",
+            "first_name": "load",
+            "last_name": "test",
+        })
+        sess.commit()
+        if parsed.latency_ms:
+            event.listen(engine, "before_cursor_execute", delay)
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        app = create_app()
+        headers = {"Authorization": f"Bearer {user['token']}"}
+        modes = {
+            name: run_load(app, parsed.path, headers, threaded, parsed.requests, parsed.clients)
+            for name, threaded in (("single", False), ("threaded", True))
+        }
+    finally:
+        if event.contains(engine, "before_cursor_execute", delay):
+            event.remove(engine, "before_cursor_execute", delay)
+
+        sess.rollback()
+        metadata.drop_all(engine)
+
+    report = {
+        "parameters": {
+            "path": parsed.path,
+            "requests": parsed.requests,
+            "clients": parsed.clients,
+            "latency_ms": parsed.latency_ms,
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+        },
+        "modes": modes,
+        "speedup": (
+            modes["threaded"]["requests_per_second"] / modes["single"]["requests_per_second"]
+        ),
+    }
+    output = json.dumps(report, indent=2)
+    if parsed.output:
+        with open(parsed.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    return 1 if any(mode["errors"] for mode in modes.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Synthetic data generator for allocation benchmarks
+
+Every building is a top-level resource group with floors and zones as nested resource groups. Each
+desk is linked to its floor and its zone through resource_to_group. Users have a home building and
+a favourite desk and request most days of the iteration - some by desk, most by zone and a few by
+floor or building. Favourite desks and zones are skewed so that popular ones are contended
+"""
+
+from dataclasses import asdict, dataclass
+import datetime as dt
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from resource_allocator.models import (
+    IterationModel,
+    RequestModel,
+    RequestStatusEnum,
+    RequestStatusModel,
+    ResourceGroupModel,
+    ResourceModel,
+    ResourceToGroupModel,
+    RoleEnum,
+    RoleModel,
+    UserModel,
+)
+
+
+@dataclass(frozen=True)
+class DataSize:
+    """
+    Size of a synthetic data set
+
+    Properties:
+        users: number of users
+        desks: number of desks
+        days: number of days in the iteration
+        buildings: number of top-level resource groups
+        floors: number of floors per building
+        zones: number of zones per floor
+        attendance: share of days each user requests
+        seed: random seed
+    """
+    users: int
+    desks: int
+    days: int
+    buildings: int = 4
+    floors: int = 3
+    zones: int = 4
+    attendance: float = 0.6
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+sizes = {
+    "small": DataSize(users=500, desks=100, days=5, buildings=2),
+    "medium": DataSize(users=2_000, desks=500, days=10),
+    "large": DataSize(users=10_000, desks=2_000, days=20),
+}
+
+
+def _insert(sess: Session, model: type, rows: list[dict]) -> list[int]:
+    """
+    Insert rows with a single statement and return their ids in order
+    """
+    if not rows:
+        return []
+
+    return list(sess.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        rows,
+    ))
+
+
+def _skewed_choice(rng: np.random.Generator, options: np.ndarray, size: int) -> np.ndarray:
+    """
+    Pick from options with Zipf-like weights - earlier options are picked more often
+    """
+    weights = 1 / np.arange(1, len(options) + 1)
+    return rng.choice(options, size=size, p=weights / weights.sum())
+
+
+def generate_data(sess: Session, size: DataSize) -> int:
+    """
+    Write a synthetic data set to empty tables. The request_status and role tables must already
+    be populated
+
+    Args:
+        sess: session to write with
+        size: size of the data set
+
+    Returns:
+        int: id of the generated iteration
+    """
+    rng = np.random.default_rng(size.seed)
+
+    #   Groups: building -> floors -> zones
+    building_ids = _insert(sess, ResourceGroupModel, [
+        {"name": f"building-{building}", "is_top_level": True}
+        for building in range(size.buildings)
+    ])
+    floors = [
+        (building_id, floor)
+        for building_id in building_ids
+        for floor in range(size.floors)
+    ]
+    floor_ids = _insert(sess, ResourceGroupModel, [
+        {"name": f"floor-{building_id}-{floor}", "top_resource_group_id": building_id}
+        for building_id, floor in floors
+    ])
+    zones = [
+        (floor_id, building_id, zone)
+        for floor_id, (building_id, _) in zip(floor_ids, floors)
+        for zone in range(size.zones)
+    ]
+    zone_ids = _insert(sess, ResourceGroupModel, [
+        {"name": f"zone-{floor_id}-{zone}", "top_resource_group_id": building_id}
+        for floor_id, building_id, zone in zones
+    ])
+
+    #   Desks spread evenly across zones
+    desk_zones = np.arange(size.desks) % len(zone_ids)
+    zone_floors = np.repeat(np.arange(len(floor_ids)), size.zones)
+    floor_buildings = np.repeat(np.arange(len(building_ids)), size.floors)
+    desk_floors = zone_floors[desk_zones]
+    desk_buildings = floor_buildings[desk_floors]
+    desk_ids = np.array(_insert(sess, ResourceModel, [
+        {"name": f"desk-{desk}", "top_resource_group_id": building_ids[building]}
+        for desk, building in enumerate(desk_buildings.tolist())
+    ]))
+    sess.execute(insert(ResourceToGroupModel), [
+        {"resource_id": int(desk_id), "resource_group_id": group_id}
+        for desk_id, floor, zone in zip(desk_ids, desk_floors.tolist(), desk_zones.tolist())
+        for group_id in (floor_ids[floor], zone_ids[zone])
+    ])
+
+    #   Users are external so that no password hashes are computed
+    role_id = sess.scalar(select(RoleModel.id).where(RoleModel.role == RoleEnum.user.value))
+    user_ids = np.array(_insert(sess, UserModel, [
+        {
+            "email": f"user-{user}@example.com",
+            "first_name": "user",
+            "last_name": str(user),
+            "role_id": role_id,
+            "is_external": True,
+        }
+        for user in range(size.users)
+    ]))
+
+    start_date = dt.date(2030, 1, 1)
+    iteration_id = _insert(sess, IterationModel, [{
+        "start_date": start_date,
+        "end_date": start_date + dt.timedelta(days=size.days - 1),
+    }])[0]
+
+    #   Favourite desk in a home building - popular desks first within each building
+    home_buildings = rng.integers(0, len(building_ids), size.users)
+    favourite_desks = np.empty(size.users, dtype=np.int64)
+    for building in range(len(building_ids)):
+        users = np.flatnonzero(home_buildings == building)
+        desks = np.flatnonzero(desk_buildings == building)
+        if not len(desks):
+            desks = np.arange(size.desks)
+        favourite_desks[users] = _skewed_choice(rng, desks, len(users))
+
+    #   Requests: 40% desk, 40% zone, 15% floor, 5% building
+    status_id = sess.scalar(
+        select(RequestStatusModel.id)
+        .where(RequestStatusModel.request_status == RequestStatusEnum.new.value)
+    )
+    attending = rng.random((size.users, size.days)) < size.attendance
+    users, days = np.nonzero(attending)
+    kinds = rng.choice(4, size=len(users), p=[0.4, 0.4, 0.15, 0.05])
+    desks = favourite_desks[users]
+    rows = []
+    for user, day, kind, desk in zip(users.tolist(), days.tolist(), kinds.tolist(), desks.tolist()):
+        target = {"requested_resource_id": None, "requested_resource_group_id": None}
+        if kind == 0:
+            target["requested_resource_id"] = int(desk_ids[desk])
+        elif kind == 1:
+            target["requested_resource_group_id"] = zone_ids[desk_zones[desk]]
+        elif kind == 2:
+            target["requested_resource_group_id"] = floor_ids[desk_floors[desk]]
+        else:
+            target["requested_resource_group_id"] = building_ids[desk_buildings[desk]]
+
+        rows.append({
+            "iteration_id": iteration_id,
+            "requested_date": start_date + dt.timedelta(days=day),
+            "user_id": int(user_ids[user]),
+            "request_status_id": status_id,
+            **target,
+        })
+
+    #   Core insert - the ORM splits batches on rows with None values
+    sess.execute(insert(RequestModel.__table__), rows)
+    sess.flush()
+    return iteration_id
@@ -0,0 +1,202 @@
+"""
+Micro-benchmark of the Python overhead of typical CRUD requests
+
+Creates a few resources in a separate schema and sends GET, POST and PUT requests through the
+Flask test client, so no server or network is involved. The requests are sent from a thread
+without a session of its own, so every request opens and closes its session like it does when
+served. Reports the microseconds and statements per request of each kind and the microseconds per
+get_session call inside an open transaction, which requests make once per manager or validator
+call, as JSON. The schema is emptied when done
+
+Usage:
+    python -m benchmarks.request_overhead --requests 2000
+    python -m benchmarks.request_overhead --output result.json
+"""
+
+import argparse
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import json
+import statistics
+import sys
+import time
+
+from flask import Flask
+from sqlalchemy import event, insert
+from sqlalchemy.schema import CreateSchema
+
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.main import create_app
+from resource_allocator.managers.user import AuthManager
+from resource_allocator.models import (
+    metadata,
+    populate_enums,
+    ResourceGroupModel,
+    ResourceModel,
+)
+from resource_allocator.utils.db import change_schema
+
+
+def time_requests(
+    app: Flask,
+    method: str,
+    path: Callable[[int], str],
+    body: Callable[[int], dict] | None,
+    headers: dict[str, str],
+    requests: int,
+) -> dict:
+    """
+    Send requests through the test client of the app one at a time and time each of them
+
+    Args:
+        app: Flask application
+        method: HTTP method
+        path: path of the i-th request
+        body: JSON body of the i-th request or None to send none
+        headers: request headers
+        requests: number of requests
+
+    Returns:
+        dict: mean and median microseconds per request and the number of failed requests
+    """
+    client = app.test_client()
+    seconds = []
+    errors = 0
+    for i in range(requests):
+        kwargs = {"headers": headers}
+        if body is not None:
+            kwargs["json"] = body(i)
+
+        start_time = time.perf_counter()
+        response = client.open(path(i), method=method, **kwargs)
+        seconds.append(time.perf_counter() - start_time)
+        errors += response.status_code >= 400
+
+    return {
+        "mean_us": statistics.fmean(seconds) * 1e6,
+        "median_us": statistics.median(seconds) * 1e6,
+        "errors": errors,
+    }
+
+
+def time_get_session(calls: int) -> float:
+    """
+    Time get_session calls on a session with an open transaction
+
+    Args:
+        calls: number of calls
+
+    Returns:
+        float: mean microseconds per call
+    """
+    sess = get_session()
+    _ = sess.connection()
+    start_time = time.perf_counter()
+    for _ in range(calls):
+        _ = get_session()
+
+    seconds = time.perf_counter() - start_time
+    sess.rollback()
+    return seconds / calls * 1e6
+
+
+def main(args: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--resources", type=int, default=50)
+    parser.add_argument("--schema", default="resource_allocator_benchmark")
+    parser.add_argument("--output", help="File to write the JSON report to instead of stdout")
+    parsed = parser.parse_args(args)
+
+    _ = Config.from_environment()
+    change_schema(metadata, schema=parsed.schema)
+    sess = get_session()
+    engine = sess.get_bind()
+    with engine.begin() as conn:
+        conn.execute(CreateSchema(parsed.schema, if_not_exists=True))
+
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        #   The requests use sessions of their own - the data has to be committed. The first
+        #   registered user is an admin
+        populate_enums(sess)
+        user = AuthManager.register({
+            "email": "overhead@example.com",
+            "password": "password",
+            "first_name": "request",
+            "last_name": "overhead",
+        })
+        group_id = sess.scalar(
+            insert(ResourceGroupModel)
+            .values(name="building", is_top_level=True)
+            .returning(ResourceGroupModel.id)
+        )
+        resource_ids = sess.scalars(
+            insert(ResourceModel).returning(ResourceModel.id),
+            [
+                {"name": f"desk-{i}", "top_resource_group_id": group_id}
+                for i in range(parsed.resources)
+            ],
+        ).all()
+        sess.commit()
+
+        app = create_app()
+        headers = {"Authorization": f"Bearer {user['token']}"}
+        kinds = {
+            "get": ("GET", lambda i: f"/resources/{resource_ids[i % len(resource_ids)]}", None),
+            "post": ("POST", lambda i: "/resource_groups/", lambda i: {
+                "name": f"group-{i}",
+                "is_top_level": True,
+            }),
+            "put": (
+                "PUT",
+                lambda i: f"/resources/{resource_ids[i % len(resource_ids)]}",
+                lambda i: {"name": f"renamed-desk-{i}"},
+            ),
+        }
+        event.listen(engine, "before_cursor_execute", count)
+        results = {}
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for name, (method, path, body) in kinds.items():
+                statements = 0
+                results[name] = executor.submit(
+                    time_requests, app, method, path, body, headers, parsed.requests,
+                ).result()
+                results[name]["statements_per_request"] = statements / parsed.requests
+
+        get_session_us = time_get_session(parsed.requests * 100)
+    finally:
+        if event.contains(engine, "before_cursor_execute", count):
+            event.remove(engine, "before_cursor_execute", count)
+
+        sess.rollback()
+        metadata.drop_all(engine)
+
+    report = {
+        "parameters": {
+            "requests": parsed.requests,
+            "resources": parsed.resources,
+        },
+        "kinds": results,
+        "get_session_us": get_session_us,
+    }
+    output = json.dumps(report, indent=2)
+    if parsed.output:
+        with open(parsed.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    return 1 if any(result["errors"] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
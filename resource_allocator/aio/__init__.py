@@ -0,0 +1,3 @@
+"""
+Async data layer and ASGI entry point. Requires the async extra
+"""
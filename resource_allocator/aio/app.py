@@ -0,0 +1,230 @@
+"""
+ASGI entry point
+
+Serves the read endpoints of the API on async managers, so a single process can keep many polling
+clients waiting on the database at once, and hands every other request to the Flask app of
+create_app, which runs in a thread pool. Requires the async extra:
+
+    uvicorn --factory resource_allocator.aio.app:create_asgi_app
+"""
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import json
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+from resource_allocator.aio.db import (
+    dispose_async_engine,
+    get_async_session,
+    remove_async_session,
+)
+from resource_allocator.aio.managers import (
+    AsyncAllocationJobManager,
+    AsyncAllocationManager,
+    AsyncBaseManager,
+    AsyncImageManager,
+    AsyncImagePropertiesManager,
+    AsyncIterationManager,
+    AsyncRequestManager,
+    AsyncResourceGroupManager,
+    AsyncResourceManager,
+    AsyncResourceToGroupManager,
+    AsyncUserManager,
+)
+from resource_allocator.config import Config
+from resource_allocator.main import create_app, cors_headers, origin_error
+from resource_allocator.resources import (
+    AllocationResource,
+    ImagePropertiesResource,
+    ImageResource,
+    IterationResource,
+    RequestResource,
+    ResourceGroupResource,
+    ResourceResource,
+    ResourceToGroupResource,
+    UserResource,
+)
+from resource_allocator.resources.allocation import AllocationJobResource
+from resource_allocator.resources.base import BaseResource
+from resource_allocator.utils.auth import bearer_token, token_user_id
+
+
+ASGIApp = Callable[[dict, Callable[[], Awaitable[dict]], Callable[[dict], Awaitable[None]]], None]
+
+
+@dataclass(frozen=True)
+class ReadRoute:
+    """
+    Read endpoint served on an async manager
+
+    Properties:
+        manager: async manager to read items with
+        resource: Flask resource of the endpoint. Its read roles, 404 handling and response schema
+            are used as they are
+        me: whether the endpoint reads the authenticated user rather than an item by id
+            [default: False]
+    """
+    manager: type[AsyncBaseManager]
+    resource: BaseResource
+    me: bool = False
+
+
+read_routes = (
+    (ReadRoute(AsyncUserManager, UserResource()), "/users/", "/users/<int:id>"),
+    (ReadRoute(AsyncUserManager, UserResource(), me=True), "/users/me"),
+    (ReadRoute(AsyncResourceManager, ResourceResource()), "/resources/", "/resources/<int:id>"),
+    (
+        ReadRoute(AsyncResourceGroupManager, ResourceGroupResource()),
+        "/resource_groups/", "/resource_groups/<int:id>",
+    ),
+    (
+        ReadRoute(AsyncResourceToGroupManager, ResourceToGroupResource()),
+        "/resource_to_group/", "/resource_to_group/<int:id>",
+    ),
+    (ReadRoute(AsyncImageManager, ImageResource()), "/images/", "/images/<int:id>"),
+    (
+        ReadRoute(AsyncImagePropertiesManager, ImagePropertiesResource()),
+        "/image_properties/", "/image_properties/<int:id>",
+    ),
+    (ReadRoute(AsyncIterationManager, IterationResource()), "/iterations/", "/iterations/<int:id>"),
+    (ReadRoute(AsyncRequestManager, RequestResource()), "/requests/", "/requests/<int:id>"),
+    (
+        ReadRoute(AsyncAllocationManager, AllocationResource()),
+        "/allocation/", "/allocation/<int:id>",
+    ),
+    (
+        ReadRoute(AsyncAllocationJobManager, AllocationJobResource()),
+        "/allocation/jobs/", "/allocation/jobs/<int:id>",
+    ),
+)
+
+
+async def read(route: ReadRoute, headers: dict[str, str], id: int | None) -> tuple:
+    """
+    Authenticate a request and read items the way the get method of the route's resource does.
+    The user is found with the token helpers of verify_token and, like in the Flask app, reads
+    go to a replica unless the user wrote within DB_REPLICA_STICKINESS seconds
+
+    Args:
+        route: matched read route
+        headers: request headers with lower-case names
+        id: identifier of the item to read; all items if None
+
+    Returns:
+        tuple of the status code, the response body and extra response headers
+    """
+    config = Config.get_instance()
+    token = bearer_token(headers.get("authorization"))
+    user_id = None if token is None else token_user_id(token, secret=config.SECRET)
+    user = None
+    if user_id is not None:
+        if config.DB_REPLICA_URLS:
+            get_async_session().sync_session.use_replica = not await (
+                AsyncUserManager.wrote_recently(user_id, config.DB_REPLICA_STICKINESS)
+            )
+
+        user = await AsyncUserManager.list_single_item(user_id)
+
+    if user is None:
+        return 401, "Unauthorized Access", [
+            ("WWW-Authenticate", 'Bearer realm="Authentication Required"'),
+        ]
+
+    if route.me:
+        id = user.id
+
+    try:
+        route.resource.authorize_read(await AsyncUserManager.get_role(user))
+        if id is None:
+            result = await route.manager.list_all_items()
+        else:
+            result = await route.manager.list_single_item(id)
+
+        return 200, route.resource.dump_read(result, id), []
+    except HTTPException as error:
+        return error.code, {"message": error.description}, []
+
+
+def create_asgi_app() -> ASGIApp:
+    """
+    ASGI app factory: read routes are served on async managers, everything else by the Flask app
+    of create_app in a thread pool no larger than the connection pool
+
+    Args:
+        None
+
+    Returns:
+        ASGI application
+    """
+    config = Config.from_environment()
+    flask_app = WSGIMiddleware(
+        create_app(),
+        workers=config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW,
+    )
+    url_map = Map([
+        Rule(path, endpoint=route, methods=["GET"])
+        for route, *paths in read_routes
+        for path in paths
+    ]).bind("localhost")
+
+    async def lifespan(receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await dispose_async_engine()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def app(scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            return await lifespan(receive, send)
+
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await flask_app(scope, receive, send)
+
+        headers = {
+            key.decode("latin-1").lower(): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        origin = headers.get("origin")
+        try:
+            route, args = url_map.match(scope["path"], method="GET")
+        except HTTPException:
+            route = None
+
+        #   Unknown paths, redirects and rejected origins get the responses of the Flask app
+        if route is None or origin_error(origin, config) is not None:
+            return await flask_app(scope, receive, send)
+
+        try:
+            status, body, extra_headers = await read(route, headers, args.get("id"))
+        finally:
+            await remove_async_session()
+
+        if isinstance(body, str):
+            content_type, content = "text/html; charset=utf-8", body.encode()
+        else:
+            content_type, content = "application/json", (json.dumps(body) + "\n").encode()
+
+        response_headers = [
+            ("Content-Type", content_type),
+            ("Content-Length", str(len(content))),
+            *extra_headers,
+            *cors_headers(origin, config),
+        ]
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (key.encode("latin-1"), value.encode("latin-1"))
+                for key, value in response_headers
+            ],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+    return app
@@ -0,0 +1,94 @@
+"""
+Async database configuration module - the asyncio counterpart of resource_allocator.db. Requires
+the async extra (asyncpg)
+"""
+
+import asyncio
+
+import sqlalchemy as db
+from sqlalchemy.ext import asyncio as db_async
+
+from resource_allocator.config import Config
+from resource_allocator.db import RoutingSession
+
+
+def create_async_engine(
+    config: Config,
+    echo: bool = False,
+    url: str | db.URL | None = None,
+) -> db_async.AsyncEngine:
+    """
+    Create an async engine on the asyncpg driver with a connection pool sized by the
+    configuration
+
+    Args:
+        config: active Config object
+        echo: whether to log all statements [default: False]
+        url: database to connect to instead of the primary one of the configuration, e.g. a
+            replica. Its driver is replaced by asyncpg [default: None]
+
+    Returns:
+        sqlalchemy.ext.asyncio.AsyncEngine
+    """
+    return db_async.create_async_engine(
+        db.make_url(url).set(drivername="postgresql+asyncpg") if url else config.ASYNC_URL,
+        echo=echo,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+
+def get_async_session(echo: bool = False) -> db_async.AsyncSession:
+    """
+    Async session of the current task. A scoped session registry is created on first use and
+    injected into an active Config object, so each task works on a session of its own while
+    sharing the connection pool. Sessions wrap RoutingSessions that can read from the replicas in
+    DB_REPLICA_URLS
+    """
+    config = Config.get_instance()
+    if config._async_sess is None:
+        engine = create_async_engine(config, echo=echo)
+        replicas = [
+            create_async_engine(config, echo=echo, url=url) for url in config.DB_REPLICA_URLS
+        ]
+        config._async_sess = db_async.async_scoped_session(
+            db_async.async_sessionmaker(
+                bind=engine,
+                expire_on_commit=False,
+                sync_session_class=RoutingSession,
+                replicas=[replica.sync_engine for replica in replicas],
+            ),
+            scopefunc=asyncio.current_task,
+        )
+
+    return config._async_sess()
+
+
+async def remove_async_session() -> None:
+    """
+    Close the async session of the current task, if any, and return its connection to the pool
+    """
+    config = Config.get_instance()
+    if config._async_sess is not None:
+        await config._async_sess.remove()
+
+
+async def dispose_async_engine() -> None:
+    """
+    Close the async sessions of all tasks and the pooled connections and drop the session
+    registry. Connections belong to the event loop that opened them, so this has to be awaited
+    before the loop is closed
+    """
+    config = Config.get_instance()
+    if config._async_sess is None:
+        return
+
+    await db_async.close_all_sessions()
+    factory_kw = config._async_sess.session_factory.kw
+    await factory_kw["bind"].dispose()
+    for replica in factory_kw["replicas"]:
+        await db_async.AsyncEngine(replica).dispose()
+
+    config._async_sess = None
@@ -0,0 +1,131 @@
+"""
+Async managers - read operations of the managers on an AsyncSession for the read endpoints of the
+ASGI app. Writes stay with the synchronous managers
+"""
+
+import base64
+
+import sqlalchemy as db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from resource_allocator.aio.db import get_async_session
+from resource_allocator.managers.user import UserManager
+from resource_allocator.models import (
+    AllocationJobModel,
+    AllocationModel,
+    ImageModel,
+    ImagePropertiesModel,
+    IterationModel,
+    RequestModel,
+    ResourceGroupModel,
+    ResourceModel,
+    ResourceToGroupModel,
+    RoleModel,
+    UserModel,
+)
+
+
+class AsyncBaseManager:
+    """
+    Async counterpart of BaseManager's read operations. Lazy loading is not available on an
+    AsyncSession, so relationships read by a response schema have to be listed in "options"
+
+    Properties:
+        model: sqlalchemy ORM table
+        options: loader options applied to every query [default: ()]
+    """
+    @classmethod
+    @property
+    def sess(cls) -> AsyncSession:
+        return get_async_session()
+
+    model: db.Table
+    options: tuple = ()
+
+    @classmethod
+    async def list_single_item(cls, id: int) -> db.Table:
+        """
+        List properties of a single item.
+
+        Args:
+            id: numeric ID of the item to query
+
+        Returns:
+            db.Table
+        """
+        item = await cls.sess.get(cls.model, id, options=cls.options)  # can be None
+        return item
+
+    @classmethod
+    async def list_all_items(cls) -> list[db.Table]:
+        items = await cls.sess.scalars(db.select(cls.model).options(*cls.options))
+        return items.all()
+
+
+class AsyncAllocationManager(AsyncBaseManager):
+    model = AllocationModel
+
+
+class AsyncAllocationJobManager(AsyncBaseManager):
+    model = AllocationJobModel
+    options = (selectinload(AllocationJobModel.job_status),)
+
+
+class AsyncImageManager(AsyncBaseManager):
+    model = ImageModel
+
+    @classmethod
+    async def list_single_item(cls, id: int) -> db.Table:
+        item = await super().list_single_item(id)
+        if not isinstance(item, cls.model):
+            return item
+
+        item.__dict__["image"] = base64.b64encode(item.image_data).decode()
+        return item
+
+
+class AsyncImagePropertiesManager(AsyncBaseManager):
+    model = ImagePropertiesModel
+
+
+class AsyncIterationManager(AsyncBaseManager):
+    model = IterationModel
+
+
+class AsyncRequestManager(AsyncBaseManager):
+    model = RequestModel
+
+
+class AsyncResourceManager(AsyncBaseManager):
+    model = ResourceModel
+
+
+class AsyncResourceGroupManager(AsyncBaseManager):
+    model = ResourceGroupModel
+
+
+class AsyncResourceToGroupManager(AsyncBaseManager):
+    model = ResourceToGroupModel
+
+
+class AsyncUserManager(AsyncBaseManager):
+    model = UserModel
+
+    @classmethod
+    async def get_role(cls, user: UserModel) -> str:
+        """
+        Name of the role of a user
+        """
+        role = await cls.sess.get(RoleModel, user.role_id)
+        return role.role
+
+    @classmethod
+    async def wrote_recently(cls, id: int, seconds: float) -> bool:
+        """
+        Async counterpart of UserManager.wrote_recently - read on the primary on a short autocommit
+        connection of its own, so the session can still pick a replica
+        """
+        async with cls.sess.bind.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            return await conn.scalar(UserManager.recent_write_query(id, seconds)) is not None
@@ -3,7 +3,8 @@ from dataclasses import dataclass, field
 import os
 from pathlib import Path
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_scoped_session
+from sqlalchemy.orm import scoped_session
 from sqlalchemy.engine import url
 
 
@@ -22,14 +23,27 @@ class Config:
     DB_PORT: int = 5432
     DB_USER: str
     DB_PASSWORD: str = field(repr=False)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_REPLICA_URLS: list[str] = field(default_factory=list, repr=False)
+    DB_REPLICA_STICKINESS: float = 5.0
     URL: url.URL = field(init=False, repr=False)
+    ASYNC_URL: url.URL = field(init=False, repr=False)
 
     #   App settings
     SECRET: str = field(repr=False)
     SERVER_NAME: str | None
     ALLOWED_ORIGINS: list[str] = field(default_factory=list)
-
-    _sess: Session = field(init=False, default=None)
+    ALLOCATION_WORKERS: int = 1
+    ALLOCATION_CACHE_SIZE: int = 256
+    ALLOCATION_CACHE_TABLE: bool = False
+    ALLOCATION_CACHE_TABLE_SIZE: int = 10000
+    ALLOCATION_PROXIMITY_RADIUS: float | None = None
+    ALLOCATION_JOB_TIMEOUT: float = 300.0
+
+    _sess: scoped_session = field(init=False, default=None)
+    _async_sess: async_scoped_session = field(init=False, default=None)
     _default_paths = (
         Path("config"),
         Path().home() / ".resource_allocator",
@@ -83,6 +97,47 @@ class Config:
         if not isinstance(self.DB_PORT, int):
             self.DB_PORT = int(self.DB_PORT)
 
+        if not isinstance(self.DB_POOL_SIZE, int):
+            self.DB_POOL_SIZE = int(self.DB_POOL_SIZE)
+
+        if not isinstance(self.DB_MAX_OVERFLOW, int):
+            self.DB_MAX_OVERFLOW = int(self.DB_MAX_OVERFLOW)
+
+        if not isinstance(self.DB_POOL_TIMEOUT, int):
+            self.DB_POOL_TIMEOUT = int(self.DB_POOL_TIMEOUT)
+
+        if isinstance(self.DB_REPLICA_URLS, str):
+            self.DB_REPLICA_URLS = self.DB_REPLICA_URLS.split(",")
+
+        if self.DB_REPLICA_URLS is None:
+            self.DB_REPLICA_URLS = []
+
+        if not isinstance(self.DB_REPLICA_STICKINESS, float):
+            self.DB_REPLICA_STICKINESS = float(self.DB_REPLICA_STICKINESS)
+
+        if not isinstance(self.ALLOCATION_WORKERS, int):
+            self.ALLOCATION_WORKERS = int(self.ALLOCATION_WORKERS)
+
+        if not isinstance(self.ALLOCATION_CACHE_SIZE, int):
+            self.ALLOCATION_CACHE_SIZE = int(self.ALLOCATION_CACHE_SIZE)
+
+        if not isinstance(self.ALLOCATION_CACHE_TABLE, bool):
+            self.ALLOCATION_CACHE_TABLE = (
+                str(self.ALLOCATION_CACHE_TABLE).lower() in ("1", "true", "yes")
+            )
+
+        if not isinstance(self.ALLOCATION_CACHE_TABLE_SIZE, int):
+            self.ALLOCATION_CACHE_TABLE_SIZE = int(self.ALLOCATION_CACHE_TABLE_SIZE)
+
+        if (
+            self.ALLOCATION_PROXIMITY_RADIUS is not None
+            and not isinstance(self.ALLOCATION_PROXIMITY_RADIUS, float)
+        ):
+            self.ALLOCATION_PROXIMITY_RADIUS = float(self.ALLOCATION_PROXIMITY_RADIUS)
+
+        if not isinstance(self.ALLOCATION_JOB_TIMEOUT, float):
+            self.ALLOCATION_JOB_TIMEOUT = float(self.ALLOCATION_JOB_TIMEOUT)
+
         self.URL = url.URL.create(
             drivername="postgresql",
             username=self.DB_USER,
@@ -91,6 +146,7 @@ class Config:
             port=self.DB_PORT,
             database=self.DB_DATABASE,
         )
+        self.ASYNC_URL = self.URL.set(drivername="postgresql+asyncpg")
         self.__class__._instance.append(self)
 
     @property
@@ -111,6 +167,11 @@ class Config:
             DB_HOST=os.environ["DB_HOST"],
             DB_PORT=os.environ["DB_PORT"],
             DB_DATABASE=os.environ["DB_DATABASE"],
+            DB_POOL_SIZE=os.getenv("DB_POOL_SIZE", 5),
+            DB_MAX_OVERFLOW=os.getenv("DB_MAX_OVERFLOW", 10),
+            DB_POOL_TIMEOUT=os.getenv("DB_POOL_TIMEOUT", 30),
+            DB_REPLICA_URLS=os.getenv("DB_REPLICA_URLS"),
+            DB_REPLICA_STICKINESS=os.getenv("DB_REPLICA_STICKINESS", 5.0),
             SECRET=os.environ["SECRET"],
             AAD_CLIENT_ID=os.environ.get("AAD_CLIENT_ID"),
             AAD_CLIENT_SECRET=os.environ.get("AAD_CLIENT_SECRET"),
@@ -119,6 +180,12 @@ class Config:
             TENANT_ID=os.environ.get("TENANT_ID"),
             LOCAL_LOGIN_ENABLED=os.environ.get("LOCAL_LOGIN_ENABLED"),
             ALLOWED_ORIGINS=os.getenv("ALLOWED_ORIGINS"),
+            ALLOCATION_WORKERS=os.getenv("ALLOCATION_WORKERS", 1),
+            ALLOCATION_CACHE_SIZE=os.getenv("ALLOCATION_CACHE_SIZE", 256),
+            ALLOCATION_CACHE_TABLE=os.getenv("ALLOCATION_CACHE_TABLE", False),
+            ALLOCATION_CACHE_TABLE_SIZE=os.getenv("ALLOCATION_CACHE_TABLE_SIZE", 10000),
+            ALLOCATION_PROXIMITY_RADIUS=os.getenv("ALLOCATION_PROXIMITY_RADIUS"),
+            ALLOCATION_JOB_TIMEOUT=os.getenv("ALLOCATION_JOB_TIMEOUT", 300.0),
         )
 
     @classmethod
@@ -145,9 +212,20 @@ class Config:
             DB_HOST=default["DB_HOST"],
             DB_PORT=int(default["DB_PORT"]),
             DB_DATABASE=default["DB_DATABASE"],
+            DB_POOL_SIZE=default.getint("DB_POOL_SIZE", 5),
+            DB_MAX_OVERFLOW=default.getint("DB_MAX_OVERFLOW", 10),
+            DB_POOL_TIMEOUT=default.getint("DB_POOL_TIMEOUT", 30),
+            DB_REPLICA_URLS=default.get("DB_REPLICA_URLS"),
+            DB_REPLICA_STICKINESS=default.getfloat("DB_REPLICA_STICKINESS", 5.0),
             SECRET=default["SECRET"],
             SERVER_NAME=default.get("SERVER_NAME"),
             TENANT_ID=default.get("SERVER_NAME"),
             LOCAL_LOGIN_ENABLED=default.getboolean("LOCAL_LOGIN_ENABLED"),
             ALLOWED_ORIGINS=default.get("ALLOWED_ORIGINS"),
+            ALLOCATION_WORKERS=default.getint("ALLOCATION_WORKERS", 1),
+            ALLOCATION_CACHE_SIZE=default.getint("ALLOCATION_CACHE_SIZE", 256),
+            ALLOCATION_CACHE_TABLE=default.getboolean("ALLOCATION_CACHE_TABLE", False),
+            ALLOCATION_CACHE_TABLE_SIZE=default.getint("ALLOCATION_CACHE_TABLE_SIZE", 10000),
+            ALLOCATION_PROXIMITY_RADIUS=default.getfloat("ALLOCATION_PROXIMITY_RADIUS"),
+            ALLOCATION_JOB_TIMEOUT=default.getfloat("ALLOCATION_JOB_TIMEOUT", 300.0),
         )
@@ -2,26 +2,129 @@
 Database configuration module
 """
 
+from collections.abc import Sequence
+import random
+
 import sqlalchemy as db
+from sqlalchemy.pool import QueuePool
 
 from resource_allocator.config import Config
 import resource_allocator.models as models
 
 
+class RoutingSession(db.orm.Session):
+    """
+    Session that reads from a replica while use_replica is set. Flushes, DML statements and
+    everything after the first write of a transaction go to the primary the session is bound to,
+    so a transaction always reads its own writes
+
+    Properties:
+        replicas: engines of the read replicas
+        replica: replica picked for the current request or None to use the primary
+        wrote: whether the current transaction has written anything
+    """
+    def __init__(self, *args, replicas: Sequence[db.Engine] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = list(replicas)
+        self.replica = None
+        self.wrote = False
+
+    @property
+    def use_replica(self) -> bool:
+        return self.replica is not None
+
+    @use_replica.setter
+    def use_replica(self, value: bool) -> None:
+        self.replica = random.choice(self.replicas) if value and self.replicas else None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> db.Engine:
+        if self.replica is not None and not self.wrote:
+            return self.replica
+
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@db.event.listens_for(RoutingSession, "do_orm_execute")
+def _track_statement(state: db.orm.ORMExecuteState) -> None:
+    #   Anything but a plain select may write
+    if not state.is_select:
+        state.session.wrote = True
+
+
+@db.event.listens_for(RoutingSession, "before_flush")
+def _track_flush(sess: RoutingSession, flush_context, instances) -> None:
+    sess.wrote = True
+
+
+@db.event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_writes(sess: RoutingSession, transaction: db.orm.SessionTransaction) -> None:
+    if transaction.parent is None:
+        sess.wrote = False
+
+
+def create_engine(
+    config: Config,
+    echo: bool = False,
+    url: str | db.URL | None = None,
+) -> db.Engine:
+    """
+    Create an engine with a connection pool sized by the configuration. Connections are pinged
+    when checked out of the pool, so ones dropped by the server are replaced before use
+
+    Args:
+        config: active Config object
+        echo: whether to log all statements [default: False]
+        url: database to connect to instead of the primary one of the configuration, e.g. a
+            replica [default: None]
+
+    Returns:
+        sqlalchemy.Engine
+    """
+    return db.create_engine(
+        url or config.URL,
+        echo=echo,
+        poolclass=QueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+
 def get_session(echo: bool = False) -> db.orm.Session:
     """
-    Create a session and inject it into an active Config object
+    Session of the current thread. A scoped session registry is created on first use and injected
+    into an active Config object, so each thread - or greenlet when patched by gevent - works on a
+    session of its own while sharing the connection pool. The session is returned as is - a
+    request recovers a failed session once in its before_request hook, other callers roll back
+    themselves. Sessions are RoutingSessions that can read from the replicas in DB_REPLICA_URLS
     """
     config = Config.get_instance()
-    if not config._sess:
-        engine = db.create_engine(config.URL, echo=echo)
+    if config._sess is None:
+        engine = create_engine(config, echo=echo)
+        replicas = [create_engine(config, echo=echo, url=url) for url in config.DB_REPLICA_URLS]
         models.metadata.bind = engine
-        config._sess = db.orm.Session(bind=engine)
+        config._sess = db.orm.scoped_session(db.orm.sessionmaker(
+            bind=engine,
+            class_=RoutingSession,
+            replicas=replicas,
+        ))
 
-    #   Check if session requires a manual rollback
-    try:
-        _ = config._sess.connection()
-    except db.exc.PendingRollbackError:
-        config._sess.rollback()
+    return config._sess()
 
-    return config._sess
+
+def has_session() -> bool:
+    """
+    Whether the current thread already has a session
+    """
+    config = Config.get_instance()
+    return config._sess is not None and config._sess.registry.has()
+
+
+def remove_session() -> None:
+    """
+    Close the session of the current thread, if any, and return its connection to the pool
+    """
+    config = Config.get_instance()
+    if config._sess is not None:
+        config._sess.remove()
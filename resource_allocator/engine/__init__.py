@@ -0,0 +1,69 @@
+from resource_allocator.engine.allocate import (
+    Snapshot,
+    allocate,
+    build_snapshot,
+    collect_allocations,
+)
+from resource_allocator.engine.cache import (
+    SolutionCache,
+    SolutionStore,
+    subproblem_fingerprint,
+    topology_fingerprint,
+)
+from resource_allocator.engine.records import (
+    Allocation,
+    GroupRecord,
+    RequestRecord,
+    ResourceRecord,
+)
+from resource_allocator.engine.reference import ReferenceAllocator
+from resource_allocator.engine.scoring import score_matrix
+from resource_allocator.engine.selection import (
+    improve_selection,
+    select_flow,
+    select_greedy,
+    select_optimal,
+)
+from resource_allocator.engine.solver import (
+    ProgressCallback,
+    Subproblem,
+    partition,
+    previous_day_resources,
+    score_subproblem,
+    select_subproblem,
+    solve_subproblem,
+    solve_subproblems,
+    strategies,
+)
+from resource_allocator.engine.topology import ResourceTopology
+
+__all__ = [
+    "Allocation",
+    "GroupRecord",
+    "ProgressCallback",
+    "ReferenceAllocator",
+    "RequestRecord",
+    "ResourceRecord",
+    "ResourceTopology",
+    "Snapshot",
+    "SolutionCache",
+    "SolutionStore",
+    "Subproblem",
+    "allocate",
+    "build_snapshot",
+    "collect_allocations",
+    "improve_selection",
+    "partition",
+    "previous_day_resources",
+    "score_matrix",
+    "score_subproblem",
+    "select_flow",
+    "select_greedy",
+    "select_optimal",
+    "select_subproblem",
+    "solve_subproblem",
+    "solve_subproblems",
+    "strategies",
+    "subproblem_fingerprint",
+    "topology_fingerprint",
+]
@@ -0,0 +1,177 @@
+"""
+Allocation of plain request and resource records - the entry point of the engine
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+import datetime as dt
+
+import numpy as np
+
+from resource_allocator.engine.cache import SolutionCache
+from resource_allocator.engine.records import (
+    Allocation,
+    GroupRecord,
+    RequestRecord,
+    ResourceRecord,
+)
+from resource_allocator.engine.solver import (
+    ProgressCallback,
+    Subproblem,
+    partition,
+    solve_subproblems,
+)
+from resource_allocator.engine.topology import ResourceTopology
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Everything an allocation run needs, encoded as arrays
+
+    Properties:
+        topology: resources and resource groups
+        problems: subproblems to solve
+        request_ids: id of each request
+        user_ids: user id of each request
+        pending: boolean mask of the requests that have not been handled by a previous run
+    """
+    topology: ResourceTopology
+    problems: list[Subproblem]
+    request_ids: np.ndarray
+    user_ids: np.ndarray
+    pending: np.ndarray
+
+
+def build_snapshot(
+    requests: Sequence[RequestRecord],
+    resources: Sequence[ResourceRecord],
+    groups: Sequence[GroupRecord],
+    allocated: dict[dt.date, list[int]],
+    proximity_radius: float | None = None,
+) -> Snapshot:
+    """
+    Encode records as a topology and one subproblem per (date, top resource group). Subproblems
+    without pending requests are skipped
+
+    Args:
+        requests: requests to allocate
+        resources: all resources
+        groups: all resource groups
+        allocated: ids of the resources that are already allocated by date
+        proximity_radius: if given, resources within this distance of the requested resource or
+            the previous day's resource get a proximity point [default: None]
+
+    Returns:
+        Snapshot
+    """
+    topology = ResourceTopology.from_records(resources, groups, proximity_radius)
+    request_ids = np.array([request.id for request in requests], dtype=np.int64)
+    user_ids = np.array([request.user_id for request in requests], dtype=np.int64)
+    pending = np.array([request.pending for request in requests], dtype=bool)
+    problems = partition(
+        topology,
+        dates=np.array([request.date for request in requests]),
+        request_ids=request_ids,
+        user_ids=user_ids,
+        requested_resources=topology.resource_index(
+            request.requested_resource_id for request in requests
+        ),
+        requested_groups=topology.group_index(
+            request.requested_resource_group_id for request in requests
+        ),
+        allocated=allocated,
+        pending=pending,
+    )
+    return Snapshot(
+        topology=topology,
+        problems=problems,
+        request_ids=request_ids,
+        user_ids=user_ids,
+        pending=pending,
+    )
+
+
+def collect_allocations(
+    snapshot: Snapshot,
+    solutions: dict[tuple[dt.date, int], list[tuple[int, int, int]]],
+) -> tuple[list[Allocation], list[int]]:
+    """
+    Turn the solutions of the subproblems of a snapshot into allocations
+
+    Args:
+        snapshot: snapshot that was solved
+        solutions: (request id, resource id, points) tuples by (date, top resource group id)
+
+    Returns:
+        tuple of the allocations and the ids of the pending requests that were not fulfilled
+    """
+    user_ids = dict(zip(snapshot.request_ids.tolist(), snapshot.user_ids.tolist()))
+    allocations = [
+        Allocation(date, request_id, user_ids[request_id], resource_id, value)
+        for (date, _), solution in solutions.items()
+        for request_id, resource_id, value in solution
+    ]
+    fulfilled_request_ids = {item.source_request_id for item in allocations}
+    declined_request_ids = [
+        request_id
+        for request_id, pending
+        in zip(snapshot.request_ids.tolist(), snapshot.pending.tolist())
+        if pending and request_id not in fulfilled_request_ids
+    ]
+    return allocations, declined_request_ids
+
+
+def allocate(
+    requests: Sequence[RequestRecord],
+    resources: Sequence[ResourceRecord],
+    groups: Sequence[GroupRecord],
+    allocated: dict[dt.date, list[int]] | None = None,
+    strategy: str = "greedy",
+    workers: int = 1,
+    timings: dict[str, float] | None = None,
+    previous: Sequence[Allocation] = (),
+    progress: ProgressCallback | None = None,
+    time_budget: float | None = None,
+    cache: SolutionCache | None = None,
+    proximity_radius: float | None = None,
+) -> tuple[list[Allocation], list[int]]:
+    """
+    Allocate resources to requests
+
+    Args:
+        requests: requests to allocate
+        resources: all resources
+        groups: all resource groups
+        allocated: ids of the resources that are already allocated by date [default: None]
+        strategy: name of the selection strategy - one of solver.strategies [default: greedy]
+        workers: maximum number of worker processes [default: 1]
+        timings: if given, receives the seconds spent on scoring and selection and the number of
+            local search moves [default: None]
+        previous: allocations made before this run on the days before the requested dates. A
+            user gets 2 extra points for the resource they had on the previous day [default: ()]
+        progress: called with the solutions so far and all subproblems each time a subproblem is
+            solved [default: None]
+        time_budget: if given, seconds to spend improving the selections by local search after
+            they are made with strategy [default: None]
+        cache: if given, (date, top resource group) parts with the same inputs as in an earlier
+            run reuse its solution [default: None]
+        proximity_radius: if given, resources within this distance of the requested resource or
+            the previous day's resource get a proximity point [default: None]
+
+    Returns:
+        tuple of the allocations and the ids of the pending requests that were not fulfilled
+    """
+    snapshot = build_snapshot(requests, resources, groups, allocated or dict(), proximity_radius)
+    solutions = solve_subproblems(
+        snapshot.topology,
+        snapshot.problems,
+        strategy=strategy,
+        workers=workers,
+        timings=timings,
+        previous=previous,
+        progress=progress,
+        time_budget=time_budget,
+        cache=cache,
+    )
+    return collect_allocations(snapshot, solutions)
@@ -0,0 +1,176 @@
+"""
+Reuse of subproblem solutions across allocation runs with unchanged inputs
+"""
+
+from collections import OrderedDict
+from collections.abc import Iterable
+import copy
+import hashlib
+import threading
+from typing import Protocol, TYPE_CHECKING
+
+import numpy as np
+
+from resource_allocator.engine.topology import ResourceTopology
+
+if TYPE_CHECKING:
+    from resource_allocator.engine.solver import Subproblem
+
+
+class SolutionStore(Protocol):
+    """
+    Second cache tier consulted by SolutionCache on a miss - for example a database table
+    """
+    def get(self, key: str) -> list[tuple[int, int, int]] | None:
+        ...
+
+    def put(self, key: str, solution: list[tuple[int, int, int]]) -> None:
+        ...
+
+
+class SolutionCache:
+    """
+    Bounded least-recently-used cache of subproblem solutions by fingerprint, optionally backed by
+    a slower store that outlives the process. Safe to share between threads; the store is called
+    without holding the lock
+
+    Args:
+        maxsize: maximum number of solutions kept in memory [default: 256]
+        store: optional second tier [default: None]
+        write_store: whether put also writes to the store [default: True]
+    """
+    def __init__(
+        self,
+        maxsize: int = 256,
+        store: SolutionStore | None = None,
+        write_store: bool = True,
+    ):
+        self.maxsize = maxsize
+        self.store = store
+        self.write_store = write_store
+        self.entries: OrderedDict[str, list[tuple[int, int, int]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def read_only(self) -> "SolutionCache":
+        """
+        Cache sharing the solutions and the lock of this one that reads from the store but never
+        writes to it - for runs that must not write, such as dry runs
+        """
+        view = copy.copy(self)
+        view.write_store = False
+        return view
+
+    def get(self, key: str) -> list[tuple[int, int, int]] | None:
+        """
+        Solution stored under key or None. Solutions found in the store are kept in memory
+        """
+        with self._lock:
+            solution = self.entries.get(key)
+            if solution is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return list(solution)
+
+        if self.store is not None:
+            solution = self.store.get(key)
+
+        with self._lock:
+            if solution is None:
+                self.misses += 1
+                return None
+
+            solution = [tuple(item) for item in solution]
+            self._remember(key, solution)
+            self.hits += 1
+            return list(solution)
+
+    def put(self, key: str, solution: list[tuple[int, int, int]]) -> None:
+        """
+        Store a solution in memory and in the store if any and writable
+        """
+        with self._lock:
+            self._remember(key, list(solution))
+
+        if self.store is not None and self.write_store:
+            self.store.put(key, solution)
+
+    def _remember(self, key: str, solution: list[tuple[int, int, int]]) -> None:
+        #   Called with the lock held
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+def _digest(parts: Iterable[bytes | str]) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        part = part.encode() if isinstance(part, str) else part
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+
+    return digest.hexdigest()
+
+
+def _array_bytes(array: np.ndarray) -> bytes:
+    return np.ascontiguousarray(array, dtype=np.int64).tobytes()
+
+
+def topology_fingerprint(topology: ResourceTopology) -> str:
+    """
+    Fingerprint of the resources, resource groups, their membership and locations
+    """
+    return _digest([
+        _array_bytes(topology.resource_ids),
+        _array_bytes(topology.resource_top_ids),
+        _array_bytes(topology.group_ids),
+        _array_bytes(topology.group_top_ids),
+        _array_bytes(topology.resource_capacities),
+        np.packbits(topology.membership).tobytes() + str(topology.membership.shape).encode(),
+        np.ascontiguousarray(topology.resource_locations, dtype=np.float64).tobytes(),
+        repr(topology.proximity_radius),
+    ])
+
+
+def subproblem_fingerprint(
+    topology_key: str,
+    problem: "Subproblem",
+    strategy: str,
+    previous_resources: np.ndarray | None = None,
+    time_budget: float | None = None,
+) -> str:
+    """
+    Fingerprint of everything the solution of a subproblem depends on: the topology, its requests,
+    its free resources and their remaining capacities, the resources its users had on the previous
+    day and the selection settings
+
+    Args:
+        topology_key: result of topology_fingerprint
+        problem: requests and free resources of a top resource group on a date
+        strategy: name of the selection strategy
+        previous_resources: result of solver.previous_day_resources [default: None]
+        time_budget: seconds of local search [default: None]
+
+    Returns:
+        str: hex digest
+    """
+    return _digest([
+        topology_key,
+        strategy,
+        repr(time_budget),
+        problem.date.isoformat(),
+        str(problem.top_resource_group_id),
+        _array_bytes(problem.request_ids),
+        _array_bytes(problem.user_ids),
+        _array_bytes(problem.requested_resources),
+        _array_bytes(problem.requested_groups),
+        _array_bytes(problem.requested_top_ids),
+        _array_bytes(problem.resources),
+        b"" if problem.capacities is None else _array_bytes(problem.capacities),
+        b"" if previous_resources is None else _array_bytes(previous_resources),
+    ])
@@ -0,0 +1,71 @@
+"""
+Plain records that the allocation engine works on instead of ORM objects
+"""
+
+from dataclasses import dataclass
+import datetime as dt
+from typing import NamedTuple
+
+
+@dataclass(frozen=True, slots=True)
+class RequestRecord:
+    """
+    A request for a resource or for any resource of a resource group on a date
+
+    Properties:
+        id: request id
+        user_id: id of the requesting user
+        date: requested date
+        requested_resource_id: id of the requested resource or None
+        requested_resource_group_id: id of the requested resource group or None
+        pending: whether the request was not handled by a previous allocation run
+    """
+    id: int
+    user_id: int
+    date: dt.date
+    requested_resource_id: int | None = None
+    requested_resource_group_id: int | None = None
+    pending: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class ResourceRecord:
+    """
+    A resource and the resource groups it is linked to
+
+    Properties:
+        id: resource id
+        top_resource_group_id: id of the top resource group of the resource
+        group_ids: ids of the resource groups linked through resource_to_group
+        capacity: number of allocations the resource takes per date
+        location: (x, y) floor plan coordinates of the resource or None
+    """
+    id: int
+    top_resource_group_id: int
+    group_ids: tuple[int, ...] = ()
+    capacity: int = 1
+    location: tuple[float, float] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class GroupRecord:
+    """
+    A resource group
+
+    Properties:
+        id: resource group id
+        top_resource_group_id: id of the top resource group or None
+    """
+    id: int
+    top_resource_group_id: int | None = None
+
+
+class Allocation(NamedTuple):
+    """
+    An allocation of a resource to the user of a request. Field names match AllocationModel
+    """
+    date: dt.date
+    source_request_id: int
+    user_id: int
+    allocated_resource_id: int
+    points: int
@@ -0,0 +1,149 @@
+"""
+Pair-by-pair reference implementation of the allocation rules
+"""
+
+from collections.abc import Iterable
+import datetime as dt
+import math
+
+from resource_allocator.engine.records import (
+    Allocation,
+    GroupRecord,
+    RequestRecord,
+    ResourceRecord,
+)
+
+
+class ReferenceAllocator:
+    """
+    Straightforward implementation of the scoring rules and allocation constraints that works on
+    one (request, resource) pair at a time. It is slow and only serves as the specification that
+    the vectorized engine is tested against
+
+    Args:
+        resources: all resources
+        groups: all resource groups
+        previous: earlier allocations for the continuity points [default: ()]
+        proximity_radius: distance within which a resource is near the requested resource or the
+            previous day's resource. No proximity points if None [default: None]
+    """
+    def __init__(
+        self,
+        resources: Iterable[ResourceRecord],
+        groups: Iterable[GroupRecord],
+        previous: Iterable[Allocation] = (),
+        proximity_radius: float | None = None,
+    ):
+        self.resources = {resource.id: resource for resource in resources}
+        self.groups = {group.id: group for group in groups}
+        self.previous = {
+            (item.user_id, item.date, item.allocated_resource_id)
+            for item in previous
+        }
+        self.proximity_radius = proximity_radius
+
+    def requested_top_id(self, request: RequestRecord) -> int | None:
+        """
+        Top resource group id of the requested resource or, failing that, of the requested group
+        """
+        if request.requested_resource_id in self.resources:
+            return self.resources[request.requested_resource_id].top_resource_group_id
+
+        if request.requested_resource_group_id in self.groups:
+            return self.groups[request.requested_resource_group_id].top_resource_group_id
+
+        return None
+
+    def assign_points(self, request: RequestRecord, resource: ResourceRecord) -> int:
+        """
+        Points of a single request for a single resource
+        """
+        points = 0
+        requested_resource = self.resources.get(request.requested_resource_id)
+
+        #   If this is the exact resource being requested, add 2 points
+        points += 2 * (requested_resource is not None and requested_resource.id == resource.id)
+
+        #   If the resource's groups and the request groups overlap,
+        #   add 10 points
+        points += 10 * (
+            requested_resource is not None
+            and set(requested_resource.group_ids) & set(resource.group_ids) != set()
+        )
+        points += 10 * (request.requested_resource_group_id in resource.group_ids)
+
+        #   Add some points if located in the same top-level resource group
+        top_id = self.requested_top_id(request)
+        points += 5 * (top_id is not None and top_id == resource.top_resource_group_id)
+
+        #   If a user has been granted this resource in the previous day's alloaction,
+        #   add an extra 2 points
+        day_before = request.date - dt.timedelta(days=1)
+        points += 2 * ((request.user_id, day_before, resource.id) in self.previous)
+
+        #   If the resource is near the requested resource or the resource the user had on the
+        #   previous day, add 1 point
+        if self.proximity_radius is not None and resource.location is not None:
+            anchors = [requested_resource] + [
+                self.resources.get(resource_id)
+                for user_id, date, resource_id in self.previous
+                if user_id == request.user_id and date == day_before
+            ]
+            points += any(
+                anchor is not None
+                and anchor.location is not None
+                and anchor.top_resource_group_id == resource.top_resource_group_id
+                and math.dist(anchor.location, resource.location) <= self.proximity_radius
+                for anchor in anchors
+            )
+
+        return points
+
+    def remove_requests(
+        self,
+        request: RequestRecord,
+        resource: ResourceRecord,
+        points: dict[tuple[RequestRecord, ResourceRecord], int],
+        resource_full: bool = True,
+    ) -> dict[tuple[RequestRecord, ResourceRecord], int]:
+        """
+        Drop the pairs that are no longer valid after allocating resource to request: all pairs for
+        the resource if it has no capacity left and all pairs of the user's requests for the
+        resource's top resource group
+        """
+        return {
+            (points_request, points_resource): value
+            for (points_request, points_resource), value in points.items()
+            if not (resource_full and points_resource.id == resource.id)
+            and not (
+                points_request.user_id == request.user_id
+                and self.requested_top_id(points_request) == resource.top_resource_group_id
+            )
+        }
+
+    def select_greedy(
+        self,
+        points: dict[tuple[RequestRecord, ResourceRecord], int],
+    ) -> list[tuple[RequestRecord, ResourceRecord, int]]:
+        """
+        Repeatedly allocate the first pair with the most points until no pair with points is left
+        """
+        result = []
+        taken = dict()
+        while points:
+            max_points = max(points.values())
+            cur_allocation = next(
+                (key for key, value in points.items() if value == max_points and value > 0),
+                None,
+            )
+            if not cur_allocation:
+                break
+
+            request, resource = cur_allocation
+            result.append((request, resource, max_points))
+            taken[resource.id] = taken.get(resource.id, 0) + 1
+            points = self.remove_requests(
+                request, resource, points, taken[resource.id] >= resource.capacity,
+            )
+
+        return result
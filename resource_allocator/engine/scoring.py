@@ -0,0 +1,86 @@
+"""
+Vectorized scoring of requests against resources
+"""
+
+import numpy as np
+
+
+def score_matrix(
+    membership: np.ndarray,
+    resource_top_ids: np.ndarray,
+    requested_resources: np.ndarray,
+    requested_groups: np.ndarray,
+    requested_top_ids: np.ndarray,
+    resources: np.ndarray | None = None,
+    previous_resources: np.ndarray | None = None,
+    near: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Compute the points of every request for every resource at once. The rules are the same as
+    ReferenceAllocator.assign_points:
+
+    - 2 points if the resource is the requested resource
+    - 10 points if the resource shares a resource group with the requested resource
+    - 10 points if the resource belongs to the requested resource group
+    - 5 points if the resource is in the requested top resource group
+    - 2 points if the user of the request had the resource on the previous day
+    - 1 point if the resource is near the requested resource or the previous day's resource
+
+    Args:
+        membership: boolean matrix of shape (resources, groups) - whether a resource belongs to a
+            resource group
+        resource_top_ids: top resource group id of each resource
+        requested_resources: index of the requested resource of each request or -1
+        requested_groups: index of the requested resource group of each request or -1
+        requested_top_ids: top resource group id of the requested resource or resource group of
+            each request or -1
+        resources: positions of the resources to score; all resources if None [default: None]
+        previous_resources: position of the resource the user of each request had on the
+            previous day or -1. No continuity points if None [default: None]
+        near: boolean matrix of shape (requests, resources) - whether the resource is near the
+            requested resource or the previous day's resource of each request. No proximity points
+            if None [default: None]
+
+    Returns:
+        np.ndarray: integer matrix of shape (requests, resources)
+    """
+    if resources is None:
+        resources = np.arange(membership.shape[0])
+
+    n_groups = membership.shape[1]
+    points = np.zeros((len(requested_resources), len(resources)), dtype=np.int32)
+    if not len(resources) or not len(requested_resources):
+        return points
+
+    #   Exact resource
+    points += 2 * (requested_resources[:, None] == resources[None, :])
+
+    #   Same resource as on the previous day
+    if previous_resources is not None:
+        points += 2 * (previous_resources[:, None] == resources[None, :])
+
+    #   Near the requested resource or the previous day's resource
+    if near is not None:
+        points += near
+
+    #   Same top-level resource group
+    points += 5 * (
+        (requested_top_ids[:, None] == resource_top_ids[resources][None, :])
+        & (requested_top_ids[:, None] >= 0)
+    )
+    if not n_groups:
+        return points
+
+    #   Overlap between the groups of the requested resource and the resource
+    has_resource = requested_resources >= 0
+    requested_membership = membership[np.where(has_resource, requested_resources, 0)]
+    resource_membership = membership[resources]
+    overlap = requested_membership.astype(np.float32) @ resource_membership.T.astype(np.float32)
+    points += 10 * ((overlap > 0) & has_resource[:, None])
+
+    #   Resource belongs to the requested group
+    has_group = requested_groups >= 0
+    in_group = resource_membership.T[np.where(has_group, requested_groups, 0)]
+    points += 10 * (in_group & has_group[:, None])
+
+    return points
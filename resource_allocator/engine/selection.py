@@ -0,0 +1,444 @@
+"""
+Selection of allocations from a score matrix
+"""
+
+import time
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment, linprog
+from scipy.sparse import coo_matrix
+
+
+class CandidatePool:
+    """
+    Candidate (request, resource) pairs with positive points in selection order - highest points
+    first, then by resource and request position. Secondary indexes by resource and by
+    (user id, requested top resource group id) mean that removing a taken resource or a satisfied
+    user only touches the affected pairs, and the pool knows when no live candidates are left
+
+    Args:
+        points: integer matrix of shape (requests, resources)
+        user_ids: user id of each request
+        requested_top_ids: top resource group id requested by each request
+    """
+    def __init__(self, points: np.ndarray, user_ids: np.ndarray, requested_top_ids: np.ndarray):
+        n_requests, n_resources = points.shape
+        candidates = points > 0
+
+        #   Column-major order is already sorted by resource and request - a stable sort by points
+        #   gives the selection order
+        columns, rows = np.nonzero(candidates.T)
+        values = points[rows, columns]
+        sort_type = np.int16 if values.size and values.max() < 2 ** 15 else np.int64
+        order = np.argsort(-values.astype(sort_type), kind="stable")
+        self.rows, self.columns, self.values = rows[order], columns[order], values[order]
+        self.alive = np.ones(len(order), dtype=bool)
+        self.size = len(order)
+        self._position = 0
+
+        #   Candidates grouped by resource - positions in selection order
+        self._positions = np.empty(len(order), dtype=np.int64)
+        self._positions[order] = np.arange(len(order))
+        self._resource_offsets = self._offsets(columns, n_resources)
+
+        #   Candidates of a request are found through their sorted column-major keys and requests
+        #   are grouped by (user, requested top group)
+        self._candidates = candidates
+        self._keys = columns * n_requests + rows
+        self._user_top_requests = dict()
+        for row, key in enumerate(zip(user_ids.tolist(), requested_top_ids.tolist())):
+            self._user_top_requests.setdefault(key, []).append(row)
+
+    @staticmethod
+    def _offsets(keys: np.ndarray, n_keys: int) -> np.ndarray:
+        """
+        Start offsets of each key in a key-grouped array (CSR layout)
+        """
+        offsets = np.zeros(n_keys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n_keys), out=offsets[1:])
+        return offsets
+
+    def _remove(self, positions: np.ndarray) -> None:
+        self.size -= int(np.count_nonzero(self.alive[positions]))
+        self.alive[positions] = False
+
+    def pop(self) -> int | None:
+        """
+        Position of the next live candidate or None if the pool is empty
+        """
+        if not self.size:
+            return None
+
+        self._position += int(np.argmax(self.alive[self._position:]))
+        return self._position
+
+    def remove_resource(self, column: int) -> None:
+        """
+        Remove all candidates for a resource
+        """
+        start, end = self._resource_offsets[column:column + 2]
+        self._remove(self._positions[start:end])
+
+    def remove_user(self, user_id: int, top_id: int) -> None:
+        """
+        Remove all candidates of a user's requests for a top resource group
+        """
+        n_requests = self._candidates.shape[0]
+        for row in self._user_top_requests.get((user_id, top_id), []):
+            keys = np.flatnonzero(self._candidates[row]) * n_requests + row
+            self._remove(self._positions[np.searchsorted(self._keys, keys)])
+
+
+def select_greedy(
+    points: np.ndarray,
+    user_ids: np.ndarray,
+    requested_top_ids: np.ndarray,
+    resource_top_ids: np.ndarray,
+    capacities: np.ndarray | None = None,
+) -> list[tuple[int, int, int]]:
+    """
+    Greedily pick the highest-scoring (request, resource) pairs. Ties are broken by resource and
+    then by request position. After each pick the candidates that are no longer valid are removed
+    through the indexes of a CandidatePool:
+
+    - all pairs for the taken resource once its capacity is used up
+    - all pairs of the user's requests for the top resource group of the taken resource
+
+    Args:
+        points: integer matrix of shape (requests, resources)
+        user_ids: user id of each request
+        requested_top_ids: top resource group id requested by each request
+        resource_top_ids: top resource group id of each resource
+        capacities: number of requests each resource takes - all 1 if None [default: None]
+
+    Returns:
+        list of (request index, resource index, points) tuples in the order they were picked
+    """
+    pool = CandidatePool(points, user_ids, requested_top_ids)
+    user_ids = user_ids.tolist()
+    resource_top_ids = resource_top_ids.tolist()
+    remaining = [1] * points.shape[1] if capacities is None else capacities.tolist()
+
+    result = []
+    while (position := pool.pop()) is not None:
+        row, column = int(pool.rows[position]), int(pool.columns[position])
+        result.append((row, column, int(pool.values[position])))
+        remaining[column] -= 1
+        if remaining[column] <= 0:
+            pool.remove_resource(column)
+
+        pool.remove_user(user_ids[row], resource_top_ids[column])
+
+    return result
+
+
+def _user_top_matrix(
+    points: np.ndarray,
+    user_ids: np.ndarray,
+    requested_top_ids: np.ndarray,
+    resource_top_ids: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Points with one row per (user, requested top group) holding the best request of the user for
+    each resource of the top group - the first one on ties - and the positions of those requests
+    """
+    points = np.where(requested_top_ids[:, None] == resource_top_ids[None, :], points, 0)
+    keys, row_keys = np.unique(
+        np.stack([user_ids, requested_top_ids], axis=1), axis=0, return_inverse=True,
+    )
+    row_keys = row_keys.reshape(-1)
+
+    matrix = np.zeros((len(keys), points.shape[1]), dtype=points.dtype)
+    best_requests = np.full(matrix.shape, -1)
+    for request in range(points.shape[0]):
+        row = row_keys[request]
+        better = points[request] > matrix[row]
+        matrix[row, better] = points[request, better]
+        best_requests[row, better] = request
+
+    return matrix, best_requests
+
+
+def select_optimal(
+    points: np.ndarray,
+    user_ids: np.ndarray,
+    requested_top_ids: np.ndarray,
+    resource_top_ids: np.ndarray,
+    capacities: np.ndarray | None = None,
+) -> list[tuple[int, int, int]]:
+    """
+    Pick the (request, resource) pairs that maximise the total points. Each request is limited to
+    resources in its requested top resource group, so a single row per user and top resource group
+    enforces both the per-resource and the per-user-per-top-group constraints. Requests of the same
+    user for the same top resource group share a row and the best one is used for each resource.
+    Resources with a capacity above 1 are solved as a min-cost flow by select_flow
+
+    Args:
+        points: integer matrix of shape (requests, resources)
+        user_ids: user id of each request
+        requested_top_ids: top resource group id requested by each request
+        resource_top_ids: top resource group id of each resource
+        capacities: number of requests each resource takes - all 1 if None [default: None]
+
+    Returns:
+        list of (request index, resource index, points) tuples ordered by user and top group
+    """
+    if capacities is not None and (capacities != 1).any():
+        return select_flow(points, user_ids, requested_top_ids, resource_top_ids, capacities)
+
+    if not points.size:
+        return []
+
+    matrix, best_requests = _user_top_matrix(points, user_ids, requested_top_ids, resource_top_ids)
+    row_index, column_index = linear_sum_assignment(matrix, maximize=True)
+    return [
+        (int(best_requests[row, column]), int(column), int(matrix[row, column]))
+        for row, column
+        in zip(row_index, column_index)
+        if matrix[row, column] > 0
+    ]
+
+
+def select_flow(
+    points: np.ndarray,
+    user_ids: np.ndarray,
+    requested_top_ids: np.ndarray,
+    resource_top_ids: np.ndarray,
+    capacities: np.ndarray | None = None,
+) -> list[tuple[int, int, int]]:
+    """
+    Pick the (request, resource) pairs that maximise the total points when resources take several
+    requests. This is a min-cost flow from each (user, top group) through the pairs with points to
+    the resources, with room for one unit per (user, top group) and for capacity units per
+    resource. The constraint matrix of such a flow is totally unimodular, so the simplex solution
+    of its linear program is integral. Only pairs with points become variables, so resources are
+    never expanded into one copy per unit of capacity
+
+    Args:
+        points: integer matrix of shape (requests, resources)
+        user_ids: user id of each request
+        requested_top_ids: top resource group id requested by each request
+        resource_top_ids: top resource group id of each resource
+        capacities: number of requests each resource takes - all 1 if None [default: None]
+
+    Returns:
+        list of (request index, resource index, points) tuples ordered by user and top group
+    """
+    if not points.size:
+        return []
+
+    if capacities is None:
+        capacities = np.ones(points.shape[1], dtype=np.int64)
+
+    matrix, best_requests = _user_top_matrix(points, user_ids, requested_top_ids, resource_top_ids)
+    rows, columns = np.nonzero(matrix > 0)
+    if not len(rows):
+        return []
+
+    #   One variable per (user and top group, resource) arc - each row of constraints is one node
+    arcs = np.arange(len(rows))
+    n_keys = matrix.shape[0]
+    constraints = coo_matrix(
+        (
+            np.ones(2 * len(rows)),
+            (np.concatenate([rows, n_keys + columns]), np.concatenate([arcs, arcs])),
+        ),
+        shape=(n_keys + matrix.shape[1], len(rows)),
+    ).tocsr()
+    solution = linprog(
+        c=-matrix[rows, columns].astype(np.float64),
+        A_ub=constraints,
+        b_ub=np.concatenate([np.ones(n_keys), capacities]).astype(np.float64),
+        bounds=(0, 1),
+        method="highs-ds",
+    )
+    if solution.status != 0:
+        raise RuntimeError(f"Min-cost flow failed: {solution.message}")
+
+    chosen = np.flatnonzero(solution.x > 0.5)
+    rows, columns = rows[chosen], columns[chosen]
+    return list(zip(
+        best_requests[rows, columns].tolist(),
+        columns.tolist(),
+        matrix[rows, columns].tolist(),
+    ))
+
+
+def improve_selection(
+    points: np.ndarray,
+    user_ids: np.ndarray,
+    requested_top_ids: np.ndarray,
+    resource_top_ids: np.ndarray,
+    selection: list[tuple[int, int, int]],
+    deadline: float,
+    capacities: np.ndarray | None = None,
+) -> tuple[list[tuple[int, int, int]], int]:
+    """
+    Improve the total points of a selection by local search until no move gains points or the
+    deadline passes. Each iteration applies the single best of these moves:
+
+    - move an allocated request to a free resource or allocate a waiting request to one
+    - swap the resources of two allocated requests
+    - give an allocated resource to a waiting request and move its previous holder to its best free
+      resource or drop it
+
+    Requests are only moved to resources of their requested top resource group, and a request
+    waits only if its user has no resource in that top resource group yet, so the per-resource and
+    the per-user-per-top-group constraints of select_greedy hold after every move
+
+    Args:
+        points: integer matrix of shape (requests, resources)
+        user_ids: user id of each request
+        requested_top_ids: top resource group id requested by each request
+        resource_top_ids: top resource group id of each resource
+        selection: valid (request index, resource index, points) tuples to start from
+        deadline: time.perf_counter() value after which no new iteration is started
+        capacities: number of requests each resource takes - all 1 if None. Each unit of
+            capacity is searched as a resource of its own [default: None]
+
+    Returns:
+        tuple of the improved selection sorted by request index and the number of applied moves
+    """
+    if capacities is not None and (capacities != 1).any():
+        #   One slot per unit of capacity - each taken resource fills its first free slot
+        slots = np.repeat(np.arange(len(capacities)), capacities)
+        first_slot = np.concatenate([[0], np.cumsum(capacities)[:-1]])
+        used = np.zeros(len(capacities), dtype=np.int64)
+        slot_selection = []
+        for row, column, value in selection:
+            slot_selection.append((row, int(first_slot[column] + used[column]), value))
+            used[column] += 1
+
+        improved, iterations = improve_selection(
+            points[:, slots],
+            user_ids,
+            requested_top_ids,
+            resource_top_ids[slots],
+            slot_selection,
+            deadline,
+        )
+        return [(row, int(slots[slot]), value) for row, slot, value in improved], iterations
+
+    n_requests, n_resources = points.shape
+    allowed = np.where(requested_top_ids[:, None] == resource_top_ids[None, :], points, 0)
+
+    #   (user, top group) keys - a request needs its own key free to be allocated
+    key_ids = dict()
+    row_keys = np.array(
+        [
+            key_ids.setdefault(key, len(key_ids))
+            for key in zip(user_ids.tolist(), requested_top_ids.tolist())
+        ],
+        dtype=np.int64,
+    )
+    selection_keys = [
+        key_ids.setdefault((int(user_ids[row]), int(resource_top_ids[column])), len(key_ids))
+        for row, column, _ in selection
+    ]
+    column_of = np.full(n_requests, -1, dtype=np.int64)
+    row_of = np.full(n_resources, -1, dtype=np.int64)
+    value_of = np.zeros(n_requests, dtype=np.int64)
+    served = np.full(len(key_ids), -1, dtype=np.int64)
+    allocation_keys = np.full(n_requests, -1, dtype=np.int64)
+    for (row, column, value), key in zip(selection, selection_keys):
+        column_of[row], row_of[column], value_of[row] = column, row, value
+        served[key], allocation_keys[row] = row, key
+
+    def allocate(row: int, column: int) -> None:
+        row_of[column], column_of[row] = row, column
+        value_of[row] = allowed[row, column]
+        allocation_keys[row] = row_keys[row]
+        served[row_keys[row]] = row
+
+    def release(row: int) -> None:
+        row_of[column_of[row]], served[allocation_keys[row]] = -1, -1
+        column_of[row], value_of[row], allocation_keys[row] = -1, 0, -1
+
+    iterations = 0
+    rows = np.arange(n_requests)
+    while time.perf_counter() < deadline:
+        free = np.flatnonzero(row_of < 0)
+        assigned = np.flatnonzero(column_of >= 0)
+        regular = assigned[allocation_keys[assigned] == row_keys[assigned]]
+        waiting = np.flatnonzero((column_of < 0) & (served[row_keys] < 0))
+        movable = np.concatenate([regular, waiting])
+        moves = []
+
+        #   Move or allocate to a free resource
+        if len(free) and len(movable):
+            gains = np.where(
+                allowed[np.ix_(movable, free)] > 0,
+                allowed[np.ix_(movable, free)] - value_of[movable][:, None],
+                0,
+            )
+            index = np.unravel_index(np.argmax(gains), gains.shape)
+            moves.append((gains[index], "move", movable[index[0]], free[index[1]]))
+
+        #   Swap two allocated resources
+        if len(regular) > 1:
+            columns = column_of[regular]
+            exchanged = allowed[np.ix_(regular, columns)]
+            gains = np.where(
+                (exchanged > 0) & (exchanged.T > 0),
+                exchanged + exchanged.T
+                - value_of[regular][:, None] - value_of[regular][None, :],
+                0,
+            )
+            index = np.unravel_index(np.argmax(gains), gains.shape)
+            moves.append((gains[index], "swap", regular[index[0]], regular[index[1]]))
+
+        #   Give a resource to a waiting request - the holder moves to its best free resource
+        if len(waiting) and len(regular):
+            columns = column_of[regular]
+            alternatives = np.zeros(len(regular), dtype=np.int64)
+            alternative_columns = np.full(len(regular), -1, dtype=np.int64)
+            if len(free):
+                free_points = allowed[np.ix_(regular, free)]
+                best = np.argmax(free_points, axis=1)
+                alternatives = free_points[np.arange(len(regular)), best].astype(np.int64)
+                alternative_columns = np.where(alternatives > 0, free[best], -1)
+
+            taken = allowed[np.ix_(waiting, columns)]
+            gains = np.where(
+                taken > 0,
+                taken - value_of[regular][None, :] + alternatives[None, :],
+                0,
+            )
+            index = np.unravel_index(np.argmax(gains), gains.shape)
+            moves.append((
+                gains[index],
+                "eject",
+                waiting[index[0]],
+                (regular[index[1]], alternative_columns[index[1]]),
+            ))
+
+        gain, kind, row, target = max(moves, key=lambda move: move[0], default=(0, None, 0, 0))
+        if gain <= 0:
+            break
+
+        if kind == "move":
+            if column_of[row] >= 0:
+                release(row)
+
+            allocate(row, target)
+        elif kind == "swap":
+            first_column, second_column = column_of[row], column_of[target]
+            release(row)
+            release(target)
+            allocate(row, second_column)
+            allocate(target, first_column)
+        else:
+            holder, alternative = target
+            column = column_of[holder]
+            release(holder)
+            allocate(row, column)
+            if alternative >= 0:
+                allocate(holder, alternative)
+
+        iterations += 1
+
+    result = [
+        (int(row), int(column_of[row]), int(value_of[row]))
+        for row in rows[column_of >= 0]
+    ]
+    return result, iterations
@@ -0,0 +1,641 @@
+"""
+Solving allocation problems - serially or across a process pool
+"""
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import datetime as dt
+import multiprocessing
+import time
+
+import numpy as np
+
+from resource_allocator.engine.cache import (
+    SolutionCache,
+    subproblem_fingerprint,
+    topology_fingerprint,
+)
+from resource_allocator.engine.records import Allocation
+from resource_allocator.engine.scoring import score_matrix
+from resource_allocator.engine.selection import (
+    improve_selection,
+    select_flow,
+    select_greedy,
+    select_optimal,
+)
+from resource_allocator.engine.topology import ResourceTopology
+
+
+strategies = {
+    "greedy": select_greedy,
+    "optimal": select_optimal,
+    "flow": select_flow,
+}
+
+#   Called with the solutions so far and all subproblems each time a subproblem is solved
+ProgressCallback = Callable[
+    [dict[tuple[dt.date, int], list[tuple[int, int, int]]], list["Subproblem"]],
+    None,
+]
+
+
+@dataclass(frozen=True)
+class Subproblem:
+    """
+    Plain, picklable inputs for allocating a single top resource group on a single date. Resources
+    belong to one top resource group and users get one allocation per top resource group per day,
+    so subproblems of different top resource groups are independent of each other. Subproblems of
+    the same top resource group depend on the previous date through the continuity points
+
+    Properties:
+        date: date being allocated
+        top_resource_group_id: top resource group being allocated
+        request_ids: id of each request
+        user_ids: user id of each request
+        requested_resources: topology position of the requested resource of each request or -1
+        requested_groups: topology position of the requested resource group of each request or -1
+        requested_top_ids: requested top resource group id of each request
+        resources: sorted topology positions of the free resources of the top resource group
+        capacities: remaining capacity of each free resource on the date - all 1 if None
+    """
+    date: dt.date
+    top_resource_group_id: int
+    request_ids: np.ndarray
+    user_ids: np.ndarray
+    requested_resources: np.ndarray
+    requested_groups: np.ndarray
+    requested_top_ids: np.ndarray
+    resources: np.ndarray
+    capacities: np.ndarray | None = None
+
+    @property
+    def key(self) -> tuple[dt.date, int]:
+        return self.date, self.top_resource_group_id
+
+
+def partition(
+    topology: ResourceTopology,
+    dates: np.ndarray,
+    request_ids: np.ndarray,
+    user_ids: np.ndarray,
+    requested_resources: np.ndarray,
+    requested_groups: np.ndarray,
+    allocated: dict[dt.date, list[int]],
+    pending: np.ndarray | None = None,
+) -> list[Subproblem]:
+    """
+    Split requests into one subproblem per (date, top resource group). Requests without a known top
+    resource group cannot be allocated and are left out
+
+    Args:
+        topology: resources and resource groups
+        dates: requested date of each request
+        request_ids: id of each request
+        user_ids: user id of each request
+        requested_resources: topology position of the requested resource of each request or -1
+        requested_groups: topology position of the requested resource group of each request or -1
+        allocated: ids of the resources that are already allocated by date - repeated once per
+            allocation for resources with a capacity above 1
+        pending: boolean mask of the requests that have not been handled by a previous run.
+            Subproblems without any are skipped. All subproblems are kept if None [default: None]
+
+    Returns:
+        list of Subproblem sorted by date and top resource group id
+    """
+    requested_top_ids = topology.requested_top_ids(requested_resources, requested_groups)
+    known = np.flatnonzero(requested_top_ids >= 0)
+    keys = sorted({
+        (date, top_id)
+        for date, top_id
+        in zip(dates[known].tolist(), requested_top_ids[known].tolist())
+    })
+
+    result = []
+    remaining = dict()
+    for date, top_id in keys:
+        rows = np.flatnonzero((dates == date) & (requested_top_ids == top_id))
+        if pending is not None and not pending[rows].any():
+            continue
+
+        if date not in remaining:
+            taken = topology.resource_index(allocated.get(date, []))
+            remaining[date] = topology.resource_capacities - np.bincount(
+                taken[taken >= 0], minlength=len(topology.resource_ids),
+            )
+
+        resources = np.flatnonzero((remaining[date] > 0) & (topology.resource_top_ids == top_id))
+        capacities = remaining[date][resources]
+        result.append(Subproblem(
+            date=date,
+            top_resource_group_id=top_id,
+            request_ids=request_ids[rows],
+            user_ids=user_ids[rows],
+            requested_resources=requested_resources[rows],
+            requested_groups=requested_groups[rows],
+            requested_top_ids=requested_top_ids[rows],
+            resources=resources,
+            capacities=None if (capacities == 1).all() else capacities,
+        ))
+
+    return result
+
+
+def score_subproblem(
+    topology: ResourceTopology,
+    problem: Subproblem,
+    previous_resources: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Points of every (request, free resource) pair of a subproblem. Proximity points are only
+    given if the topology has a proximity radius
+
+    Args:
+        topology: resources and resource groups
+        problem: requests and free resources of a top resource group on a date
+        previous_resources: topology position of the resource the user of each request had on the
+            previous day or -1 [default: None]
+
+    Returns:
+        np.ndarray: integer matrix of shape (requests, free resources)
+    """
+    near = None
+    if topology.proximity_radius is not None:
+        anchors = [problem.requested_resources]
+        if previous_resources is not None:
+            anchors.append(previous_resources)
+
+        near = topology.near_resources(np.stack(anchors, axis=1), problem.resources)
+
+    return score_matrix(
+        membership=topology.membership,
+        resource_top_ids=topology.resource_top_ids,
+        requested_resources=problem.requested_resources,
+        requested_groups=problem.requested_groups,
+        requested_top_ids=problem.requested_top_ids,
+        resources=problem.resources,
+        previous_resources=previous_resources,
+        near=near,
+    )
+
+
+def previous_day_resources(
+    topology: ResourceTopology,
+    problem: Subproblem,
+    previous: dict[tuple[int, dt.date], int],
+) -> np.ndarray:
+    """
+    Topology position of the resource the user of each request of a subproblem had on the previous
+    day or -1
+
+    Args:
+        topology: resources and resource groups
+        problem: requests and free resources of a top resource group on a date
+        previous: allocated resource id by (user id, date) within the top resource group
+
+    Returns:
+        np.ndarray: resource positions
+    """
+    day_before = problem.date - dt.timedelta(days=1)
+    return topology.resource_index(
+        previous.get((user_id, day_before))
+        for user_id in problem.user_ids.tolist()
+    )
+
+
+def select_subproblem(
+    topology: ResourceTopology,
+    problem: Subproblem,
+    points: np.ndarray,
+    strategy: str = "greedy",
+    time_budget: float | None = None,
+    stats: dict[str, float] | None = None,
+) -> list[tuple[int, int, int]]:
+    """
+    Select the allocations of a subproblem from its points
+
+    Args:
+        topology: resources and resource groups
+        problem: requests and free resources of a top resource group on a date
+        points: result of score_subproblem
+        strategy: name of the selection strategy - one of strategies
+        time_budget: if given, seconds to spend improving the selection by local search
+            [default: None]
+        stats: if given, the number of local search moves is added under "search_iterations"
+            [default: None]
+
+    Returns:
+        list of (request id, resource id, points) tuples
+    """
+    arrays = {
+        "user_ids": problem.user_ids,
+        "requested_top_ids": problem.requested_top_ids,
+        "resource_top_ids": topology.resource_top_ids[problem.resources],
+        "capacities": problem.capacities,
+    }
+    selection = strategies[strategy](points, **arrays)
+    if time_budget is not None:
+        selection, iterations = improve_selection(
+            points,
+            **arrays,
+            selection=selection,
+            deadline=time.perf_counter() + time_budget,
+        )
+        if stats is not None:
+            stats["search_iterations"] = stats.get("search_iterations", 0) + iterations
+
+    resource_ids = topology.resource_ids[problem.resources]
+    request_ids = problem.request_ids
+    return [
+        (int(request_ids[row]), int(resource_ids[column]), value)
+        for row, column, value
+        in selection
+    ]
+
+
+def _solve_timed(
+    topology: ResourceTopology,
+    problem: Subproblem,
+    strategy: str,
+    previous: dict[tuple[int, dt.date], int] | None = None,
+    time_budget: float | None = None,
+) -> tuple[list[tuple[int, int, int]], dict[str, float]]:
+    """
+    solve_subproblem that also returns the seconds spent on scoring and selection and the number of
+    local search moves if there is a time budget
+    """
+    start_time = time.perf_counter()
+    points = score_subproblem(
+        topology,
+        problem,
+        None if previous is None else previous_day_resources(topology, problem, previous),
+    )
+    score_time = time.perf_counter()
+    timings = dict()
+    result = select_subproblem(topology, problem, points, strategy, time_budget, timings)
+    timings["score"] = score_time - start_time
+    timings["select"] = time.perf_counter() - score_time
+    return result, timings
+
+
+def solve_subproblem(
+    topology: ResourceTopology,
+    problem: Subproblem,
+    strategy: str = "greedy",
+    previous: dict[tuple[int, dt.date], int] | None = None,
+    time_budget: float | None = None,
+) -> list[tuple[int, int, int]]:
+    """
+    Score and select the allocations of a single subproblem
+
+    Args:
+        topology: resources and resource groups
+        problem: requests and free resources of a top resource group on a date
+        strategy: name of the selection strategy - one of strategies
+        previous: allocated resource id by (user id, date) within the top resource group for the
+            continuity points [default: None]
+        time_budget: if given, seconds to spend improving the selection by local search
+            [default: None]
+
+    Returns:
+        list of (request id, resource id, points) tuples
+    """
+    return _solve_timed(topology, problem, strategy, previous, time_budget)[0]
+
+
+def _add_previous(
+    previous: dict[tuple[int, dt.date], int],
+    problem: Subproblem,
+    result: list[tuple[int, int, int]],
+) -> None:
+    """
+    Record the allocations of a solved subproblem for the continuity points of the next date
+    """
+    user_ids = dict(zip(problem.request_ids.tolist(), problem.user_ids.tolist()))
+    for request_id, resource_id, _ in result:
+        previous[(user_ids[request_id], problem.date)] = resource_id
+
+
+def _fingerprint(
+    topology: ResourceTopology,
+    topology_key: str,
+    problem: Subproblem,
+    strategy: str,
+    previous: dict[tuple[int, dt.date], int],
+    time_budget: float | None,
+) -> str:
+    return subproblem_fingerprint(
+        topology_key,
+        problem,
+        strategy,
+        previous_day_resources(topology, problem, previous),
+        time_budget,
+    )
+
+
+def _solve_chain(
+    topology: ResourceTopology,
+    chain: list[Subproblem],
+    strategy: str,
+    previous: dict[tuple[int, dt.date], int],
+    on_solved: Callable[[Subproblem, list[tuple[int, int, int]]], None] | None = None,
+    time_budgets: dict[tuple[dt.date, int], float] | None = None,
+    cache: SolutionCache | None = None,
+    topology_key: str | None = None,
+) -> list[tuple[list[tuple[int, int, int]], dict[str, float]]]:
+    """
+    Solve the subproblems of a top resource group in date order. Allocations of each date are added
+    to previous so that they count towards the continuity points of the next date. Solutions are
+    looked up in and added to cache if given
+    """
+    previous = dict(previous)
+    time_budgets = time_budgets or dict()
+    results = []
+    for problem in chain:
+        time_budget = time_budgets.get(problem.key)
+        key = None
+        if cache is not None:
+            key = _fingerprint(topology, topology_key, problem, strategy, previous, time_budget)
+
+        result = None if key is None else cache.get(key)
+        timings = {"score": 0.0, "select": 0.0}
+        if result is None:
+            result, timings = _solve_timed(topology, problem, strategy, previous, time_budget)
+            if key is not None:
+                cache.put(key, result)
+
+        _add_previous(previous, problem, result)
+        results.append((result, timings))
+        if on_solved is not None:
+            on_solved(problem, result)
+
+    return results
+
+
+def _cached_prefix(
+    topology: ResourceTopology,
+    topology_key: str,
+    chain: list[Subproblem],
+    strategy: str,
+    previous: dict[tuple[int, dt.date], int],
+    time_budgets: dict[tuple[dt.date, int], float] | None,
+    cache: SolutionCache,
+) -> tuple[list[tuple[list[tuple[int, int, int]], dict[str, float]]], dict]:
+    """
+    Cached solutions of the leading subproblems of a chain, up to the first miss, and previous
+    updated with them
+    """
+    previous = dict(previous)
+    time_budgets = time_budgets or dict()
+    results = []
+    for problem in chain:
+        key = _fingerprint(
+            topology, topology_key, problem, strategy, previous, time_budgets.get(problem.key),
+        )
+        result = cache.get(key)
+        if result is None:
+            break
+
+        _add_previous(previous, problem, result)
+        results.append((result, {"score": 0.0, "select": 0.0}))
+
+    return results, previous
+
+
+def _cache_chain(
+    topology: ResourceTopology,
+    topology_key: str,
+    chain: list[Subproblem],
+    strategy: str,
+    previous: dict[tuple[int, dt.date], int],
+    time_budgets: dict[tuple[dt.date, int], float] | None,
+    cache: SolutionCache,
+    results: list[tuple[list[tuple[int, int, int]], dict[str, float]]],
+) -> None:
+    """
+    Add the solutions of a chain solved elsewhere to cache
+    """
+    previous = dict(previous)
+    time_budgets = time_budgets or dict()
+    for problem, (result, _) in zip(chain, results):
+        key = _fingerprint(
+            topology, topology_key, problem, strategy, previous, time_budgets.get(problem.key),
+        )
+        cache.put(key, result)
+        _add_previous(previous, problem, result)
+
+
+def _chains(problems: list[Subproblem]) -> list[list[Subproblem]]:
+    """
+    Group subproblems by top resource group keeping their date order
+    """
+    result = dict()
+    for problem in sorted(problems, key=lambda item: item.date):
+        result.setdefault(problem.top_resource_group_id, []).append(problem)
+
+    return list(result.values())
+
+
+def _previous_by_top(
+    topology: ResourceTopology,
+    previous: Iterable[Allocation],
+) -> dict[int, dict[tuple[int, dt.date], int]]:
+    """
+    Split earlier allocations into (user id, date) -> resource id lookups per top resource group.
+    A user has at most one allocation per top resource group per day so the keys are unique
+    """
+    previous = list(previous)
+    positions = topology.resource_index(item.allocated_resource_id for item in previous)
+    result = dict()
+    for item, position in zip(previous, positions.tolist()):
+        if position < 0:
+            continue
+
+        top_id = int(topology.resource_top_ids[position])
+        result.setdefault(top_id, dict())[(item.user_id, item.date)] = item.allocated_resource_id
+
+    return result
+
+
+#   Topology shared by all tasks of a worker process - set once by the pool initializer
+_worker_topology: ResourceTopology | None = None
+
+
+def _init_worker(topology: ResourceTopology) -> None:
+    global _worker_topology
+    _worker_topology = topology
+
+
+def _solve_chain_in_worker(
+    chain: list[Subproblem],
+    strategy: str,
+    previous: dict[tuple[int, dt.date], int],
+    time_budgets: dict[tuple[dt.date, int], float] | None,
+) -> list[tuple[list[tuple[int, int, int]], dict[str, float]]]:
+    return _solve_chain(_worker_topology, chain, strategy, previous, time_budgets=time_budgets)
+
+
+def _time_budgets(
+    problems: list[Subproblem],
+    time_budget: float | None,
+) -> dict[tuple[dt.date, int], float] | None:
+    """
+    Split a time budget across subproblems in proportion to the size of their score matrices
+    """
+    if time_budget is None:
+        return None
+
+    sizes = {
+        problem.key: max(len(problem.request_ids) * len(problem.resources), 1)
+        for problem in problems
+    }
+    total = sum(sizes.values())
+    return {key: time_budget * size / total for key, size in sizes.items()}
+
+
+def _collect_results(
+    problems: list[Subproblem],
+    chains: list[list[Subproblem]],
+    results: list[list[tuple[list[tuple[int, int, int]], dict[str, float]]]],
+    timings: dict[str, float] | None,
+) -> dict[tuple[dt.date, int], list[tuple[int, int, int]]]:
+    """
+    Key the results of each chain by subproblem in the order of problems and add up their timings
+    """
+    solutions = dict()
+    for chain, chain_results in zip(chains, results):
+        for problem, (result, problem_timings) in zip(chain, chain_results):
+            solutions[problem.key] = result
+            if timings is None:
+                continue
+
+            for key, value in problem_timings.items():
+                timings[key] = timings.get(key, 0.0) + value
+
+    return {problem.key: solutions[problem.key] for problem in problems}
+
+
+def solve_subproblems(
+    topology: ResourceTopology,
+    problems: list[Subproblem],
+    strategy: str = "greedy",
+    workers: int = 1,
+    timings: dict[str, float] | None = None,
+    previous: Iterable[Allocation] = (),
+    progress: ProgressCallback | None = None,
+    time_budget: float | None = None,
+    cache: SolutionCache | None = None,
+) -> dict[tuple[dt.date, int], list[tuple[int, int, int]]]:
+    """
+    Solve subproblems, across a process pool if more than one worker is requested. The subproblems
+    of a top resource group form a chain that is solved in date order so that the allocations of a
+    date count towards the continuity points of the next one - chains are independent and are
+    spread across the workers. The topology is sent to each worker process once. Results are the
+    same as solving serially
+
+    Args:
+        topology: resources and resource groups
+        problems: subproblems as returned by partition
+        strategy: name of the selection strategy - one of strategies
+        workers: maximum number of worker processes; 1 solves in the current process
+        timings: if given, the seconds spent on "score" and "select" summed over all subproblems
+            are added to it, plus the number of local search moves under "search_iterations" if
+            there is a time budget [default: None]
+        previous: allocations made before this run on the days before the dates of problems
+            [default: ()]
+        progress: called in the current process with the solutions so far and problems each time
+            a subproblem is solved - when its chain is done if solving in parallel [default: None]
+        time_budget: if given, seconds to spend improving the selections by local search, split
+            across subproblems by size. Selections are never worse than without [default: None]
+        cache: if given, subproblems whose inputs match an earlier run reuse its solution instead
+            of being solved again. Subproblems solved in worker processes are added to it once
+            their chain is done [default: None]
+
+    Returns:
+        dict: (request id, resource id, points) tuples by (date, top resource group id)
+    """
+    chains = _chains(problems)
+    time_budgets = _time_budgets(problems, time_budget)
+    previous_by_top = _previous_by_top(topology, previous)
+    previous_per_chain = [
+        previous_by_top.get(chain[0].top_resource_group_id, dict())
+        for chain in chains
+    ]
+    topology_key = None if cache is None else topology_fingerprint(topology)
+    solved = dict()
+
+    def on_solved(problem: Subproblem, result: list[tuple[int, int, int]]) -> None:
+        solved[problem.key] = result
+        if progress is not None:
+            progress(solved, problems)
+
+    if workers <= 1 or len(chains) <= 1:
+        return _collect_results(
+            problems,
+            chains,
+            [
+                _solve_chain(
+                    topology,
+                    chain,
+                    strategy,
+                    chain_previous,
+                    on_solved,
+                    time_budgets,
+                    cache,
+                    topology_key,
+                )
+                for chain, chain_previous in zip(chains, previous_per_chain)
+            ],
+            timings,
+        )
+
+    #   Leading subproblems of each chain that are cached are not sent to the workers
+    prefixes = [([], chain_previous) for chain_previous in previous_per_chain]
+    if cache is not None:
+        prefixes = [
+            _cached_prefix(
+                topology, topology_key, chain, strategy, chain_previous, time_budgets, cache,
+            )
+            for chain, chain_previous in zip(chains, previous_per_chain)
+        ]
+
+    for chain, (prefix, _) in zip(chains, prefixes):
+        for problem, (result, _) in zip(chain, prefix):
+            on_solved(problem, result)
+
+    remainders = [chain[len(prefix):] for chain, (prefix, _) in zip(chains, prefixes)]
+
+    #   Spawn rather than fork so that open database connections are not shared with the workers
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chains)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(topology, ),
+    ) as executor:
+        results = []
+        for chain, (prefix, chain_previous), chain_results in zip(chains, prefixes, executor.map(
+            _solve_chain_in_worker,
+            remainders,
+            [strategy] * len(chains),
+            [chain_previous for _, chain_previous in prefixes],
+            [time_budgets] * len(chains),
+        )):
+            remainder = chain[len(prefix):]
+            for problem, (result, _) in zip(remainder, chain_results):
+                on_solved(problem, result)
+
+            if cache is not None:
+                _cache_chain(
+                    topology,
+                    topology_key,
+                    remainder,
+                    strategy,
+                    chain_previous,
+                    time_budgets,
+                    cache,
+                    chain_results,
+                )
+
+            results.append(prefix + chain_results)
+
+        return _collect_results(problems, chains, results, timings)
@@ -0,0 +1,248 @@
+"""
+Compact index of resources, resource groups and their membership
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from resource_allocator.engine.records import GroupRecord, ResourceRecord
+
+
+@dataclass(frozen=True)
+class ResourceTopology:
+    """
+    Resources and resource groups encoded as arrays so that an allocation run never has to walk
+    ORM relationships. Resources and groups are sorted by id and addressed by their position
+
+    Properties:
+        resource_ids: sorted resource ids
+        resource_top_ids: top resource group id of each resource
+        group_ids: sorted resource group ids
+        group_top_ids: top resource group id of each resource group or -1
+        membership: boolean matrix of shape (resources, groups) - whether a resource is linked to a
+            resource group through resource_to_group
+        resource_capacities: number of allocations each resource takes per date - all 1 if not
+            given
+        resource_locations: float matrix of shape (resources, 2) - floor plan coordinates of each
+            resource or NaN if it has none. All NaN if not given
+        proximity_radius: distance within which resources of the same top resource group count as
+            near each other. No proximity if None [default: None]
+    """
+    resource_ids: np.ndarray
+    resource_top_ids: np.ndarray
+    group_ids: np.ndarray
+    group_top_ids: np.ndarray
+    membership: np.ndarray
+    resource_capacities: np.ndarray = field(default=None)
+    resource_locations: np.ndarray = field(default=None)
+    proximity_radius: float | None = None
+
+    def __post_init__(self):
+        if self.resource_capacities is None:
+            object.__setattr__(
+                self, "resource_capacities", np.ones(len(self.resource_ids), dtype=np.int64),
+            )
+
+        if self.resource_locations is None:
+            object.__setattr__(
+                self, "resource_locations", np.full((len(self.resource_ids), 2), np.nan),
+            )
+
+    @classmethod
+    def from_rows(
+        cls,
+        resource_rows: Iterable[tuple[int, int, int | None]],
+        group_rows: Iterable[tuple[int, int | None]],
+        capacities: dict[int, int] | None = None,
+        locations: dict[int, tuple[float, float]] | None = None,
+        proximity_radius: float | None = None,
+    ) -> "ResourceTopology":
+        """
+        Build the topology from plain rows
+
+        Args:
+            resource_rows: (resource id, top resource group id, linked resource group id or None)
+                rows - a resource is repeated once per linked group
+            group_rows: (resource group id, top resource group id or None) rows
+            capacities: capacity by resource id - 1 for resources left out [default: None]
+            locations: (x, y) floor plan coordinates by resource id - none for resources left out
+                [default: None]
+            proximity_radius: see ResourceTopology [default: None]
+
+        Returns:
+            ResourceTopology
+        """
+        resource_tops = dict()
+        links = []
+        for resource_id, top_id, group_id in resource_rows:
+            resource_tops[resource_id] = top_id
+            if group_id is not None:
+                links.append((resource_id, group_id))
+
+        group_tops = {group_id: top_id for group_id, top_id in group_rows}
+        resource_ids = np.array(sorted(resource_tops), dtype=np.int64)
+        group_ids = np.array(sorted(group_tops), dtype=np.int64)
+
+        membership = np.zeros((len(resource_ids), len(group_ids)), dtype=bool)
+        if links:
+            link_array = np.array(links, dtype=np.int64)
+            membership[
+                np.searchsorted(resource_ids, link_array[:, 0]),
+                np.searchsorted(group_ids, link_array[:, 1]),
+            ] = True
+
+        return cls(
+            resource_ids=resource_ids,
+            resource_top_ids=np.array(
+                [resource_tops[id] for id in resource_ids.tolist()], dtype=np.int64,
+            ),
+            group_ids=group_ids,
+            group_top_ids=np.array(
+                [
+                    -1 if group_tops[id] is None else group_tops[id]
+                    for id in group_ids.tolist()
+                ],
+                dtype=np.int64,
+            ),
+            membership=membership,
+            resource_capacities=np.array(
+                [(capacities or dict()).get(id, 1) for id in resource_ids.tolist()],
+                dtype=np.int64,
+            ),
+            resource_locations=np.array(
+                [(locations or dict()).get(id, (np.nan, np.nan)) for id in resource_ids.tolist()],
+                dtype=np.float64,
+            ).reshape(len(resource_ids), 2),
+            proximity_radius=proximity_radius,
+        )
+
+    @classmethod
+    def from_records(
+        cls,
+        resources: Iterable[ResourceRecord],
+        groups: Iterable[GroupRecord],
+        proximity_radius: float | None = None,
+    ) -> "ResourceTopology":
+        """
+        Build the topology from resource and resource group records
+        """
+        resources = list(resources)
+        return cls.from_rows(
+            resource_rows=[
+                (resource.id, resource.top_resource_group_id, group_id)
+                for resource in resources
+                for group_id in resource.group_ids or (None, )
+            ],
+            group_rows=[(group.id, group.top_resource_group_id) for group in groups],
+            capacities={resource.id: resource.capacity for resource in resources},
+            locations={
+                resource.id: resource.location
+                for resource in resources
+                if resource.location is not None
+            },
+            proximity_radius=proximity_radius,
+        )
+
+    @staticmethod
+    def _index(ids: np.ndarray, values: Iterable[int | None]) -> np.ndarray:
+        values = np.array([-1 if value is None else value for value in values], dtype=np.int64)
+        index = np.searchsorted(ids, values)
+        index = np.minimum(index, len(ids) - 1)
+        found = (values >= 0) & (len(ids) > 0)
+        found[found] = ids[index[found]] == values[found]
+        return np.where(found, index, -1)
+
+    def resource_index(self, resource_ids: Iterable[int | None]) -> np.ndarray:
+        """
+        Positions of the given resource ids or -1 for None or unknown ids
+        """
+        return self._index(self.resource_ids, resource_ids)
+
+    def group_index(self, group_ids: Iterable[int | None]) -> np.ndarray:
+        """
+        Positions of the given resource group ids or -1 for None or unknown ids
+        """
+        return self._index(self.group_ids, group_ids)
+
+    def requested_top_ids(
+        self,
+        requested_resources: np.ndarray,
+        requested_groups: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Top resource group id of the requested resource or, failing that, of the requested resource
+        group. -1 if neither is known
+
+        Args:
+            requested_resources: resource positions or -1
+            requested_groups: resource group positions or -1
+
+        Returns:
+            np.ndarray: top resource group ids
+        """
+        result = np.full(len(requested_resources), -1, dtype=np.int64)
+        has_group = requested_groups >= 0
+        result[has_group] = self.group_top_ids[requested_groups[has_group]]
+        has_resource = requested_resources >= 0
+        result[has_resource] = self.resource_top_ids[requested_resources[has_resource]]
+        return result
+
+    @cached_property
+    def _location_trees(self) -> dict[int, tuple[cKDTree, np.ndarray]]:
+        """
+        KD-tree of the located resources of each top resource group and their positions. Built on
+        first use and kept with the topology
+        """
+        located = ~np.isnan(self.resource_locations).any(axis=1)
+        result = dict()
+        for top_id in np.unique(self.resource_top_ids[located]).tolist():
+            positions = np.flatnonzero(located & (self.resource_top_ids == top_id))
+            result[top_id] = cKDTree(self.resource_locations[positions]), positions
+
+        return result
+
+    def near_resources(self, anchors: np.ndarray, resources: np.ndarray) -> np.ndarray:
+        """
+        Whether each of the given resources is within proximity_radius of any anchor resource of
+        each row. Only resources of the anchor's top resource group are near it. Each distinct
+        anchor is a single query of the KD-tree of its top resource group, so no pairwise
+        distances are computed
+
+        Args:
+            anchors: resource positions or -1 of shape (rows, anchors per row)
+            resources: positions of the resources to check
+
+        Returns:
+            np.ndarray: boolean matrix of shape (rows, resources)
+        """
+        result = np.zeros((anchors.shape[0], len(resources)), dtype=bool)
+        if self.proximity_radius is None or not result.size:
+            return result
+
+        columns = np.full(len(self.resource_ids), -1, dtype=np.int64)
+        columns[resources] = np.arange(len(resources))
+
+        #   Columns of the resources near each distinct located anchor
+        unique = np.unique(anchors[anchors >= 0])
+        unique = unique[~np.isnan(self.resource_locations[unique]).any(axis=1)]
+        near = dict()
+        for top_id in np.unique(self.resource_top_ids[unique]).tolist():
+            tree, positions = self._location_trees[top_id]
+            top_anchors = unique[self.resource_top_ids[unique] == top_id]
+            neighbours = tree.query_ball_point(
+                self.resource_locations[top_anchors], self.proximity_radius,
+            )
+            for anchor, items in zip(top_anchors.tolist(), neighbours):
+                found = columns[positions[np.array(items, dtype=np.int64)]]
+                near[anchor] = found[found >= 0]
+
+        rows, slots = np.nonzero(anchors >= 0)
+        for row, anchor in zip(rows.tolist(), anchors[rows, slots].tolist()):
+            if anchor in near:
+                result[row, near[anchor]] = True
+
+        return result
@@ -4,12 +4,77 @@ Main module
 This module is the entry point to the appliation crateing and returning a Flask object
 """
 
-from flask import Flask, request, Response, abort
+from flask import Flask, g, request, Response, abort
 from flask_restful import Api
 
 from resource_allocator.config import Config
-from resource_allocator.db import get_session
+from resource_allocator.db import get_session, has_session, remove_session
+from resource_allocator.managers.user import UserManager
 from resource_allocator.resources.routes import routes
+from resource_allocator.utils.auth import bearer_token, token_user_id
+
+
+def origin_error(origin: str | None, config: Config) -> str | None:
+    """
+    Reason to reject a request sent from origin, if any
+
+    Args:
+        origin: value of the Origin header or None if there is none
+        config: active Config object
+
+    Returns:
+        str | None: error message or None if the request is allowed
+    """
+    if origin is None:
+        return None
+
+    if not config.ALLOWED_ORIGINS:
+        return "No request origins allowed"
+
+    if origin not in config.ALLOWED_ORIGINS:
+        return f"Request origin {origin} not allowed"
+
+    return None
+
+
+def cors_headers(origin: str | None, config: Config) -> list[tuple[str, str]]:
+    """
+    CORS headers of a response to a request sent from origin
+
+    Args:
+        origin: value of the Origin header or None if there is none
+        config: active Config object
+
+    Returns:
+        list[tuple[str, str]]: header names and values - none unless the origin is allowed
+    """
+    if not origin or not config.ALLOWED_ORIGINS or origin not in config.ALLOWED_ORIGINS:
+        #   Errors are handled by origin_error
+        return []
+
+    return [
+        ("Access-Control-Allow-Origin", origin),
+        ("Access-Control-Allow-Headers", ", ".join(["Authorization", "Content-Type"])),
+        (
+            "Access-Control-Allow-Methods",
+            ", ".join(["GET", "HEAD", "POST", "PUT", "DELETE", "PATCH"]),
+        ),
+    ]
+
+
+def request_user_id(config: Config) -> int | None:
+    """
+    Id of the user in the bearer token of the current request. The token is verified but the user
+    is not looked up in the database
+
+    Args:
+        config: active Config object
+
+    Returns:
+        int | None: user id or None if the request has no valid token
+    """
+    token = bearer_token(request.headers.get("Authorization"))
+    return None if token is None else token_user_id(token, secret=config.SECRET)
 
 
 def create_app() -> Flask:
@@ -23,51 +88,84 @@ def create_app() -> Flask:
         flask.Flask: instantiated Flask application
     """
     config = Config.from_environment()
-    sess = get_session()
     app = Flask(__name__)
     api = Api(app)
 
     for route in routes:
         api.add_resource(*route)
 
+    def is_read_only() -> bool:
+        view_class = getattr(app.view_functions.get(request.endpoint), "view_class", None)
+        return request.method in getattr(view_class, "read_only_methods", ())
+
+    def is_sticky() -> bool:
+        #   Reads of a user stay on the primary for DB_REPLICA_STICKINESS seconds after their last
+        #   write, so they see their own writes whichever worker serves them
+        user_id = request_user_id(config)
+        return user_id is not None and UserManager.wrote_recently(
+            user_id, config.DB_REPLICA_STICKINESS,
+        )
+
     @app.before_request
-    def check_origin():
-        origin = request.headers.get("Origin")
-        if origin is None:
-            return
+    def open_session():
+        #   A request closes the session it opened. A session the thread already had belongs to
+        #   the caller, e.g. a test or a script
+        g.owns_session = not has_session()
 
-        if not config.ALLOWED_ORIGINS:
-            abort(400, "No request origins allowed")
+        #   Roll back a session left in a failed transaction by the caller or a previous request
+        sess = get_session()
+        if not sess.is_active:
+            sess.rollback()
 
-        if origin not in config.ALLOWED_ORIGINS:
-            abort(400, f"Request origin {origin} not allowed")
+        read_only = is_read_only()
+        if config.DB_REPLICA_URLS:
+            sess.use_replica = read_only and not is_sticky()
+
+        #   Reads of a session of its own need no transaction: autocommit saves the BEGIN and
+        #   the COMMIT or ROLLBACK round trips
+        if read_only and g.owns_session:
+            _ = sess.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+
+    @app.before_request
+    def check_origin():
+        error = origin_error(request.headers.get("Origin"), config)
+        if error is not None:
+            abort(400, error)
 
     @app.after_request
     def commit(response):
+        #   Only commit what succeeded and wrote something; failed requests leave nothing behind
+        sess = get_session()
+        if response.status_code >= 400:
+            sess.rollback()
+            return response
+
+        if not sess.wrote:
+            return response
+
+        user_id = request_user_id(config) if config.DB_REPLICA_URLS else None
+        if user_id is not None:
+            UserManager.record_write(user_id)
+
         sess.commit()
         return response
 
+    @app.teardown_request
+    def close_session(exception):
+        #   Closing the session rolls back anything the request left uncommitted
+        if g.get("owns_session"):
+            remove_session()
+        elif has_session():
+            sess = get_session()
+            sess.use_replica = False
+            if exception is not None:
+                sess.rollback()
+
     @app.after_request
     def add_cors(response: Response):
-        origin = request.headers.get("Origin")
-        if not origin or not config.ALLOWED_ORIGINS:
-            return response
-
-        if origin not in config.ALLOWED_ORIGINS:
-            #   Error has been handled by check_origin
-            return response
-
-        origin = origin if origin in config.ALLOWED_ORIGINS else config.ALLOWED_ORIGINS[0]
-        response.headers.add("Access-Control-Allow-Origin", origin)
+        for key, value in cors_headers(request.headers.get("Origin"), config):
+            response.headers.add(key, value)
 
-        response.headers.add(
-            "Access-Control-Allow-Headers",
-            ", ".join(["Authorization", "Content-Type"]),
-        )
-        response.headers.add(
-            "Access-Control-Allow-Methods",
-            ", ".join(["GET", "HEAD", "POST", "PUT", "DELETE", "PATCH"]),
-        )
         return response
 
     return app
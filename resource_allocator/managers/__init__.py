@@ -1,4 +1,7 @@
 from resource_allocator.managers.allocation import AllocationManager
+from resource_allocator.managers.allocation_cache import AllocationCacheManager
+from resource_allocator.managers.allocation_job import AllocationJobManager
+from resource_allocator.managers.dirty_cell import DirtyCellManager
 from resource_allocator.managers.image import (
     ImageManager, ImagePropertiesManager, ImageTypeManager,
 )
@@ -10,6 +13,9 @@ from resource_allocator.managers.user import UserManager, AuthManager
 
 __all__ = [
     AllocationManager,
+    AllocationCacheManager,
+    AllocationJobManager,
+    DirtyCellManager,
     ImageManager,
     ImagePropertiesManager,
     ImageTypeManager,
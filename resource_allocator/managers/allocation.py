@@ -2,22 +2,72 @@
 Allocation manager
 """
 
-from sqlalchemy import select
-
+from collections.abc import Iterable
+import datetime as dt
+import logging
+import time
+
+import numpy as np
+from sqlalchemy import and_, delete, func, insert, or_, select, true, tuple_, update
+from sqlalchemy.orm import aliased
+
+from resource_allocator.config import Config
+from resource_allocator.engine import (
+    Allocation,
+    GroupRecord,
+    ProgressCallback,
+    RequestRecord,
+    ResourceRecord,
+    ResourceTopology,
+    SolutionCache,
+    allocate,
+    score_matrix,
+    strategies,
+)
 from resource_allocator.models import (
     AllocationModel,
+    ImagePropertiesModel,
     IterationModel,
+    ResourceGroupModel,
     ResourceModel,
+    ResourceToGroupModel,
     RequestModel,
     RequestStatusEnum,
+    RequestStatusModel,
 )
+from resource_allocator.managers.allocation_cache import AllocationCacheManager
 from resource_allocator.managers.base import BaseManager
+from resource_allocator.managers.dirty_cell import DirtyCellManager
 from resource_allocator.managers.iteration import IterationManager
 from resource_allocator.managers.request import RequestManager
 
 
+logger = logging.getLogger(__name__)
+
+
 class AllocationManager(BaseManager):
     model = AllocationModel
+    _solution_cache: SolutionCache | None = None
+
+    @classmethod
+    def solution_cache(cls, read_only: bool = False) -> SolutionCache | None:
+        """
+        Solution cache shared by the allocation runs of this process as configured by
+        ALLOCATION_CACHE_SIZE and ALLOCATION_CACHE_TABLE or None if caching is off. A read_only
+        cache does not write solutions to the table
+        """
+        config = Config.get_instance()
+        if config.ALLOCATION_CACHE_SIZE <= 0 and not config.ALLOCATION_CACHE_TABLE:
+            return None
+
+        store = AllocationCacheManager if config.ALLOCATION_CACHE_TABLE else None
+        size = max(config.ALLOCATION_CACHE_SIZE, 0)
+        cache = cls._solution_cache
+        if cache is None or cache.maxsize != size or cache.store is not store:
+            cache = SolutionCache(size, store)
+            cls._solution_cache = cache
+
+        return cache.read_only() if read_only else cache
 
     @classmethod
     def create_item(cls, data: dict) -> AllocationModel:
@@ -25,6 +75,8 @@ class AllocationManager(BaseManager):
         Create allocation and set status to completed
         """
         allocation: AllocationModel = super().create_item(data)
+        cls._check_capacity([(allocation.date, allocation.allocated_resource_id)])
+        DirtyCellManager.mark_allocations([allocation.id])
         if not allocation.source_request_id:
             return allocation
 
@@ -44,199 +96,666 @@ class AllocationManager(BaseManager):
             AllocationModel
         """
         allocation: AllocationModel = cls.list_single_item(id)
+        DirtyCellManager.mark_allocations([id])
         if allocation.source_request_id:
             RequestManager.decline(allocation.source_request_id, delete_allocation=False)
         return super().delete_item(id)
 
     @classmethod
-    def _assign_points(cls, request: RequestModel, resource: ResourceModel) -> int:
-        points = 0
+    def modify_item(cls, id: int, data: dict) -> AllocationModel:
+        """
+        Modify an allocation and mark the cells it leaves and moves to as dirty
+        """
+        DirtyCellManager.mark_allocations([id])
+        allocation = super().modify_item(id, data)
+        if allocation is not None:
+            cls._check_capacity([(allocation.date, allocation.allocated_resource_id)])
 
-        #   If this is the exact resource being requested, add 2 points
-        points += 2 * (request.requested_resource == resource)
+        DirtyCellManager.mark_allocations([id])
+        return allocation
 
-        #   If the resource's groups and the request groups overlap,
-        #   add 10 points
-        points += 10 * (
-            request.requested_resource is not None
-            and (
-                set(request.requested_resource.resource_groups)
-                & set(resource.resource_groups) != set()
-            )
-        )
-        points += 10 * (
-            request.requested_resource_group_id in [
-                item.id
-                for item
-                in resource.resource_groups
-            ]
+    @classmethod
+    def _check_capacity(cls, cells: Iterable[tuple[dt.date, int | None]]) -> None:
+        """
+        Lock the resources of written (date, resource id) cells and raise a ValueError if any of
+        them holds more allocations than its capacity. The locks are held until the transaction
+        ends, so transactions that allocate the same resources check one after the other and each
+        counts the allocations committed before it. FOR NO KEY UPDATE does not wait for the key
+        share locks that inserting allocations takes on their resources
+        """
+        cells = sorted({(date, resource_id) for date, resource_id in cells if resource_id})
+        if not cells:
+            return
+
+        capacities = dict(cls.sess.execute(
+            select(ResourceModel.id, ResourceModel.capacity)
+            .where(ResourceModel.id.in_({resource_id for _, resource_id in cells}))
+            .order_by(ResourceModel.id)
+            .with_for_update(key_share=True)
+        ).tuples().all())
+        counts = cls.sess.execute(
+            select(AllocationModel.date, AllocationModel.allocated_resource_id, func.count())
+            .where(tuple_(AllocationModel.date, AllocationModel.allocated_resource_id).in_(cells))
+            .group_by(AllocationModel.date, AllocationModel.allocated_resource_id)
+        ).tuples().all()
+        for date, resource_id, count in counts:
+            if count > capacities[resource_id]:
+                raise ValueError(
+                    f"Resource {resource_id} is allocated beyond its capacity for date {date}"
+                )
+
+    @staticmethod
+    def _location_columns() -> tuple:
+        """
+        Floor plan coordinates of a resource: the centre of the box of its image properties
+        """
+        return (
+            (ImagePropertiesModel.box_x + ImagePropertiesModel.box_width / 2).label("x"),
+            (ImagePropertiesModel.box_y + ImagePropertiesModel.box_height / 2).label("y"),
         )
 
-        #   Add some points if located in the same top-level resource group
-        points += 5 * (
-            (
-                request.requested_resource is not None
-                and request.requested_resource.top_resource_group_id ==
-                resource.top_resource_group_id
+    @classmethod
+    def _load_resources(cls) -> tuple[list[ResourceRecord], list[GroupRecord]]:
+        """
+        Load all resources, resource groups and their links in two queries
+        """
+        resource_tops = dict()
+        resource_groups = dict()
+        for resource_id, top_id, capacity, x, y, group_id in cls.sess.execute(
+            select(
+                ResourceModel.id,
+                ResourceModel.top_resource_group_id,
+                ResourceModel.capacity,
+                *cls._location_columns(),
+                ResourceToGroupModel.resource_group_id,
             )
-            or (
-                request.requested_resource is None
-                and request.requested_resource_group.top_resource_group_id ==
-                resource.top_resource_group_id
+            .outerjoin(ResourceToGroupModel, ResourceToGroupModel.resource_id == ResourceModel.id)
+            .outerjoin(
+                ImagePropertiesModel,
+                ImagePropertiesModel.id == ResourceModel.image_properties_id,
             )
-        )
-        #   If a user has been granted this resource in the previous day's alloaction,
-        #   add an extra 2 points
-        #   TODO
+            .order_by(ResourceModel.id)
+        ):
+            location = None if x is None else (x, y)
+            resource_tops[resource_id] = top_id, capacity, location
+            group_ids = resource_groups.setdefault(resource_id, [])
+            if group_id is not None:
+                group_ids.append(group_id)
+
+        resources = [
+            ResourceRecord(id, top_id, tuple(resource_groups[id]), capacity, location)
+            for id, (top_id, capacity, location) in resource_tops.items()
+        ]
+        groups = [
+            GroupRecord(id, top_id)
+            for id, top_id in cls.sess.execute(
+                select(ResourceGroupModel.id, ResourceGroupModel.top_resource_group_id)
+            )
+        ]
+        return resources, groups
+
+    @classmethod
+    def _load_records(
+        cls,
+        iteration_id: int,
+        dates: list[dt.date] | None = None,
+    ) -> tuple[
+        list[RequestRecord], list[ResourceRecord], list[GroupRecord], dict, list[Allocation],
+    ]:
+        """
+        Read everything an allocation run of an iteration needs in a fixed number of queries
+
+        Args:
+            iteration_id: id of the iteration
+            dates: if given, only requests for these dates are loaded [default: None]
+
+        Returns:
+            tuple of the non-completed requests, all resources, all resource groups, the ids of
+            the already allocated resources by date and the allocations on the day before each
+            requested date
+        """
+        resources, groups = cls._load_resources()
 
-        return points
+        #   Limit to non-completed requests
+        rows = cls.sess.execute(
+            select(
+                RequestModel.id,
+                RequestModel.user_id,
+                RequestModel.requested_date,
+                RequestModel.requested_resource_id,
+                RequestModel.requested_resource_group_id,
+                RequestStatusModel.request_status,
+            )
+            .join(RequestStatusModel, RequestStatusModel.id == RequestModel.request_status_id)
+            .where(
+                RequestModel.iteration_id == iteration_id,
+                RequestStatusModel.request_status != RequestStatusEnum.completed.value,
+                RequestModel.requested_date.in_(dates) if dates is not None else true(),
+            )
+            .order_by(RequestModel.id)
+        ).all()
+
+        #   Get all dates being requested
+        all_dates = sorted(list({
+            row.requested_date for row in rows
+        }))
+
+        #   Allocations of the iteration on the requested dates - manual ones included - and of any
+        #   iteration on the day before each requested date for the continuity points
+        previous_dates = {date - dt.timedelta(days=1) for date in all_dates}
+        already_allocated_dates = set(all_dates)
+        allocation_rows = cls.sess.execute(
+            select(
+                AllocationModel.iteration_id,
+                AllocationModel.date,
+                AllocationModel.source_request_id,
+                AllocationModel.user_id,
+                AllocationModel.allocated_resource_id,
+                AllocationModel.points,
+            )
+            .where(or_(
+                and_(
+                    AllocationModel.iteration_id == iteration_id,
+                    AllocationModel.date.in_(all_dates),
+                ),
+                AllocationModel.date.in_(sorted(previous_dates)),
+            ))
+        ).all()
+        already_allocated = dict()
+        previous = []
+        for row in allocation_rows:
+            if row.iteration_id == iteration_id and row.date in already_allocated_dates:
+                already_allocated.setdefault(row.date, []).append(row.allocated_resource_id)
+
+            if row.date in previous_dates:
+                previous.append(Allocation(*row[1:]))
+
+        requests = [
+            RequestRecord(
+                id=row.id,
+                user_id=row.user_id,
+                date=row.requested_date,
+                requested_resource_id=row.requested_resource_id,
+                requested_resource_group_id=row.requested_resource_group_id,
+                pending=row.request_status == RequestStatusEnum.new.value,
+            )
+            for row in rows
+        ]
+        return requests, resources, groups, already_allocated, previous
 
     @classmethod
-    def _remove_requests(
+    def _persist_allocations(
         cls,
-        request: RequestModel,
-        resource: ResourceModel,
-        points: dict[tuple[RequestModel, ResourceModel], int],
-    ):
-        new_points = {}
-        for (points_request, points_resource), value in points.items():
-            points_request: RequestModel
-            points_resource: ResourceModel
-
-            if points_resource.id == resource.id:
-                continue
+        iteration_id: int,
+        allocations: list[Allocation],
+        declined_request_ids: list[int],
+    ) -> list[AllocationModel]:
+        """
+        Insert allocations and set the statuses of their source requests to completed and of the
+        declined requests to declined. Uses a constant number of statements regardless of the number
+        of allocations
 
-            if (
-                points_request.requested_resource_id is not None
-                and points_request.user_id == request.user_id
-                and points_request.requested_resource.top_resource_group_id ==
-                resource.top_resource_group_id
-            ):
-                continue
+        Args:
+            iteration_id: id of the iteration
+            allocations: allocations to insert
+            declined_request_ids: ids of the requests to decline
 
-            if (
-                points_request.requested_resource_group_id is not None
-                and points_request.user_id == request.user_id
-                and points_request.requested_resource_group.top_resource_group_id ==
-                resource.top_resource_group_id
-            ):
+        Returns:
+            list of the created AllocationModel objects in the order of allocations
+        """
+        statuses = dict(cls.sess.execute(
+            select(RequestStatusModel.request_status, RequestStatusModel.id)
+            .where(RequestStatusModel.request_status.in_([
+                RequestStatusEnum.completed.value,
+                RequestStatusEnum.declined.value,
+            ]))
+        ).tuples().all())
+
+        result = []
+        if allocations:
+            result = list(cls.sess.scalars(
+                insert(AllocationModel)
+                .returning(AllocationModel, sort_by_parameter_order=True),
+                [{"iteration_id": iteration_id, **item._asdict()} for item in allocations],
+            ))
+            cls._check_capacity((item.date, item.allocated_resource_id) for item in allocations)
+
+        fulfilled_request_ids = [item.source_request_id for item in allocations]
+        for request_ids, status in (
+            (fulfilled_request_ids, RequestStatusEnum.completed),
+            (declined_request_ids, RequestStatusEnum.declined),
+        ):
+            if not request_ids:
                 continue
 
-            new_points[(points_request, points_resource)] = value
+            cls.sess.execute(
+                update(RequestModel)
+                .where(RequestModel.id.in_(request_ids))
+                .values(request_status_id=statuses[status.value])
+                .execution_options(synchronize_session=False)
+            )
 
-        return new_points
+        #   Objects loaded before the bulk writes still hold the old statuses and allocations
+        cls._expire_loaded(RequestModel, fulfilled_request_ids + declined_request_ids)
+        cls._expire_loaded(IterationModel, [iteration_id])
+        return result
 
     @classmethod
-    def automatic_allocation(cls, data: dict) -> list[AllocationModel]:
+    def _expire_loaded(cls, model: type, ids: Iterable[int]) -> None:
         """
-        Generate optimal allocations of resources to users to dates based on requests sent by the
-        users priod to the allocation
+        Expire the objects of model with the given ids that are already in the session without
+        loading the others
         """
-        #   Get the iteration being worked on and associated requests
-        iteration = cls.sess.get(IterationModel, data["iteration_id"])
-        all_resources = cls.sess.query(ResourceModel).all()
+        sess = cls.sess
+        for id in ids:
+            item = sess.identity_map.get(sess.identity_key(model, id))
+            if item is not None:
+                sess.expire(item)
 
-        #   Handle all requests or a single request - limit to non-completed requests
-        if "request_id" in data:
-            all_requests = [RequestManager.list_single_item(data["request_id"])]
-        else:
-            all_requests = iteration.requests
-
-        all_requests = [
-            item
-            for item
-            in all_requests
-            if item.request_status.request_status != RequestStatusEnum.completed.value
-        ]
+    @classmethod
+    def _plan_request(
+        cls,
+        iteration_id: int,
+        request_id: int,
+        timings: dict[str, float],
+    ) -> tuple[list[Allocation], list[int]]:
+        """
+        Allocation of a single request of an already allocated iteration. Only the free resources
+        of the requested top resource group on the requested date are loaded - the scoring rules
+        and constraints are the same as for a full run with a single request
 
-        #   Get all dates being requested
-        all_dates = sorted(list({
-            request.requested_date for request in all_requests
-        }))
-        allocation = dict()
+        Args:
+            iteration_id: id of the iteration
+            request_id: id of the request
+            timings: receives the seconds spent on each phase
 
-        #   Get a list of resources that are already allocated
-        already_allocated_rows = list(cls.sess.execute(
+        Returns:
+            tuple of the allocations and the ids of the requests to decline
+        """
+        start_time = time.perf_counter()
+        requested_resource = aliased(ResourceModel)
+        requested_group = aliased(ResourceGroupModel)
+        request = cls.sess.execute(
             select(
-                AllocationModel.date,
-                AllocationModel.allocated_resource_id,
+                RequestModel.id,
+                RequestModel.user_id,
+                RequestModel.requested_date,
+                RequestModel.requested_resource_id,
+                RequestModel.requested_resource_group_id,
+                RequestStatusModel.request_status,
+                func.coalesce(
+                    requested_resource.top_resource_group_id,
+                    requested_group.top_resource_group_id,
+                ).label("top_resource_group_id"),
             )
+            .join(RequestStatusModel, RequestStatusModel.id == RequestModel.request_status_id)
+            .outerjoin(
+                requested_resource,
+                requested_resource.id == RequestModel.requested_resource_id,
+            )
+            .outerjoin(
+                requested_group,
+                requested_group.id == RequestModel.requested_resource_group_id,
+            )
+            .where(RequestModel.id == request_id, RequestModel.iteration_id == iteration_id)
+        ).one_or_none()
+        if request is None or request.request_status == RequestStatusEnum.completed.value:
+            return [], []
+
+        #   Resources of the top group with capacity left on the date - a count over the
+        #   (iteration_id, date, allocated_resource_id) index. The requested resource and the
+        #   resource the user had on the previous day are loaded even if full since they score the
+        #   others. Nothing is loaded if the user already holds a resource in the top group.
+        #   Resources the user had on the previous day are flagged for the continuity points
+        is_free = (
+            select(func.count(AllocationModel.id))
             .where(
-                AllocationModel.iteration_id == iteration.id,
-                AllocationModel.date.in_(all_dates),
-            )
-        ))
-        already_allocated = {row.date: [] for row in already_allocated_rows}
-        for row in already_allocated_rows:
-            already_allocated[row.date].append(row.allocated_resource_id)
-
-        #   Loop over each day of the iteration
-        for date in all_dates:
-            requests = [
-                request
-                for request
-                in all_requests
-                if request.requested_date == date
-            ]
-            points = dict()
-
-            #   Loop over each resource
-            for resource in all_resources:
-                #   Skip resources that are already allocated
-                if resource.id in already_allocated.get(date, []):
-                    continue
-
-                #   Assign user points
-                for request in requests:
-                    key = (request, resource)
-                    points[key] = cls._assign_points(request, resource)
-
-            allocation[date] = []
-
-            while points:
-                max_points = max(points.values())
-                cur_allocation = next(
-                    (key for key, value in points.items() if value == max_points and value > 0),
-                    None,
-                )
-                if not cur_allocation:
-                    break
+                AllocationModel.iteration_id == iteration_id,
+                AllocationModel.date == request.requested_date,
+                AllocationModel.allocated_resource_id == ResourceModel.id,
+            )
+            .scalar_subquery()
+        ) < ResourceModel.capacity
+        user_resource = aliased(ResourceModel)
+        user_allocated = (
+            select(AllocationModel.id)
+            .join(user_resource, user_resource.id == AllocationModel.allocated_resource_id)
+            .where(
+                AllocationModel.iteration_id == iteration_id,
+                AllocationModel.date == request.requested_date,
+                AllocationModel.user_id == request.user_id,
+                user_resource.top_resource_group_id == request.top_resource_group_id,
+            )
+            .exists()
+        )
+        previous_day = (
+            select(AllocationModel.id)
+            .where(
+                AllocationModel.date == request.requested_date - dt.timedelta(days=1),
+                AllocationModel.user_id == request.user_id,
+                AllocationModel.allocated_resource_id == ResourceModel.id,
+            )
+            .exists()
+        )
+        rows = cls.sess.execute(
+            select(
+                ResourceModel.id,
+                ResourceModel.top_resource_group_id,
+                ResourceToGroupModel.resource_group_id,
+                is_free.label("is_free"),
+                previous_day.label("is_previous"),
+                *cls._location_columns(),
+            )
+            .outerjoin(ResourceToGroupModel, ResourceToGroupModel.resource_id == ResourceModel.id)
+            .outerjoin(
+                ImagePropertiesModel,
+                ImagePropertiesModel.id == ResourceModel.image_properties_id,
+            )
+            .where(
+                ResourceModel.top_resource_group_id == request.top_resource_group_id,
+                or_(is_free, ResourceModel.id == request.requested_resource_id, previous_day),
+                ~user_allocated,
+            )
+        ).all()
+
+        score_time = time.perf_counter()
+        group_ids = {row.resource_group_id for row in rows} | {request.requested_resource_group_id}
+        topology = ResourceTopology.from_rows(
+            resource_rows=[row[:3] for row in rows],
+            group_rows=[(id, None) for id in group_ids if id is not None],
+            locations={row.id: (row.x, row.y) for row in rows if row.x is not None},
+            proximity_radius=Config.get_instance().ALLOCATION_PROXIMITY_RADIUS,
+        )
+        resources = topology.resource_index(sorted({row.id for row in rows if row.is_free}))
+        requested_resources = topology.resource_index([request.requested_resource_id])
+        previous_resources = topology.resource_index(
+            [next((row.id for row in rows if row.is_previous), None)]
+        )
+        points = score_matrix(
+            membership=topology.membership,
+            resource_top_ids=topology.resource_top_ids,
+            requested_resources=requested_resources,
+            requested_groups=topology.group_index([request.requested_resource_group_id]),
+            requested_top_ids=np.array([request.top_resource_group_id], dtype=np.int64),
+            resources=resources,
+            previous_resources=previous_resources,
+            near=topology.near_resources(
+                np.stack([requested_resources, previous_resources], axis=1), resources,
+            ),
+        )[0]
+
+        #   Best resource, lowest id on ties
+        select_time = time.perf_counter()
+        allocation = []
+        if points.size and points.max() > 0:
+            column = int(np.argmax(points))
+            allocation = [Allocation(
+                date=request.requested_date,
+                source_request_id=request.id,
+                user_id=request.user_id,
+                allocated_resource_id=int(topology.resource_ids[resources[column]]),
+                points=int(points[column]),
+            )]
+
+        declined = []
+        if not allocation and request.request_status == RequestStatusEnum.new.value:
+            declined = [request.id]
+
+        timings["load"] = score_time - start_time
+        timings["score"] = select_time - score_time
+        timings["select"] = time.perf_counter() - select_time
+        return allocation, declined
 
-                request, resource = cur_allocation
-                #   Set request status - handled below by cls.create_item
-                request = RequestManager.approve(request.id, create_allocation=False)
+    @classmethod
+    def _plan_iteration(
+        cls,
+        iteration_id: int,
+        strategy: str,
+        timings: dict[str, float],
+        progress: ProgressCallback | None = None,
+        time_budget: float | None = None,
+        dates: list[dt.date] | None = None,
+        dry_run: bool = False,
+    ) -> tuple[list[Allocation], list[int]]:
+        """
+        Allocation of all non-completed requests of an iteration
 
-                #   Add to allocations
-                allocation[date].append({
-                    "allocated_resource_id": resource.id,
-                    "user_id": request.user_id,
-                    "points": max_points,
-                    "source_request_id": request.id,
-                })
+        Args:
+            iteration_id: id of the iteration
+            strategy: name of the selection strategy - one of engine.strategies
+            timings: receives the seconds spent on each phase
+            progress: called each time a (date, top resource group) part is solved [default: None]
+            time_budget: if given, seconds to spend improving the allocation by local search
+                [default: None]
+            dates: if given, only requests for these dates are allocated [default: None]
+            dry_run: whether to leave the solution cache table as it is [default: False]
 
-                #   Remove resource and user requests for the same top resource group id
-                points = cls._remove_requests(request, resource, points)
+        Returns:
+            tuple of the allocations and the ids of the requests to decline
+        """
+        start_time = time.perf_counter()
+        requests, resources, groups, allocated, previous = cls._load_records(iteration_id, dates)
+        timings["load"] = time.perf_counter() - start_time
+        cache = cls.solution_cache(read_only=dry_run)
+        hits = 0 if cache is None else cache.hits
+        result = allocate(
+            requests,
+            resources,
+            groups,
+            allocated=allocated,
+            strategy=strategy,
+            workers=Config.get_instance().ALLOCATION_WORKERS,
+            timings=timings,
+            previous=previous,
+            progress=progress,
+            time_budget=time_budget,
+            cache=cache,
+            proximity_radius=Config.get_instance().ALLOCATION_PROXIMITY_RADIUS,
+        )
+        if cache is not None:
+            logger.info(f"Reused {cache.hits - hits} cached parts for iteration {iteration_id}")
 
-        #   Add the allocations using the post interface
-        result = []
-        for date, allocation_list in allocation.items():
-            result.extend([
-                cls.create_item({
-                    **item,
-                    "date": date,
-                    "iteration_id":
-                    iteration.id
-                }) for item in allocation_list
-            ])
-
-        #   Decline leftover requests
-        fulfilled_request_ids = [item.source_request_id for item in result]
-        leftover = [item for item in all_requests if item.id not in fulfilled_request_ids]
-        for item in leftover:
-            RequestManager.decline(item.id)
+        return result
+
+    @classmethod
+    def _plan_allocation(
+        cls,
+        data: dict,
+        timings: dict[str, float],
+        progress: ProgressCallback | None = None,
+        dates: list[dt.date] | None = None,
+        dry_run: bool = False,
+    ) -> tuple[list[Allocation], list[int]]:
+        """
+        Allocation of a whole iteration - or of its requests for dates - or of the single request
+        given by a "request_id" key. A "time_budget_ms" key bounds the local search that improves
+        the allocation of an iteration. The number of local search moves is added to timings under
+        "search_iterations". A dry run only reads from the solution cache table
+        """
+        strategy = data.get("strategy", "greedy")
+        if strategy not in strategies:
+            raise ValueError(f"Invalid strategy: {strategy}. Choose one of {list(strategies)}")
+
+        if "request_id" in data:
+            return cls._plan_request(data["iteration_id"], data["request_id"], timings)
+
+        time_budget = data.get("time_budget_ms")
+        return cls._plan_iteration(
+            data["iteration_id"],
+            strategy,
+            timings,
+            progress,
+            time_budget / 1000 if time_budget is not None else None,
+            dates,
+            dry_run,
+        )
+
+    @classmethod
+    def allocate_request(cls, iteration_id: int, request_id: int) -> list[AllocationModel]:
+        """
+        Allocate a single request of an already allocated iteration without a full run
+
+        Args:
+            iteration_id: id of the iteration
+            request_id: id of the request
+
+        Returns:
+            list with the created AllocationModel or an empty list if the request is declined or
+            already completed
+        """
+        allocations, declined = cls._plan_request(iteration_id, request_id, dict())
+        return cls._persist_allocations(iteration_id, allocations, declined)
+
+    @classmethod
+    def automatic_allocation(
+        cls,
+        data: dict,
+        progress: ProgressCallback | None = None,
+        stats: dict | None = None,
+    ) -> list[AllocationModel]:
+        """
+        Generate optimal allocations of resources to users to dates based on requests sent by the
+        users priod to the allocation. The "strategy" key selects either greedy selection or an
+        optimal assignment that maximises the total points of each date. A "time_budget_ms" key
+        spends up to that many milliseconds improving the selection by local search. A
+        "request_id" key allocates just that request like allocate_request. progress is called
+        each time a (date, top resource group) part of a whole iteration is solved. If given, stats
+        receives the number of local search moves under "iterations" and the seconds spent on each
+        phase under "timings"
+        """
+        timings = dict()
+        allocations, declined = cls._plan_allocation(data, timings, progress)
+        iterations = timings.pop("search_iterations", 0)
+
+        start_time = time.perf_counter()
+        result = cls._persist_allocations(data["iteration_id"], allocations, declined)
 
         #   Close iteration for new requests - if not allocating a single request
         if "request_id" not in data:
-            IterationManager.modify_item(iteration.id, {"is_allocated": True})
+            IterationManager.modify_item(data["iteration_id"], {"is_allocated": True})
+            DirtyCellManager.clear(data["iteration_id"])
+
+        timings["persist"] = time.perf_counter() - start_time
+        logger.info(
+            f"Automatic allocation for iteration {data['iteration_id']} using strategy "
+            f"{data.get('strategy', 'greedy')}: {len(result)} allocations, "
+            f"{sum(item.points for item in result)} total points, {iterations} search iterations, "
+            "timings: "
+            + ", ".join(f"{key} {value:.3f}s" for key, value in timings.items())
+        )
+        if stats is not None:
+            stats["iterations"] = iterations
+            stats["timings"] = timings
 
         return result
+
+    @classmethod
+    def _release_cells(cls, iteration_id: int, cells: list[tuple[dt.date, int]]) -> None:
+        """
+        Delete the allocations made from requests in (date, top resource group id) cells of an
+        iteration and set the requests that lost their allocation or are not completed back to new.
+        Manual allocations without a source request are kept and keep their resources taken
+        """
+        allocation_top_id = (
+            select(ResourceModel.top_resource_group_id)
+            .where(ResourceModel.id == AllocationModel.allocated_resource_id)
+            .scalar_subquery()
+        )
+        released = cls.sess.execute(
+            delete(AllocationModel)
+            .where(
+                AllocationModel.iteration_id == iteration_id,
+                AllocationModel.source_request_id.is_not(None),
+                tuple_(AllocationModel.date, allocation_top_id).in_(cells),
+            )
+            .returning(AllocationModel.id, AllocationModel.source_request_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        statuses = dict(cls.sess.execute(
+            select(RequestStatusModel.request_status, RequestStatusModel.id)
+            .where(RequestStatusModel.request_status.in_([
+                RequestStatusEnum.new.value,
+                RequestStatusEnum.completed.value,
+            ]))
+        ).tuples().all())
+
+        #   Completed requests that kept their allocation stay completed
+        request_ids = cls.sess.scalars(
+            update(RequestModel)
+            .where(
+                RequestModel.iteration_id == iteration_id,
+                tuple_(RequestModel.requested_date, DirtyCellManager.request_top_id()).in_(cells),
+                or_(
+                    RequestModel.id.in_([row.source_request_id for row in released]),
+                    RequestModel.request_status_id != statuses[RequestStatusEnum.completed.value],
+                ),
+            )
+            .values(request_status_id=statuses[RequestStatusEnum.new.value])
+            .returning(RequestModel.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        cls._expire_loaded(AllocationModel, [row.id for row in released])
+        cls._expire_loaded(RequestModel, request_ids)
+
+    @classmethod
+    def reallocate(cls, data: dict) -> dict:
+        """
+        Re-optimize only the dirty cells of an allocated iteration. The allocations made from
+        requests in each dirty (date, top resource group) cell are dropped and the requests of the
+        cell are allocated again around the manual allocations, with the rest of the iteration left
+        as it is. Takes the same "strategy" and "time_budget_ms" keys as automatic_allocation
+
+        Args:
+            data: dict with the "iteration_id" and optionally "strategy" and "time_budget_ms"
+
+        Returns:
+            dict with the re-optimized "cells" as (date, top resource group id) tuples, the created
+            "allocations" and the "declined_request_ids"
+        """
+        iteration_id = data["iteration_id"]
+        cells = DirtyCellManager.list_cells(iteration_id)
+        if not cells:
+            return {"cells": [], "allocations": [], "declined_request_ids": []}
+
+        cls._release_cells(iteration_id, cells)
+        timings = dict()
+        allocations, declined = cls._plan_allocation(
+            {key: value for key, value in data.items() if key != "request_id"},
+            timings,
+            dates=sorted({date for date, _ in cells}),
+        )
+        result = cls._persist_allocations(iteration_id, allocations, declined)
+        DirtyCellManager.clear(iteration_id, cells)
+        logger.info(
+            f"Reallocated {len(cells)} dirty cells of iteration {iteration_id}: "
+            f"{len(result)} allocations, {sum(item.points for item in result)} total points"
+        )
+        return {"cells": cells, "allocations": result, "declined_request_ids": declined}
+
+    @classmethod
+    def simulate_allocation(cls, data: dict) -> dict:
+        """
+        Dry run of automatic_allocation - the same data is read and the same allocations are
+        proposed, but nothing is written
+
+        Args:
+            data: same as for automatic_allocation
+
+        Returns:
+            dict with the proposed "allocations", "declined_request_ids", "total_points", the number
+            of local search moves under "iterations" and the seconds spent on each phase under
+            "timings"
+        """
+        timings = dict()
+        allocations, declined = cls._plan_allocation(data, timings, dry_run=True)
+        iterations = timings.pop("search_iterations", 0)
+        return {
+            "allocations": [
+                {"iteration_id": data["iteration_id"], **item._asdict()}
+                for item in allocations
+            ],
+            "declined_request_ids": declined,
+            "total_points": sum(item.points for item in allocations),
+            "iterations": iterations,
+            "timings": {**timings, "persist": 0.0},
+        }
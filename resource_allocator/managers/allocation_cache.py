@@ -0,0 +1,57 @@
+"""
+Allocation cache manager - table tier of the engine's solution cache
+"""
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from resource_allocator.config import Config
+from resource_allocator.models import AllocationCacheModel
+from resource_allocator.managers.base import BaseManager
+
+
+class AllocationCacheManager(BaseManager):
+    """
+    Stores subproblem solutions by fingerprint so that they can be reused by other processes and
+    after restarts. Satisfies engine.cache.SolutionStore
+    """
+    model = AllocationCacheModel
+
+    @classmethod
+    def get(cls, key: str) -> list[tuple[int, int, int]] | None:
+        """
+        Solution stored under a fingerprint or None
+        """
+        solution = cls.sess.scalar(
+            select(AllocationCacheModel.solution).where(AllocationCacheModel.fingerprint == key)
+        )
+        return None if solution is None else [tuple(item) for item in solution]
+
+    @classmethod
+    def put(cls, key: str, solution: list[tuple[int, int, int]]) -> None:
+        """
+        Store a solution and drop the oldest ones beyond ALLOCATION_CACHE_TABLE_SIZE. It is
+        committed on its own connection so that it is kept even if the allocation run that
+        produced it is rolled back. Dry runs only read
+        """
+        size = Config.get_instance().ALLOCATION_CACHE_TABLE_SIZE
+        with cls.sess.get_bind().begin() as conn:
+            conn.execute(
+                insert(AllocationCacheModel)
+                .values(fingerprint=key, solution=[list(item) for item in solution])
+                .on_conflict_do_nothing(index_elements=[AllocationCacheModel.fingerprint])
+            )
+            if size <= 0:
+                return
+
+            #   Newest id that no longer fits - NULL and no rows deleted while under the size
+            newest_dropped = (
+                select(AllocationCacheModel.id)
+                .order_by(AllocationCacheModel.id.desc())
+                .offset(size)
+                .limit(1)
+                .scalar_subquery()
+            )
+            conn.execute(
+                delete(AllocationCacheModel).where(AllocationCacheModel.id <= newest_dropped)
+            )
@@ -0,0 +1,239 @@
+"""
+Allocation job manager - automatic allocations run by a background worker
+"""
+
+import datetime as dt
+import logging
+import threading
+import time
+
+from sqlalchemy import func, select, update
+
+from resource_allocator.config import Config
+from resource_allocator.engine import ProgressCallback
+from resource_allocator.models import AllocationJobModel, JobStatusEnum, JobStatusModel
+from resource_allocator.managers.allocation import AllocationManager
+from resource_allocator.managers.base import BaseManager
+
+
+logger = logging.getLogger(__name__)
+
+
+class AllocationJobManager(BaseManager):
+    model = AllocationJobModel
+
+    @classmethod
+    def _status_id(cls, status: JobStatusEnum) -> int:
+        return cls.sess.scalar(
+            select(JobStatusModel.id).where(JobStatusModel.job_status == status.value)
+        )
+
+    @classmethod
+    def submit(cls, data: dict) -> AllocationJobModel:
+        """
+        Queue an automatic allocation. The job is picked up by a worker once the session is
+        committed
+
+        Args:
+            data: same as for AllocationManager.automatic_allocation
+
+        Returns:
+            the created AllocationJobModel
+        """
+        return cls.create_item({
+            "iteration_id": data["iteration_id"],
+            "request_id": data.get("request_id"),
+            "strategy": data.get("strategy", "greedy"),
+            "time_budget_ms": data.get("time_budget_ms"),
+            "job_status_id": cls._status_id(JobStatusEnum.queued),
+        })
+
+    @classmethod
+    def fail_stale(cls) -> list[int]:
+        """
+        Mark running jobs without a heartbeat for ALLOCATION_JOB_TIMEOUT seconds as failed and
+        commit. Their worker has stopped, so they would otherwise stay running forever
+
+        Returns:
+            ids of the failed jobs
+        """
+        timeout = dt.timedelta(seconds=Config.get_instance().ALLOCATION_JOB_TIMEOUT)
+        ids = cls.sess.scalars(
+            update(AllocationJobModel)
+            .where(
+                AllocationJobModel.job_status_id == cls._status_id(JobStatusEnum.running),
+                AllocationJobModel.updated_time < func.now() - timeout,
+            )
+            .values(
+                job_status_id=cls._status_id(JobStatusEnum.failed),
+                error="Worker stopped responding",
+                finished_time=func.now(),
+            )
+            .returning(AllocationJobModel.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        cls.sess.commit()
+        for id in ids:
+            logger.warning(f"Allocation job {id} failed: no heartbeat for {timeout}")
+
+        return ids
+
+    @classmethod
+    def claim(cls) -> AllocationJobModel | None:
+        """
+        Fail stale jobs, then mark the oldest queued job as running and commit. Jobs locked by
+        other workers are skipped so that each job is claimed once
+
+        Returns:
+            the claimed AllocationJobModel or None if no job is queued
+        """
+        _ = cls.fail_stale()
+        job = cls.sess.scalars(
+            select(AllocationJobModel)
+            .join(JobStatusModel, JobStatusModel.id == AllocationJobModel.job_status_id)
+            .where(JobStatusModel.job_status == JobStatusEnum.queued.value)
+            .order_by(AllocationJobModel.id)
+            .limit(1)
+            .with_for_update(of=AllocationJobModel, skip_locked=True)
+        ).first()
+        if job is None:
+            cls.sess.rollback()
+            return None
+
+        job.job_status_id = cls._status_id(JobStatusEnum.running)
+        job.started_time = dt.datetime.now()
+        cls.sess.commit()
+        return job
+
+    @classmethod
+    def _progress_callback(cls, id: int) -> ProgressCallback:
+        """
+        Progress callback that writes the dates done and the allocations made so far to the job.
+        Updates are committed on their own connection so that they are visible while the
+        allocation itself is not yet committed
+        """
+        engine = cls.sess.get_bind()
+
+        def progress(solutions: dict, problems: list) -> None:
+            dates = {problem.date for problem in problems}
+            pending_dates = {problem.date for problem in problems if problem.key not in solutions}
+            with engine.begin() as conn:
+                conn.execute(
+                    update(AllocationJobModel)
+                    .where(AllocationJobModel.id == id)
+                    .values(
+                        dates_total=len(dates),
+                        dates_done=len(dates - pending_dates),
+                        allocations_made=sum(len(result) for result in solutions.values()),
+                    )
+                )
+
+        return progress
+
+    @classmethod
+    def _heartbeat(cls, id: int) -> threading.Event:
+        """
+        Touch the updated time of a job on its own connection every quarter of
+        ALLOCATION_JOB_TIMEOUT until the returned event is set
+        """
+        engine = cls.sess.get_bind()
+        interval = Config.get_instance().ALLOCATION_JOB_TIMEOUT / 4
+        stop = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(interval):
+                with engine.begin() as conn:
+                    conn.execute(
+                        update(AllocationJobModel)
+                        .where(AllocationJobModel.id == id)
+                        .values(updated_time=func.now())
+                    )
+
+        threading.Thread(target=beat, name=f"allocation-job-{id}-heartbeat", daemon=True).start()
+        return stop
+
+    @classmethod
+    def run(cls, job: AllocationJobModel) -> AllocationJobModel:
+        """
+        Run a claimed job and commit its allocations together with its final status. A failed job
+        leaves no allocations behind and keeps the error message
+
+        Args:
+            job: job returned by claim
+
+        Returns:
+            the finished AllocationJobModel
+        """
+        id = job.id
+        data = {"iteration_id": job.iteration_id, "strategy": job.strategy}
+        if job.request_id is not None:
+            data["request_id"] = job.request_id
+
+        if job.time_budget_ms is not None:
+            data["time_budget_ms"] = job.time_budget_ms
+
+        stats = dict()
+        heartbeat = cls._heartbeat(id)
+        try:
+            result = AllocationManager.automatic_allocation(
+                data, cls._progress_callback(id), stats,
+            )
+        except Exception as error:
+            logger.exception(f"Allocation job {id} failed")
+            cls.sess.rollback()
+            job = cls.sess.get(AllocationJobModel, id)
+            job.job_status_id = cls._status_id(JobStatusEnum.failed)
+            job.error = str(error)
+            job.finished_time = dt.datetime.now()
+            cls.sess.commit()
+            return job
+        finally:
+            heartbeat.set()
+
+        #   Progress was written on another connection
+        cls.sess.refresh(job)
+        job.job_status_id = cls._status_id(JobStatusEnum.completed)
+        job.allocations_made = len(result)
+        if job.request_id is not None:
+            job.dates_total = 1
+
+        job.dates_done = job.dates_total
+        job.result = {
+            "allocation_ids": [item.id for item in result],
+            "total_points": sum(item.points for item in result),
+            "iterations": stats["iterations"],
+        }
+        job.finished_time = dt.datetime.now()
+        cls.sess.commit()
+        return job
+
+    @classmethod
+    def work(cls, poll_interval: float | None = 1.0, max_jobs: int | None = None) -> int:
+        """
+        Claim and run queued jobs until max_jobs have been run, waiting poll_interval seconds
+        whenever the queue is empty. Several workers can run side by side
+
+        Args:
+            poll_interval: seconds to wait when no job is queued; return as soon as the queue is
+                empty if None [default: 1.0]
+            max_jobs: number of jobs to run before returning; no limit if None [default: None]
+
+        Returns:
+            int: number of jobs run
+        """
+        count = 0
+        while max_jobs is None or count < max_jobs:
+            job = cls.claim()
+            if job is None and poll_interval is None:
+                break
+
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"Running allocation job {job.id} for iteration {job.iteration_id}")
+            job = cls.run(job)
+            logger.info(f"Allocation job {job.id} finished: {job.job_status.job_status}")
+            count += 1
+
+        return count
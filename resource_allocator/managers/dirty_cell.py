@@ -0,0 +1,167 @@
+"""
+Dirty cell manager - (iteration, date, top resource group) cells of allocated iterations whose
+allocations may no longer be optimal
+"""
+
+from collections.abc import Iterable
+import datetime as dt
+
+from sqlalchemy import delete, func, select, Select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+
+from resource_allocator.models import (
+    AllocationModel,
+    DirtyCellModel,
+    IterationModel,
+    RequestModel,
+    ResourceGroupModel,
+    ResourceModel,
+    ResourceToGroupModel,
+)
+from resource_allocator.managers.base import BaseManager
+
+
+class DirtyCellManager(BaseManager):
+    """
+    Records the cells touched by changes to requests, allocations, resources and group memberships
+    so that AllocationManager.reallocate can re-optimize only those cells. Only iterations that
+    are already allocated are tracked - a full run covers all cells anyway
+    """
+    model = DirtyCellModel
+
+    @staticmethod
+    def request_top_id():
+        """
+        Requested top resource group id of a request: the top resource group of the requested
+        resource or, failing that, of the requested resource group. Correlated to RequestModel
+        """
+        requested_resource = aliased(ResourceModel)
+        requested_group = aliased(ResourceGroupModel)
+        return func.coalesce(
+            select(requested_resource.top_resource_group_id)
+            .where(requested_resource.id == RequestModel.requested_resource_id)
+            .scalar_subquery(),
+            select(requested_group.top_resource_group_id)
+            .where(requested_group.id == RequestModel.requested_resource_group_id)
+            .scalar_subquery(),
+        )
+
+    @classmethod
+    def _mark(cls, cells: Select) -> None:
+        """
+        Insert the (iteration id, date, top resource group id) rows of a select of allocated
+        iterations, skipping the ones that are already marked
+        """
+        cls.sess.execute(
+            insert(DirtyCellModel)
+            .from_select(["iteration_id", "date", "top_resource_group_id"], cells)
+            .on_conflict_do_nothing(
+                index_elements=["iteration_id", "date", "top_resource_group_id"],
+            )
+        )
+
+    @classmethod
+    def mark_requests(cls, request_ids: Iterable[int]) -> None:
+        """
+        Mark the cells of requests
+        """
+        top_id = cls.request_top_id()
+        cls._mark(
+            select(RequestModel.iteration_id, RequestModel.requested_date, top_id)
+            .distinct()
+            .join(IterationModel, IterationModel.id == RequestModel.iteration_id)
+            .where(
+                RequestModel.id.in_(list(request_ids)),
+                IterationModel.is_allocated,
+                top_id.is_not(None),
+            )
+        )
+
+    @classmethod
+    def mark_allocations(cls, allocation_ids: Iterable[int]) -> None:
+        """
+        Mark the cells of allocations
+        """
+        cls._mark(
+            select(
+                AllocationModel.iteration_id,
+                AllocationModel.date,
+                ResourceModel.top_resource_group_id,
+            )
+            .distinct()
+            .join(ResourceModel, ResourceModel.id == AllocationModel.allocated_resource_id)
+            .join(IterationModel, IterationModel.id == AllocationModel.iteration_id)
+            .where(AllocationModel.id.in_(list(allocation_ids)), IterationModel.is_allocated)
+        )
+
+    @classmethod
+    def mark_top_groups(cls, top_resource_group_ids: Iterable[int | None]) -> None:
+        """
+        Mark every requested date of the allocated iterations in the given top resource groups
+        """
+        top_ids = [id for id in top_resource_group_ids if id is not None]
+        if not top_ids:
+            return
+
+        top_id = cls.request_top_id()
+        cls._mark(
+            select(RequestModel.iteration_id, RequestModel.requested_date, top_id)
+            .distinct()
+            .join(IterationModel, IterationModel.id == RequestModel.iteration_id)
+            .where(IterationModel.is_allocated, top_id.in_(top_ids))
+        )
+
+    @classmethod
+    def mark_resources(cls, resource_ids: Iterable[int]) -> None:
+        """
+        Mark every requested date of the allocated iterations in the top resource groups of
+        resources
+        """
+        cls.mark_top_groups(cls.sess.scalars(
+            select(ResourceModel.top_resource_group_id)
+            .where(ResourceModel.id.in_(list(resource_ids)))
+        ))
+
+    @classmethod
+    def mark_memberships(cls, ids: Iterable[int]) -> None:
+        """
+        Mark every requested date of the allocated iterations in the top resource groups of the
+        resources of resource_to_group rows
+        """
+        cls.mark_resources(cls.sess.scalars(
+            select(ResourceToGroupModel.resource_id)
+            .where(ResourceToGroupModel.id.in_(list(ids)))
+        ))
+
+    @classmethod
+    def list_cells(cls, iteration_id: int) -> list[tuple[dt.date, int]]:
+        """
+        Dirty (date, top resource group id) cells of an iteration in date order
+        """
+        return cls.sess.execute(
+            select(DirtyCellModel.date, DirtyCellModel.top_resource_group_id)
+            .where(DirtyCellModel.iteration_id == iteration_id)
+            .order_by(DirtyCellModel.date, DirtyCellModel.top_resource_group_id)
+        ).tuples().all()
+
+    @classmethod
+    def clear(
+        cls,
+        iteration_id: int,
+        cells: Iterable[tuple[dt.date, int]] | None = None,
+    ) -> None:
+        """
+        Remove (date, top resource group id) cells of an iteration - all of them if cells is None
+        """
+        query = delete(DirtyCellModel).where(DirtyCellModel.iteration_id == iteration_id)
+        if cells is not None:
+            cells = list(cells)
+            if not cells:
+                return
+
+            query = query.where(
+                tuple_(DirtyCellModel.date, DirtyCellModel.top_resource_group_id).in_(cells),
+            )
+
+        cls.sess.execute(query)
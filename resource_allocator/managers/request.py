@@ -10,6 +10,7 @@ from resource_allocator.models import (
     RequestStatusModel,
 )
 from resource_allocator.managers.base import BaseManager
+from resource_allocator.managers.dirty_cell import DirtyCellManager
 
 
 class RequestManager(BaseManager):
@@ -104,6 +105,7 @@ class RequestManager(BaseManager):
             data["request_status_id"] = cls.sess.execute(query).scalar()
 
         request: RequestModel = super().create_item(data)
+        DirtyCellManager.mark_requests([request.id])
 
         #   Automatically allocate if the iteration has been allocated
         if request.iteration.is_allocated:
@@ -127,6 +129,7 @@ class RequestManager(BaseManager):
             Model for the deleted row
         """
         request: RequestModel = cls.list_single_item(id)
+        DirtyCellManager.mark_requests([id])
         if request.allocation is not None:
             manager = cls._get_allocation_manager()
             manager.delete_item(request.allocation.id)
@@ -146,7 +149,10 @@ class RequestManager(BaseManager):
         Returns:
             Model for the deleted row
         """
+        #   Both the cell the request leaves and the one it moves to are dirty
+        DirtyCellManager.mark_requests([id])
         request: RequestModel = super().modify_item(id, data)
+        DirtyCellManager.mark_requests([id])
         if request.allocation is not None:
             cls.decline(request.id)
 
@@ -9,6 +9,7 @@ from resource_allocator.models import (
 )
 
 from resource_allocator.managers.base import BaseManager
+from resource_allocator.managers.dirty_cell import DirtyCellManager
 from resource_allocator.managers.image import (
     ImageManager,
     ImagePropertiesManager,
@@ -22,6 +23,25 @@ class ResourceManager(BaseManager):
         "image_properties": ImagePropertiesManager,
     }
 
+    @classmethod
+    def create_item(cls, data: dict) -> ResourceModel:
+        result = super().create_item(data)
+        DirtyCellManager.mark_resources([result.id])
+        return result
+
+    @classmethod
+    def modify_item(cls, id: int, data: dict) -> ResourceModel:
+        #   The resource may move to another top resource group
+        DirtyCellManager.mark_resources([id])
+        result = super().modify_item(id, data)
+        DirtyCellManager.mark_resources([id])
+        return result
+
+    @classmethod
+    def delete_item(cls, id: int) -> ResourceModel:
+        DirtyCellManager.mark_resources([id])
+        return super().delete_item(id)
+
 
 class ResourceGroupManager(BaseManager):
     model = ResourceGroupModel
@@ -41,6 +61,27 @@ class ResourceGroupManager(BaseManager):
         sess.flush()
         return result
 
+    @classmethod
+    def modify_item(cls, id: int, data: dict) -> ResourceGroupModel:
+        #   Requests for the group may move to another top resource group
+        group = cls.list_single_item(id)
+        top_ids = [None if group is None else group.top_resource_group_id]
+        result = super().modify_item(id, data)
+        if result is not None:
+            cls.sess.refresh(result)
+            top_ids.append(result.top_resource_group_id)
+
+        DirtyCellManager.mark_top_groups(top_ids)
+        return result
+
+    @classmethod
+    def delete_item(cls, id: int) -> ResourceGroupModel:
+        group = cls.list_single_item(id)
+        if group is not None:
+            DirtyCellManager.mark_top_groups([group.top_resource_group_id])
+
+        return super().delete_item(id)
+
 
 class ResourceToResourceGroupManager(BaseManager):
     model = ResourceToGroupModel
@@ -4,7 +4,30 @@ Iteration-related managers
 
 from resource_allocator.models import ResourceToGroupModel
 from resource_allocator.managers.base import BaseManager
+from resource_allocator.managers.dirty_cell import DirtyCellManager
 
 
 class ResourceToGroupManager(BaseManager):
+    """
+    Group memberships change the points of their resources, so every change marks the top resource
+    group of the resource as dirty
+    """
     model = ResourceToGroupModel
+
+    @classmethod
+    def create_item(cls, data: dict) -> ResourceToGroupModel:
+        result = super().create_item(data)
+        DirtyCellManager.mark_memberships([result.id])
+        return result
+
+    @classmethod
+    def modify_item(cls, id: int, data: dict) -> ResourceToGroupModel:
+        DirtyCellManager.mark_memberships([id])
+        result = super().modify_item(id, data)
+        DirtyCellManager.mark_memberships([id])
+        return result
+
+    @classmethod
+    def delete_item(cls, id: int) -> ResourceToGroupModel:
+        DirtyCellManager.mark_memberships([id])
+        return super().delete_item(id)
@@ -3,24 +3,27 @@ Logic manager for user-related options
 """
 
 from collections.abc import Callable
+import datetime as dt
 from functools import wraps
 import logging
 from typing import Any
 
 from flask_httpauth import HTTPTokenAuth
 import requests as req
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects.postgresql import insert
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from resource_allocator.db import get_session
 from resource_allocator.managers.base import BaseManager
-from resource_allocator.models import UserModel, RoleModel, RoleEnum
+from resource_allocator.models import UserModel, UserLastWriteModel, RoleModel, RoleEnum
 from resource_allocator.utils.auth import (
     azure_configured,
     build_azure_ad_auth_url,
     build_azure_ad_token_request,
     check_configured,
     generate_token,
-    parse_token,
+    token_user_id,
 )
 from resource_allocator.config import Config
 
@@ -44,6 +47,49 @@ class UserManager(BaseManager):
 
         return super().modify_item(id, data)
 
+    @classmethod
+    def record_write(cls, id: int) -> None:
+        """
+        Record a write of a user as part of the current transaction. Written just before the
+        commit, so the time is taken when the statement runs rather than when the transaction began
+        """
+        cls.sess.execute(
+            insert(UserLastWriteModel)
+            .values(user_id=id, last_write_time=func.clock_timestamp())
+            .on_conflict_do_update(
+                index_elements=[UserLastWriteModel.user_id],
+                set_={"last_write_time": func.clock_timestamp()},
+            )
+        )
+
+    @classmethod
+    def wrote_recently(cls, id: int, seconds: float) -> bool:
+        """
+        Whether a user has committed a write within the last seconds. Read on the primary on a
+        short autocommit connection of its own, so the session can still pick a replica
+
+        Args:
+            id: user id
+            seconds: length of the window
+
+        Returns:
+            bool
+        """
+        engine = cls.sess.bind
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            return conn.scalar(cls.recent_write_query(id, seconds)) is not None
+
+    @staticmethod
+    def recent_write_query(id: int, seconds: float) -> Select:
+        """
+        Query for the id of the write record of a user if it is newer than seconds
+        """
+        return select(UserLastWriteModel.id).where(
+            UserLastWriteModel.user_id == id,
+            UserLastWriteModel.last_write_time
+            > func.clock_timestamp() - dt.timedelta(seconds=seconds),
+        )
+
 
 class AuthManager(BaseManager):
     model = UserModel
@@ -218,12 +264,11 @@ def verify_token(token):
     Failed auth: False
     """
     config = Config.get_instance()
-    try:
-        parsed_token = parse_token(token=token, secret=config.SECRET)
-    except Exception:
+    user_id = token_user_id(token, secret=config.SECRET)
+    if user_id is None:
         return False
 
-    user = get_session().get(UserModel, int(parsed_token["sub"]))
+    user = get_session().get(UserModel, user_id)
     if not user:
         return True
 
@@ -9,6 +9,7 @@ import sqlalchemy as db
 from sqlalchemy import (
     ForeignKey,
     func,
+    Index,
     inspect,
     UniqueConstraint,
 )
@@ -75,6 +76,14 @@ class UserModel(Base):
     is_external: Mapped[bool] = mapped_column(server_default="false")
 
 
+class UserLastWriteModel(Base):
+    #   Read on the primary by every worker to keep a user's reads off the replicas for
+    #   DB_REPLICA_STICKINESS seconds after their last write
+    __tablename__ = "user_last_write"
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), unique=True)
+    last_write_time: Mapped[dt.datetime]
+
+
 class ResourceGroupModel(Base):
     __tablename__ = "resource_group"
     name: Mapped[str] = mapped_column(unique=True)
@@ -105,6 +114,7 @@ class ResourceModel(Base):
     image: Mapped["ImageModel"] = relationship()
     image_properties_id: Mapped[int | None] = mapped_column(ForeignKey("image_properties.id"))
     image_properties: Mapped["ImagePropertiesModel"] = relationship()
+    capacity: Mapped[int] = mapped_column(server_default="1")
 
 
 class IterationModel(Base):
@@ -147,21 +157,72 @@ class RequestModel(Base):
 class AllocationModel(Base):
     __tablename__ = "allocation"
     __table_args__ = (
-        UniqueConstraint(
+        #   Not unique: a resource takes up to its capacity of allocations per date
+        Index(
+            "ix_allocation_iteration_id_date_allocated_resource_id",
             "iteration_id", "date", "allocated_resource_id",
-            name="allocation_iteration_id_date_allocated_resource_id_key",
         ),
     )
     iteration: Mapped["IterationModel"] = relationship(back_populates="allocations")
     iteration_id: Mapped[int] = mapped_column(ForeignKey("iteration.id"))
     date: Mapped[dt.date]
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
-    source_request_id: Mapped[int] = mapped_column(ForeignKey("request.id"))
+    #   None for allocations made by hand without a request
+    source_request_id: Mapped[int | None] = mapped_column(ForeignKey("request.id"))
     allocated_resource_id: Mapped[int | None] = mapped_column(ForeignKey("resource.id"))
     allocated_resource: Mapped[ResourceModel | None] = relationship()
     points: Mapped[int | None]
 
 
+class JobStatusEnum(Enum):
+    queued = "Queued"
+    running = "Running"
+    completed = "Completed"
+    failed = "Failed"
+
+
+class JobStatusModel(Base):
+    __tablename__ = "job_status"
+    job_status: Mapped[str] = mapped_column(unique=True)
+
+
+class AllocationJobModel(Base):
+    __tablename__ = "allocation_job"
+    iteration_id: Mapped[int] = mapped_column(ForeignKey("iteration.id"))
+    iteration: Mapped["IterationModel"] = relationship()
+    request_id: Mapped[int | None] = mapped_column(ForeignKey("request.id"))
+    strategy: Mapped[str] = mapped_column(server_default="greedy")
+    time_budget_ms: Mapped[int | None]
+    job_status_id: Mapped[int] = mapped_column(ForeignKey("job_status.id"), index=True)
+    job_status: Mapped["JobStatusModel"] = relationship()
+    dates_total: Mapped[int] = mapped_column(server_default="0")
+    dates_done: Mapped[int] = mapped_column(server_default="0")
+    allocations_made: Mapped[int] = mapped_column(server_default="0")
+    result: Mapped[dict | None] = mapped_column(db.JSON)
+    error: Mapped[str | None]
+    started_time: Mapped[dt.datetime | None]
+    finished_time: Mapped[dt.datetime | None]
+
+
+class DirtyCellModel(Base):
+    __tablename__ = "dirty_cell"
+    __table_args__ = (
+        UniqueConstraint(
+            "iteration_id", "date", "top_resource_group_id",
+            name="dirty_cell_iteration_id_date_top_resource_group_id_key",
+        ),
+    )
+    iteration_id: Mapped[int] = mapped_column(ForeignKey("iteration.id"))
+    date: Mapped[dt.date]
+    top_resource_group_id: Mapped[int] = mapped_column(ForeignKey("resource_group.id"))
+
+
+class AllocationCacheModel(Base):
+    __tablename__ = "allocation_cache"
+    fingerprint: Mapped[str] = mapped_column(unique=True)
+    solution: Mapped[list] = mapped_column(db.JSON)
+
+
 class ImageTypeModel(Base):
     __tablename__ = "image_type"
     image_type: Mapped[str] = mapped_column(unique=True)
@@ -203,6 +264,7 @@ def populate_enums(
     table_enums = [
         (RoleModel, "role", RoleEnum),
         (RequestStatusModel, "request_status", RequestStatusEnum),
+        (JobStatusModel, "job_status", JobStatusEnum),
     ]
 
     for table, column, enum in table_enums:
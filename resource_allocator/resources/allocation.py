@@ -6,9 +6,12 @@ from flask import request
 
 from resource_allocator.schemas.allocation import (
     AllocationRequestSchema, AllocationResponseSchema,
-    AllocationAutomaticAllocationSchema,
+    AllocationAutomaticAllocationSchema, AllocationDryRunResponseSchema,
+    AllocationJobResponseSchema, AllocationReallocationSchema,
+    AllocationReallocationResponseSchema,
 )
 from resource_allocator.managers.allocation import AllocationManager
+from resource_allocator.managers.allocation_job import AllocationJobManager
 from resource_allocator.resources.base import BaseResource, CRUDResource
 from resource_allocator.managers.user import auth, role_required
 
@@ -27,11 +30,54 @@ class AutoAllocationResource(BaseResource):
     response_schema = AllocationResponseSchema
     write_roles_required = ["admin"]
 
+    @auth.login_required
+    @role_required("admin")
+    def post(self) -> dict | tuple[dict, int]:
+        """
+        Queue an automatic allocation for the background worker and return the job with status
+        202. A dry run is computed right away and nothing is queued
+        """
+        data = AllocationAutomaticAllocationSchema().load(request.get_json())
+        if data.pop("dry_run"):
+            result = self.manager.simulate_allocation(data)
+            return AllocationDryRunResponseSchema().dump(result)
+
+        job = AllocationJobManager.submit(data)
+        return AllocationJobResponseSchema().dump(job), 202
+
+
+class ReallocationResource(BaseResource):
+    manager = AllocationManager
+    request_schema = AllocationReallocationSchema
+    response_schema = AllocationReallocationResponseSchema
+    write_roles_required = ["admin"]
+
     @auth.login_required
     @role_required("admin")
     def post(self) -> dict:
-        data = request.get_json()
-        result = self.manager.automatic_allocation(
-            AllocationAutomaticAllocationSchema().load(data)
-        )
-        return self.response_schema().dump(result, many=True)
+        """
+        Re-optimize the cells of an allocated iteration that changed since it was allocated
+        """
+        data = self.request_schema().load(request.get_json())
+        result = self.manager.reallocate(data)
+        return self.response_schema().dump(result)
+
+
+class AllocationJobResource(BaseResource):
+    manager = AllocationJobManager
+    response_schema = AllocationJobResponseSchema
+    read_roles_required = ["admin"]
+    not_found_message = "Allocation job {id} not found"
+
+    @auth.login_required
+    @BaseResource.check_read
+    def get(self, id: int | None = None) -> dict | list:
+        """
+        Progress and result of a single allocation job or of all jobs
+        """
+        if id is None:
+            result = self.manager.list_all_items()
+        else:
+            result = self.manager.list_single_item(id)
+
+        return self.dump_read(result, id)
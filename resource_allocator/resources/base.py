@@ -15,6 +15,14 @@ from resource_allocator.managers.base import BaseManager
 
 
 class BaseResource(ABC, Resource):
+    #   HTTP methods that only read. They can be served from a read replica and run in autocommit
+    #   mode, so they must not write
+    read_only_methods = ("GET", "HEAD")
+
+    #   Message of the 404 for reading a single item that does not exist, formatted with its id.
+    #   Such reads return an empty object if None
+    not_found_message: str | None = None
+
     @property
     @abstractmethod
     def manager(self) -> BaseManager: ...
@@ -48,13 +56,43 @@ class BaseResource(ABC, Resource):
         """
         return Schema
 
+    def authorize_read(self, role: str) -> None:
+        """
+        Abort with a 403 unless a role is allowed to read
+
+        Args:
+            role: name of the role of the current user
+
+        Returns:
+            None
+        """
+        if role not in self.read_roles_required:
+            abort(403, "Forbidden")
+
+    def dump_read(self, result, id: int | None = None) -> dict | list:
+        """
+        Dump the result of reading a single item or all items
+
+        Args:
+            result: item or list of items read by the manager
+            id: identifier of the item read; all items if None [default: None]
+
+        Returns:
+            dict: dictionary response if reading a single item or a list if reading all items
+        """
+        if id is None:
+            return self.response_schema().dump(result, many=True)
+
+        if result is None and self.not_found_message is not None:
+            abort(404, self.not_found_message.format(id=id))
+
+        return self.response_schema().dump(result)
+
     @staticmethod
     def check_read(fun: Callable) -> Callable:
         @wraps(fun)
         def inner(self, *args, **kwargs):
-            if not get_user_role() in self.read_roles_required:
-                abort(403, "Forbidden")
-
+            self.authorize_read(get_user_role())
             return fun(self, *args, **kwargs)
 
         return inner
@@ -89,10 +127,10 @@ class CRUDResource(BaseResource):
         #   in child classes
         if id is None:
             result = self.manager.list_all_items()
-            return self.response_schema().dump(result, many=True)
+        else:
+            result = self.manager.list_single_item(id)
 
-        result = self.manager.list_single_item(id)
-        return self.response_schema().dump(result)
+        return self.dump_read(result, id)
 
     @auth.login_required
     @BaseResource.check_write
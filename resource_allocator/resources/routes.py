@@ -1,6 +1,8 @@
 from resource_allocator.resources.allocation import (
+    AllocationJobResource,
     AllocationResource,
     AutoAllocationResource,
+    ReallocationResource,
 )
 from resource_allocator.resources.image import (
     ImageResource,
@@ -44,6 +46,8 @@ routes = (
 
     #   Convenience Methods
     (AutoAllocationResource, "/allocation/auto_allocation", "/auto_allocation"),
+    (AllocationJobResource, "/allocation/jobs/", "/allocation/jobs/<int:id>"),
+    (ReallocationResource, "/allocation/reallocate"),
     (RequestApproveResource, "/requests/<int:id>/approve"),
     (RequestDeclineResource, "/requests/<int:id>/decline"),
 )
@@ -2,8 +2,8 @@
 Allocation-related request schemas
 """
 
-from marshmallow import fields, validates, validates_schema, ValidationError
-from sqlalchemy import select
+from marshmallow import Schema, fields, validate, validates, validates_schema, ValidationError
+from sqlalchemy import func, select
 
 from resource_allocator.db import get_session
 from resource_allocator.schemas.base import BaseRequestSchema, BaseResponseSchema
@@ -16,7 +16,7 @@ class AllocationRequestSchema(BaseRequestSchema):
     iteration_id = fields.Integer(required=True)
     date = fields.Date(required=True)
     user_id = fields.Integer(required=True)
-    source_request_id = fields.Integer(required=True)
+    source_request_id = fields.Integer(allow_none=True)
     allocated_resource_id = fields.Integer(required=True)
     points = fields.Integer()
 
@@ -33,7 +33,7 @@ class AllocationRequestSchema(BaseRequestSchema):
 
     @validates("source_request_id")
     def validate_source_request_id(self, value):
-        if not get_session().get(RequestModel, value):
+        if value is not None and not get_session().get(RequestModel, value):
             raise ValidationError(f"Invalid request: {value}")
 
     @validates("allocated_resource_id")
@@ -53,17 +53,21 @@ class AllocationRequestSchema(BaseRequestSchema):
     @validates_schema
     def validate_already_allocated(self, data, **kwargs):
         #   Unique constraints
-        #   1. a resource cannot be allocated again
+        #   1. a resource cannot be allocated beyond its capacity
         #   2. OR user cannot be allocated again for a single day for the same top resource group
         date = data["date"]
         sess = get_session()
-        top_resource_group_id = sess.scalar(
-            select(ResourceModel.top_resource_group_id)
+        top_resource_group_id, capacity = sess.execute(
+            select(ResourceModel.top_resource_group_id, ResourceModel.capacity)
             .where(ResourceModel.id == data["allocated_resource_id"])
-        )
-        resource_allocated = (
-            (AllocationModel.date == date)
-            & (AllocationModel.allocated_resource_id == data["allocated_resource_id"])
+        ).one_or_none() or (None, 1)
+        resource_allocations = sess.scalar(
+            select(func.count(AllocationModel.id))
+            .where(
+                AllocationModel.date == date,
+                AllocationModel.allocated_resource_id == data["allocated_resource_id"],
+                AllocationModel.id != data.get("id"),  # Ignore condition when updating
+            )
         )
         user_allocated = (
             (AllocationModel.date == date)
@@ -76,13 +80,20 @@ class AllocationRequestSchema(BaseRequestSchema):
             )
             & (AllocationModel.id != data.get("id"))  # Ignore condition when updating
         )
-        if sess.query(AllocationModel).where(resource_allocated | user_allocated).first():
+        if (
+            resource_allocations >= capacity
+            or sess.query(AllocationModel).where(user_allocated).first()
+        ):
             raise ValidationError(f"User or resource already allocated for date {data['date']}")
 
 
-class AllocationAutomaticAllocationSchema(BaseRequestSchema):
+class AllocationReallocationSchema(BaseRequestSchema):
     iteration_id = fields.Integer(required=True)
-    request_id = fields.Integer()
+    strategy = fields.String(
+        load_default="greedy",
+        validate=validate.OneOf(["greedy", "optimal", "flow"]),
+    )
+    time_budget_ms = fields.Integer(allow_none=True, validate=validate.Range(min=0))
 
     @validates("iteration_id")
     def validate_iteration_id(self, value):
@@ -90,6 +101,11 @@ class AllocationAutomaticAllocationSchema(BaseRequestSchema):
         if not iteration:
             raise ValidationError(f"Invalid iteration: {value}")
 
+
+class AllocationAutomaticAllocationSchema(AllocationReallocationSchema):
+    request_id = fields.Integer()
+    dry_run = fields.Boolean(load_default=False)
+
     @validates("request_id")
     def validate_request_id(self, value):
         request = get_session().get(RequestModel, value)
@@ -99,3 +115,43 @@ class AllocationAutomaticAllocationSchema(BaseRequestSchema):
 
 class AllocationResponseSchema(BaseResponseSchema, AllocationRequestSchema):
     pass
+
+
+class AllocationProposalSchema(Schema):
+    iteration_id = fields.Integer(required=True)
+    date = fields.Date(required=True)
+    user_id = fields.Integer(required=True)
+    source_request_id = fields.Integer(required=True)
+    allocated_resource_id = fields.Integer(required=True)
+    points = fields.Integer()
+
+
+class AllocationJobResponseSchema(BaseResponseSchema):
+    iteration_id = fields.Integer(required=True)
+    request_id = fields.Integer(allow_none=True)
+    strategy = fields.String(required=True)
+    time_budget_ms = fields.Integer(allow_none=True)
+    job_status_id = fields.Integer(required=True)
+    job_status = fields.Function(lambda item: item.job_status.job_status)
+    dates_total = fields.Integer(required=True)
+    dates_done = fields.Integer(required=True)
+    allocations_made = fields.Integer(required=True)
+    result = fields.Dict(allow_none=True)
+    error = fields.String(allow_none=True)
+    started_time = fields.DateTime(allow_none=True)
+    finished_time = fields.DateTime(allow_none=True)
+
+
+class AllocationDryRunResponseSchema(Schema):
+    allocations = fields.List(fields.Nested(AllocationProposalSchema), required=True)
+    declined_request_ids = fields.List(fields.Integer(), required=True)
+    total_points = fields.Integer(required=True)
+    iterations = fields.Integer(required=True)
+    timings = fields.Dict(keys=fields.String(), values=fields.Float(), required=True)
+
+
+class AllocationReallocationResponseSchema(Schema):
+    #   (date, top resource group id) pairs
+    cells = fields.List(fields.Tuple((fields.Date(), fields.Integer())), required=True)
+    allocations = fields.List(fields.Nested(AllocationResponseSchema), required=True)
+    declined_request_ids = fields.List(fields.Integer(), required=True)
@@ -2,7 +2,7 @@
 Request-related schemas for resource objects
 """
 
-from marshmallow import fields, validates, ValidationError
+from marshmallow import fields, validate, validates, ValidationError
 
 from resource_allocator.db import get_session
 from resource_allocator.models import (
@@ -19,6 +19,7 @@ class ResourceRequestSchema(BaseRequestSchema):
     top_resource_group_id = fields.Integer(required=True)
     image_id = fields.Integer()
     image_properties_id = fields.Integer()
+    capacity = fields.Integer(validate=validate.Range(min=1))
 
     @validates("name")
     def validate_name(self, value):
@@ -48,3 +49,4 @@ class ResourceResponseSchema(BaseResponseSchema):
     top_resource_group_id = fields.Integer(required=True)
     image_id = fields.Integer()
     image_properties_id = fields.Integer()
+    capacity = fields.Integer()
@@ -46,6 +46,40 @@ def parse_token(token: str, secret: str) -> dict:
     return parsed_token
 
 
+def bearer_token(authorization: str | None) -> str | None:
+    """
+    Token of a bearer Authorization header
+
+    Args:
+        authorization: value of the Authorization header, if any
+
+    Returns:
+        str | None: the token or None if the header does not hold a bearer token
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    return token
+
+
+def token_user_id(token: str, secret: str) -> int | None:
+    """
+    Id of the user a JWT token was issued for. The user is not looked up in the database
+
+    Args:
+        token: string representing the JWT token
+        secret: what secret to use as an encryption key
+
+    Returns:
+        int | None: user id or None if the token is not valid
+    """
+    try:
+        return int(parse_token(token=token, secret=secret)["sub"])
+    except Exception:
+        return None
+
+
 def check_configured(
     check_fun: Callable[[], bool],
     error_code: int = 400,
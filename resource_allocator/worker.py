@@ -0,0 +1,45 @@
+"""
+Background worker that runs queued allocation jobs
+
+Usage:
+    python -m resource_allocator.worker
+"""
+
+import argparse
+import logging
+
+from resource_allocator.config import Config
+from resource_allocator.managers.allocation_job import AllocationJobManager
+
+
+def main(args: list[str] | None = None) -> None:
+    """
+    Run allocation jobs until stopped
+
+    Args:
+        args: command-line arguments; sys.argv if None [default: None]
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Run queued allocation jobs")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds to wait when no job is queued",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Exit as soon as the queue is empty",
+    )
+    parsed = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    Config.from_environment()
+    AllocationJobManager.work(poll_interval=None if parsed.once else parsed.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Tests for the ASGI app
+"""
+
+import json
+import unittest
+
+from resource_allocator.aio.app import create_asgi_app
+from resource_allocator.aio.db import dispose_async_engine
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.managers import (
+    AuthManager,
+    ResourceGroupManager,
+    ResourceManager,
+)
+from resource_allocator.models import metadata, populate_enums
+from resource_allocator.schemas import ResourceResponseSchema
+from resource_allocator.utils.db import change_schema
+from tests.test_db import ReplicaTestMixin
+
+metadata = change_schema(metadata, "resource_allocator_test")
+
+
+async def call(
+    app,
+    method: str,
+    path: str,
+    headers: dict[str, str] | None = None,
+    body: dict | None = None,
+) -> tuple[int, dict[str, str], bytes]:
+    """
+    Send a single HTTP request to an ASGI app
+
+    Returns:
+        tuple of the status code, the response headers and the response body
+    """
+    content = json.dumps(body).encode() if body is not None else b""
+    headers = {**(headers or dict()), "Content-Type": "application/json"}
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (key.lower().encode(), value.encode())
+            for key, value in {**headers, "Content-Length": str(len(content))}.items()
+        ],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+    messages = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": content, "more_body": False}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    response_headers = {
+        key.decode().lower(): value.decode()
+        for key, value in start["headers"]
+    }
+    return (
+        start["status"],
+        response_headers,
+        b"".join(message.get("body", b"") for message in messages[1:]),
+    )
+
+
+class ASGIAppTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.config = Config.from_environment()
+        self.sess = get_session()
+        self.engine = self.sess.bind
+        metadata.drop_all(self.engine)
+        metadata.create_all(self.engine)
+        populate_enums(self.sess)
+
+        #   The app uses sessions of its own - the data has to be committed
+        self.admin = AuthManager.register({
+            "email": "admin@example.com",
+            "password": "password",
+            "first_name": "first_name",
+            "last_name": "last_name",
+        })
+        self.user = AuthManager.register({
+            "email": "user@example.com",
+            "password": "password",
+            "first_name": "first_name",
+            "last_name": "last_name",
+        })
+        self.group = ResourceGroupManager.create_item({"name": "top_level", "is_top_level": True})
+        self.resource = ResourceManager.create_item({
+            "name": "resource",
+            "top_resource_group_id": self.group.id,
+        })
+        self.sess.commit()
+        self.headers = {"Authorization": f"Bearer {self.admin['token']}"}
+        self.app = create_asgi_app()
+
+    async def asyncTearDown(self):
+        await dispose_async_engine()
+
+    def tearDown(self):
+        self.sess.rollback()
+        metadata.drop_all(self.engine)
+
+    async def test_get(self):
+        status, headers, body = await call(
+            self.app, "GET", f"/resources/{self.resource.id}", self.headers,
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json")
+        self.assertEqual(json.loads(body), ResourceResponseSchema().dump(self.resource))
+
+        #   Missing items are empty objects like in the Flask app
+        status, _, body = await call(self.app, "GET", "/resources/0", self.headers)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), dict())
+
+    async def test_list(self):
+        status, _, body = await call(self.app, "GET", "/resources/", self.headers)
+        self.assertEqual(status, 200)
+        self.assertEqual([item["id"] for item in json.loads(body)], [self.resource.id])
+
+    async def test_me(self):
+        headers = {"Authorization": f"Bearer {self.user['token']}"}
+        status, _, body = await call(self.app, "GET", "/users/me", headers)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["id"], self.user["id"])
+
+    async def test_unauthorized(self):
+        for headers in (None, {"Authorization": "Bearer invalid"}):
+            with self.subTest(headers=headers):
+                status, response_headers, _ = await call(self.app, "GET", "/resources/", headers)
+                self.assertEqual(status, 401)
+                self.assertIn("www-authenticate", response_headers)
+
+    async def test_forbidden(self):
+        headers = {"Authorization": f"Bearer {self.user['token']}"}
+        status, _, body = await call(self.app, "GET", "/allocation/jobs/", headers)
+        self.assertEqual(status, 403)
+        self.assertEqual(json.loads(body), {"message": "Forbidden"})
+
+    async def test_job_not_found(self):
+        status, _, body = await call(self.app, "GET", "/allocation/jobs/0", self.headers)
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(body), {"message": "Allocation job 0 not found"})
+
+    async def test_cors(self):
+        self.config.ALLOWED_ORIGINS = ["http://example.com"]
+        try:
+            headers = {**self.headers, "Origin": "http://example.com"}
+            status, response_headers, _ = await call(self.app, "GET", "/resources/", headers)
+            self.assertEqual(status, 200)
+            self.assertEqual(
+                response_headers["access-control-allow-origin"],
+                "http://example.com",
+            )
+
+            #   Rejected origins get the response of the Flask app
+            headers = {**self.headers, "Origin": "http://other.com"}
+            status, _, _ = await call(self.app, "GET", "/resources/", headers)
+            self.assertEqual(status, 400)
+        finally:
+            self.config.ALLOWED_ORIGINS = []
+
+    async def test_write_through_flask(self):
+        status, _, body = await call(
+            self.app, "POST", "/resource_groups/", self.headers,
+            {"name": "other", "is_top_level": True},
+        )
+        self.assertEqual(status, 200)
+        group_id = json.loads(body)["id"]
+
+        #   The write is committed and visible to the async read
+        status, _, body = await call(self.app, "GET", f"/resource_groups/{group_id}", self.headers)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["name"], "other")
+
+    async def test_lifespan(self):
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive() -> dict:
+            return messages.pop(0)
+
+        async def send(message: dict) -> None:
+            sent.append(message["type"])
+
+        _ = await call(self.app, "GET", "/resources/", self.headers)
+        await self.app({"type": "lifespan"}, receive, send)
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        self.assertIsNone(self.config._async_sess)
+
+
+class ASGIReplicaRoutingTestCase(ReplicaTestMixin, unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await dispose_async_engine()
+
+    async def test_read_your_writes(self):
+        app = create_asgi_app()
+        path = f"/resources/{self.resource.id}"
+        admin = {"Authorization": f"Bearer {self.admin['token']}"}
+        user = {"Authorization": f"Bearer {self.user['token']}"}
+        status, _, body = await call(app, "GET", path, user)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["name"], "on replica")
+
+        #   The write goes through the Flask app, the reads after it are async
+        status, _, _ = await call(app, "PUT", path, admin, {"name": "renamed"})
+        self.assertEqual(status, 200)
+        _, _, body = await call(app, "GET", path, admin)
+        self.assertEqual(json.loads(body)["name"], "renamed")
+        _, _, body = await call(app, "GET", path, user)
+        self.assertEqual(json.loads(body)["name"], "on replica")
+
+        self.config.DB_REPLICA_STICKINESS = 0.0
+        _, _, body = await call(app, "GET", path, admin)
+        self.assertEqual(json.loads(body)["name"], "on replica")
@@ -0,0 +1,53 @@
+"""
+Tests for the aio.db module
+"""
+
+import asyncio
+import unittest
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from resource_allocator.aio.db import (
+    dispose_async_engine,
+    get_async_session,
+    remove_async_session,
+)
+from resource_allocator.config import Config
+
+
+class GetAsyncSessionTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.config = Config.from_environment()
+
+    async def asyncTearDown(self):
+        await dispose_async_engine()
+
+    async def test_get_async_session(self):
+        sess = get_async_session()
+        self.assertIsInstance(sess, AsyncSession)
+        self.assertIs(sess, get_async_session())
+        self.assertEqual(await sess.scalar(sqlalchemy.text("select 1")), 1)
+        self.assertEqual(sess.bind.url.drivername, "postgresql+asyncpg")
+
+    async def test_task_sessions(self):
+        sess = get_async_session()
+        other = await asyncio.create_task(self._session())
+
+        #   Other tasks get their own session on the same engine
+        self.assertIsNot(sess, other)
+        self.assertIs(sess.bind, other.bind)
+
+    async def test_remove_async_session(self):
+        sess = get_async_session()
+        await remove_async_session()
+        self.assertIsNot(get_async_session(), sess)
+
+    async def test_dispose_async_engine(self):
+        _ = get_async_session()
+        await dispose_async_engine()
+        self.assertIsNone(self.config._async_sess)
+
+    @staticmethod
+    async def _session() -> AsyncSession:
+        return get_async_session()
@@ -0,0 +1,92 @@
+"""
+Tests for the async managers
+"""
+
+import datetime as dt
+import unittest
+
+from resource_allocator.aio.db import dispose_async_engine
+from resource_allocator.aio.managers import (
+    AsyncAllocationJobManager,
+    AsyncResourceManager,
+    AsyncUserManager,
+)
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.managers import (
+    AllocationJobManager,
+    AuthManager,
+    IterationManager,
+    ResourceGroupManager,
+    ResourceManager,
+)
+from resource_allocator.models import (
+    JobStatusEnum,
+    metadata,
+    populate_enums,
+    ResourceModel,
+)
+from resource_allocator.utils.db import change_schema
+
+metadata = change_schema(metadata, "resource_allocator_test")
+
+
+class AsyncManagerTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.config = Config.from_environment()
+        self.sess = get_session()
+        self.engine = self.sess.bind
+        metadata.drop_all(self.engine)
+        metadata.create_all(self.engine)
+        populate_enums(self.sess)
+
+        #   Async sessions use connections of their own - the data has to be committed
+        self.user = AuthManager.register({
+            "email": "test@example.com",
+            "password": "password",
+            "first_name": "first_name",
+            "last_name": "last_name",
+        })
+        group = ResourceGroupManager.create_item({"name": "top_level", "is_top_level": True})
+        self.resources = [
+            ResourceManager.create_item({
+                "name": f"resource_{i}",
+                "top_resource_group_id": group.id,
+            })
+            for i in range(3)
+        ]
+        iteration = IterationManager.create_item({
+            "start_date": dt.date(2024, 1, 1),
+            "end_date": dt.date(2024, 1, 5),
+        })
+        self.job = AllocationJobManager.submit({"iteration_id": iteration.id})
+        self.sess.commit()
+
+    async def asyncTearDown(self):
+        await dispose_async_engine()
+
+    def tearDown(self):
+        self.sess.rollback()
+        metadata.drop_all(self.engine)
+
+    async def test_list_single_item(self):
+        result = await AsyncResourceManager.list_single_item(self.resources[0].id)
+        self.assertIsInstance(result, ResourceModel)
+        self.assertEqual(result.name, "resource_0")
+        self.assertIsNone(await AsyncResourceManager.list_single_item(-1))
+
+    async def test_list_all_items(self):
+        result = await AsyncResourceManager.list_all_items()
+        self.assertEqual(
+            sorted(item.id for item in result),
+            sorted(item.id for item in self.resources),
+        )
+
+    async def test_options(self):
+        #   Relationships read by the response schema are loaded up front
+        result = await AsyncAllocationJobManager.list_single_item(self.job.id)
+        self.assertEqual(result.job_status.job_status, JobStatusEnum.queued.value)
+
+    async def test_get_role(self):
+        user = await AsyncUserManager.list_single_item(self.user["id"])
+        self.assertEqual(await AsyncUserManager.get_role(user), "admin")
@@ -0,0 +1,62 @@
+"""
+Unit tests for benchmarks.allocation
+"""
+
+import unittest
+
+from benchmarks.allocation import compare, run_benchmark
+from benchmarks.generate import DataSize
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.models import metadata, populate_enums, AllocationModel, RequestModel
+from resource_allocator.utils.db import change_schema
+
+metadata = change_schema(metadata, schema="resource_allocator_test")
+
+
+class RunBenchmarkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.config = Config.from_environment()
+        self.sess = get_session()
+        self.engine = self.sess.bind
+
+        metadata.drop_all(self.engine)  # in case of errors during setUp
+        metadata.create_all(self.engine)
+        populate_enums(self.sess)
+
+    def tearDown(self):
+        self.sess.rollback()
+        metadata.drop_all(bind=self.engine)
+
+    def test_run_benchmark(self):
+        size = DataSize(users=30, desks=10, days=3, buildings=2)
+        report = run_benchmark(self.sess, size)
+        self.assertEqual(
+            list(report["phases"]),
+            ["generate", "load", "solve", "persist"],
+        )
+        self.assertEqual(report["parameters"]["users"], 30)
+        self.assertEqual(report["requests"], self.sess.query(RequestModel).count())
+        self.assertEqual(report["allocations"], self.sess.query(AllocationModel).count())
+        self.assertEqual(report["allocations"] + report["declined"], report["requests"])
+        self.assertEqual(report["phases"]["solve"]["queries"], 0)
+        self.assertGreaterEqual(report["phases"]["solve"]["score_seconds"], 0)
+        self.assertGreater(report["phases"]["load"]["peak_memory"], 0)
+
+
+class CompareTestCase(unittest.TestCase):
+    @staticmethod
+    def _report(seconds: float, queries: int) -> dict:
+        return {
+            "parameters": {"users": 1},
+            "phases": {"load": {"seconds": seconds, "queries": queries, "peak_memory": None}},
+        }
+
+    def test_compare(self):
+        result = compare(self._report(1.1, 4), self._report(1.0, 4))
+        self.assertEqual(result["regressions"], [])
+        self.assertAlmostEqual(result["phases"]["load"]["seconds"]["change"], 0.1)
+        self.assertNotIn("peak_memory", result["phases"]["load"])
+
+        result = compare(self._report(1.5, 5), self._report(1.0, 4))
+        self.assertEqual(result["regressions"], ["load.seconds", "load.queries"])
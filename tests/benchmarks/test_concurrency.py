@@ -0,0 +1,26 @@
+"""
+Unit tests for benchmarks.concurrency
+"""
+
+import unittest
+
+from flask import Flask
+
+from benchmarks.concurrency import run_load
+
+
+class RunLoadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.add_url_rule("/ok", "ok", lambda: "ok")
+
+    def test_run_load(self):
+        for threaded in (False, True):
+            with self.subTest(threaded=threaded):
+                result = run_load(self.app, "/ok", {}, threaded, requests=20, clients=4)
+                self.assertEqual(result["errors"], 0)
+                self.assertGreater(result["requests_per_second"], 0)
+
+    def test_errors(self):
+        result = run_load(self.app, "/missing", {}, True, requests=5, clients=2)
+        self.assertEqual(result["errors"], 5)
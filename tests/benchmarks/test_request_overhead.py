@@ -0,0 +1,39 @@
+"""
+Unit tests for benchmarks.request_overhead
+"""
+
+import unittest
+
+from flask import Flask, request
+
+from benchmarks.request_overhead import time_get_session, time_requests
+from resource_allocator.config import Config
+
+
+class TimeRequestsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.add_url_rule("/ok", "ok", lambda: "ok", methods=["GET", "POST"])
+        self.app.add_url_rule("/echo", "echo", lambda: request.get_json(), methods=["PUT"])
+
+    def test_time_requests(self):
+        result = time_requests(self.app, "GET", lambda i: "/ok", None, {}, requests=10)
+        self.assertEqual(result["errors"], 0)
+        self.assertGreater(result["mean_us"], 0)
+        self.assertGreater(result["median_us"], 0)
+
+    def test_body(self):
+        result = time_requests(
+            self.app, "PUT", lambda i: "/echo", lambda i: {"i": i}, {}, requests=3,
+        )
+        self.assertEqual(result["errors"], 0)
+
+    def test_errors(self):
+        result = time_requests(self.app, "GET", lambda i: "/missing", None, {}, requests=4)
+        self.assertEqual(result["errors"], 4)
+
+
+class TimeGetSessionTestCase(unittest.TestCase):
+    def test_time_get_session(self):
+        _ = Config.from_environment()
+        self.assertGreater(time_get_session(calls=10), 0)
@@ -0,0 +1,137 @@
+"""
+Unit tests for engine.allocate
+"""
+
+import datetime as dt
+import random
+import unittest
+
+from resource_allocator.engine.allocate import allocate, build_snapshot
+from resource_allocator.engine.records import (
+    Allocation,
+    GroupRecord,
+    RequestRecord,
+    ResourceRecord,
+)
+from resource_allocator.engine.reference import ReferenceAllocator
+
+
+class AllocateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.date = dt.date(2025, 1, 1)
+        self.groups = [
+            GroupRecord(1, 1),
+            GroupRecord(2, 1),
+            GroupRecord(3, 1),
+            GroupRecord(4, 4),
+        ]
+        self.resources = [
+            ResourceRecord(1, 1, (2,)),
+            ResourceRecord(2, 1, (3,)),
+            ResourceRecord(3, 4),
+        ]
+        self.requests = [
+            RequestRecord(1, 1, self.date, requested_resource_id=1),
+            RequestRecord(2, 2, self.date, requested_resource_id=1),
+            RequestRecord(3, 3, self.date, requested_resource_group_id=4),
+            RequestRecord(4, 4, self.date, requested_resource_group_id=4),
+            RequestRecord(5, 5, self.date, requested_resource_id=3, pending=False),
+        ]
+
+    def test_allocate(self):
+        allocations, declined = allocate(self.requests, self.resources, self.groups)
+        self.assertEqual(
+            sorted(allocations),
+            [
+                Allocation(self.date, 1, 1, 1, 17),
+                Allocation(self.date, 2, 2, 2, 5),
+                Allocation(self.date, 5, 5, 3, 7),
+            ],
+        )
+        self.assertEqual(declined, [3, 4])
+
+    def test_allocated(self):
+        allocations, declined = allocate(
+            self.requests,
+            self.resources,
+            self.groups,
+            allocated={self.date: [3]},
+        )
+        self.assertEqual(
+            sorted((item.source_request_id, item.allocated_resource_id) for item in allocations),
+            [(1, 1), (2, 2)],
+        )
+        self.assertEqual(declined, [3, 4])
+
+    def test_proximity(self):
+        """
+        The resource next to the requested one wins the tie once proximity is scored
+        """
+        resources = [
+            ResourceRecord(1, 1, location=(0.0, 0.0)),
+            ResourceRecord(2, 1, location=(10.0, 0.0)),
+            ResourceRecord(3, 1, location=(1.0, 0.0)),
+        ]
+        requests = [
+            RequestRecord(1, 1, self.date, requested_resource_id=1),
+            RequestRecord(2, 2, self.date, requested_resource_id=1),
+        ]
+        allocations, _ = allocate(requests, resources, self.groups)
+        self.assertEqual(
+            sorted(allocations),
+            [Allocation(self.date, 1, 1, 1, 7), Allocation(self.date, 2, 2, 2, 5)],
+        )
+
+        allocations, _ = allocate(requests, resources, self.groups, proximity_radius=2.0)
+        self.assertEqual(
+            sorted(allocations),
+            [Allocation(self.date, 1, 1, 1, 8), Allocation(self.date, 2, 2, 3, 6)],
+        )
+
+    def test_skips_handled_partitions(self):
+        snapshot = build_snapshot(
+            self.requests[:2] + self.requests[4:], self.resources, self.groups, dict(),
+        )
+        self.assertEqual([problem.key for problem in snapshot.problems], [(self.date, 1)])
+
+    def test_matches_reference(self):
+        rng = random.Random(0)
+        groups = [GroupRecord(1, 1)] + [GroupRecord(id, 1) for id in range(2, 6)]
+        for index in range(100):
+            resources = [
+                ResourceRecord(
+                    id,
+                    1,
+                    tuple(rng.sample(range(2, 6), rng.randint(0, 2))),
+                )
+                for id in range(1, rng.randint(2, 10))
+            ]
+            requests = [
+                RequestRecord(
+                    id,
+                    rng.randint(1, 8),
+                    self.date,
+                    requested_resource_id=rng.choice([None, rng.choice(resources).id]),
+                    requested_resource_group_id=rng.randint(1, 5),
+                )
+                for id in range(1, rng.randint(2, 12))
+            ]
+            reference = ReferenceAllocator(resources, groups)
+            points = {
+                (request, resource): reference.assign_points(request, resource)
+                for resource in resources
+                for request in requests
+            }
+            expected = [
+                (request.id, resource.id, value)
+                for request, resource, value in reference.select_greedy(points)
+            ]
+            allocations, _ = allocate(requests, resources, groups)
+            with self.subTest(index=index):
+                self.assertEqual(
+                    [
+                        (item.source_request_id, item.allocated_resource_id, item.points)
+                        for item in allocations
+                    ],
+                    expected,
+                )
@@ -0,0 +1,181 @@
+"""
+Unit tests for engine.cache
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+import unittest
+
+import numpy as np
+
+from resource_allocator.engine.cache import (
+    SolutionCache,
+    subproblem_fingerprint,
+    topology_fingerprint,
+)
+from resource_allocator.engine.solver import partition, solve_subproblems
+from resource_allocator.engine.topology import ResourceTopology
+from tests.engine.test_solver import make_problems
+
+
+class DictStore:
+    """
+    In-memory stand-in for the table tier
+    """
+    def __init__(self):
+        self.items = dict()
+
+    def get(self, key):
+        return self.items.get(key)
+
+    def put(self, key, solution):
+        self.items[key] = [list(item) for item in solution]
+
+
+class SolutionCacheTestCase(unittest.TestCase):
+    def test_lru(self):
+        cache = SolutionCache(maxsize=2)
+        cache.put("a", [(1, 1, 5)])
+        cache.put("b", [])
+        self.assertEqual(cache.get("a"), [(1, 1, 5)])
+        cache.put("c", [(2, 2, 5)])
+
+        #   "b" is the least recently used
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [(1, 1, 5)])
+        self.assertEqual(cache.get("c"), [(2, 2, 5)])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_store(self):
+        store = DictStore()
+        SolutionCache(store=store).put("a", [(1, 1, 5)])
+        self.assertEqual(store.items, {"a": [[1, 1, 5]]})
+
+        cache = SolutionCache(store=store)
+        self.assertEqual(cache.get("a"), [(1, 1, 5)])
+        self.assertEqual(list(cache.entries), ["a"])
+        self.assertIsNone(cache.get("b"))
+
+        #   A read-only cache shares the memory tier but leaves the store as it is
+        cache.read_only().put("b", [(2, 2, 5)])
+        self.assertEqual(list(store.items), ["a"])
+        self.assertEqual(cache.get("b"), [(2, 2, 5)])
+
+    def test_threads(self):
+        cache = SolutionCache(maxsize=8, store=DictStore())
+
+        def work(thread: int) -> None:
+            for i in range(500):
+                key = str((thread * 7 + i) % 32)
+                if cache.get(key) is None:
+                    cache.put(key, [(i, thread, 1)])
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            _ = list(executor.map(work, range(8)))
+
+        self.assertEqual(len(cache), 8)
+        self.assertEqual(cache.hits + cache.misses, 8 * 500)
+        self.assertEqual(len(cache.store.items), 32)
+
+
+class FingerprintTestCase(unittest.TestCase):
+    def setUp(self):
+        self.topology, arrays = make_problems(np.random.default_rng(0))
+        self.problem = partition(self.topology, **arrays)[0]
+        self.key = topology_fingerprint(self.topology)
+
+    def test_fingerprint(self):
+        fingerprint = subproblem_fingerprint(self.key, self.problem, "greedy")
+        self.assertEqual(fingerprint, subproblem_fingerprint(self.key, self.problem, "greedy"))
+
+        changes = [
+            subproblem_fingerprint(self.key, self.problem, "optimal"),
+            subproblem_fingerprint(self.key, self.problem, "greedy", time_budget=1.0),
+            subproblem_fingerprint(
+                self.key,
+                self.problem,
+                "greedy",
+                previous_resources=np.zeros(len(self.problem.request_ids), dtype=np.int64),
+            ),
+            subproblem_fingerprint(
+                self.key,
+                replace(self.problem, resources=self.problem.resources[1:]),
+                "greedy",
+            ),
+            subproblem_fingerprint(
+                self.key,
+                replace(self.problem, user_ids=self.problem.user_ids[::-1]),
+                "greedy",
+            ),
+        ]
+        self.assertNotIn(fingerprint, changes)
+        self.assertEqual(len(set(changes)), len(changes))
+
+    def test_topology_fingerprint(self):
+        topology = ResourceTopology(
+            resource_ids=self.topology.resource_ids,
+            resource_top_ids=self.topology.resource_top_ids,
+            group_ids=self.topology.group_ids,
+            group_top_ids=self.topology.group_top_ids,
+            membership=~self.topology.membership,
+        )
+        self.assertNotEqual(topology_fingerprint(topology), self.key)
+
+
+class CachedSolveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.topology, self.arrays = make_problems(np.random.default_rng(2))
+        self.problems = partition(self.topology, **self.arrays)
+        self.expected = solve_subproblems(self.topology, self.problems)
+
+    def test_reuse(self):
+        cache = SolutionCache()
+        self.assertEqual(
+            solve_subproblems(self.topology, self.problems, cache=cache), self.expected,
+        )
+        self.assertEqual((cache.hits, len(cache)), (0, len(self.problems)))
+
+        timings = dict()
+        self.assertEqual(
+            solve_subproblems(self.topology, self.problems, cache=cache, timings=timings),
+            self.expected,
+        )
+        self.assertEqual(cache.hits, len(self.problems))
+        self.assertEqual(timings, {"score": 0.0, "select": 0.0})
+
+    def test_changed_date(self):
+        """
+        Only the changed date is solved again - and later dates of its top resource group if its
+        solution changes their continuity points
+        """
+        cache = SolutionCache()
+        _ = solve_subproblems(self.topology, self.problems, cache=cache)
+        last_date = max(problem.date for problem in self.problems)
+        arrays = {
+            **self.arrays,
+            "allocated": {
+                **self.arrays["allocated"],
+                last_date: self.topology.resource_ids.tolist(),
+            },
+        }
+        problems = partition(self.topology, **arrays)
+        result = solve_subproblems(self.topology, problems, cache=cache)
+        self.assertEqual(result, solve_subproblems(self.topology, problems))
+        self.assertEqual(
+            cache.hits,
+            len([problem for problem in problems if problem.date != last_date]),
+        )
+
+    def test_parallel(self):
+        cache = SolutionCache()
+        self.assertEqual(
+            solve_subproblems(self.topology, self.problems, workers=2, cache=cache),
+            self.expected,
+        )
+        self.assertEqual(len(cache), len(self.problems))
+        self.assertEqual(
+            solve_subproblems(self.topology, self.problems, workers=2, cache=cache),
+            self.expected,
+        )
+        self.assertEqual(cache.hits, len(self.problems))
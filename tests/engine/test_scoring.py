@@ -0,0 +1,147 @@
+"""
+Unit tests for engine.scoring
+"""
+
+import datetime as dt
+import random
+import unittest
+
+import numpy as np
+
+from resource_allocator.engine.records import (
+    Allocation,
+    GroupRecord,
+    RequestRecord,
+    ResourceRecord,
+)
+from resource_allocator.engine.reference import ReferenceAllocator
+from resource_allocator.engine.scoring import score_matrix
+from resource_allocator.engine.topology import ResourceTopology
+
+
+class ScoreMatrixTestCase(unittest.TestCase):
+    """
+    Property test: the score matrix equals ReferenceAllocator.assign_points for every pair
+    """
+    @staticmethod
+    def _make_problem(
+        rng: random.Random,
+    ) -> tuple[list[RequestRecord], list[ResourceRecord], list[GroupRecord]]:
+        tops = [GroupRecord(id=id, top_resource_group_id=id) for id in (1, 2)]
+        groups = tops + [
+            GroupRecord(id=id, top_resource_group_id=rng.choice([1, 2, None]))
+            for id in range(3, rng.randint(3, 10))
+        ]
+        resources = [
+            ResourceRecord(
+                id=id,
+                top_resource_group_id=rng.choice(tops).id,
+                group_ids=tuple(
+                    group.id
+                    for group in rng.sample(groups, rng.randint(0, min(3, len(groups))))
+                ),
+                location=(
+                    (rng.uniform(0, 10), rng.uniform(0, 10)) if rng.random() < 0.8 else None
+                ),
+            )
+            for id in range(1, rng.randint(2, 12))
+        ]
+        requests = []
+        for id in range(1, rng.randint(1, 12)):
+            resource = rng.choice(resources) if rng.random() < 0.5 else None
+            group = rng.choice(groups) if resource is None or rng.random() < 0.1 else None
+            requests.append(RequestRecord(
+                id=id,
+                user_id=id,
+                date=dt.date(2025, 1, 1),
+                requested_resource_id=resource and resource.id,
+                requested_resource_group_id=group and group.id,
+            ))
+
+        return requests, resources, groups
+
+    def check_assign_points(self, seed: int, proximity_radius: float | None = None):
+        rng = random.Random(seed)
+        for index in range(300):
+            requests, resources, groups = self._make_problem(rng)
+            previous = [
+                Allocation(dt.date(2024, 12, 31), 0, request.user_id, rng.choice(resources).id, 0)
+                for request in requests
+                if rng.random() < 0.5
+            ]
+            reference = ReferenceAllocator(resources, groups, previous, proximity_radius)
+            resource_index = {resource.id: index for index, resource in enumerate(resources)}
+            group_index = {group.id: index for index, group in enumerate(groups)}
+
+            membership = np.zeros((len(resources), len(groups)), dtype=bool)
+            for row, resource in enumerate(resources):
+                for group_id in resource.group_ids:
+                    membership[row, group_index[group_id]] = True
+
+            requested_top_ids = []
+            for request in requests:
+                top_id = reference.requested_top_id(request)
+                requested_top_ids.append(-1 if top_id is None else top_id)
+
+            requested_resources = np.array(
+                [resource_index.get(request.requested_resource_id, -1) for request in requests],
+                dtype=np.int64,
+            )
+            previous_resources = np.array(
+                [
+                    next(
+                        (
+                            resource_index[item.allocated_resource_id]
+                            for item in previous
+                            if item.user_id == request.user_id
+                        ),
+                        -1,
+                    )
+                    for request in requests
+                ],
+                dtype=np.int64,
+            )
+            near = None
+            if proximity_radius is not None:
+                topology = ResourceTopology.from_records(resources, groups, proximity_radius)
+                near = topology.near_resources(
+                    np.stack([requested_resources, previous_resources], axis=1),
+                    np.arange(len(resources)),
+                )
+
+            result = score_matrix(
+                membership=membership,
+                resource_top_ids=np.array(
+                    [resource.top_resource_group_id for resource in resources],
+                ),
+                requested_resources=requested_resources,
+                requested_groups=np.array([
+                    group_index.get(request.requested_resource_group_id, -1)
+                    for request in requests
+                ]),
+                requested_top_ids=np.array(requested_top_ids),
+                previous_resources=previous_resources,
+                near=near,
+            )
+            expected = [
+                [reference.assign_points(request, resource) for resource in resources]
+                for request in requests
+            ]
+            with self.subTest(index=index):
+                self.assertEqual(result.tolist(), expected)
+
+    def test_matches_assign_points(self):
+        self.check_assign_points(0)
+
+    def test_proximity_matches_assign_points(self):
+        self.check_assign_points(1, proximity_radius=3.0)
+
+    def test_no_groups(self):
+        result = score_matrix(
+            membership=np.zeros((2, 0), dtype=bool),
+            resource_top_ids=np.array([1, 2]),
+            requested_resources=np.array([0]),
+            requested_groups=np.array([-1]),
+            requested_top_ids=np.array([1]),
+        )
+        self.assertEqual(result.tolist(), [[7, 0]])
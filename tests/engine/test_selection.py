@@ -0,0 +1,395 @@
+"""
+Unit tests for engine.selection
+"""
+
+from dataclasses import replace
+import datetime as dt
+import random
+import unittest
+
+import numpy as np
+
+from resource_allocator.engine.records import GroupRecord, RequestRecord, ResourceRecord
+from resource_allocator.engine.reference import ReferenceAllocator
+from resource_allocator.engine.selection import (
+    CandidatePool,
+    improve_selection,
+    select_flow,
+    select_greedy,
+    select_optimal,
+)
+
+
+def make_problem(
+    rng: random.Random,
+    max_capacity: int = 1,
+) -> tuple[ReferenceAllocator, list[RequestRecord], list[ResourceRecord], dict]:
+    """
+    Random requests, resources with capacities up to max_capacity and the points of every
+    (request, resource) pair
+    """
+    groups = [
+        GroupRecord(id=id, top_resource_group_id=rng.randint(1, 3))
+        for id in range(1, 6)
+    ]
+    resources = [
+        ResourceRecord(
+            id=id,
+            top_resource_group_id=rng.randint(1, 3),
+            capacity=rng.randint(1, max_capacity),
+        )
+        for id in range(1, rng.randint(2, 15))
+    ]
+    requests = []
+    for id in range(1, rng.randint(2, 20)):
+        if rng.random() < 0.5:
+            resource_id, group_id = rng.choice(resources).id, None
+        else:
+            resource_id, group_id = None, rng.choice(groups).id
+
+        requests.append(RequestRecord(
+            id=id,
+            user_id=rng.randint(1, 6),
+            date=dt.date(2025, 1, 1),
+            requested_resource_id=resource_id,
+            requested_resource_group_id=group_id,
+        ))
+
+    points = {
+        (request, resource): rng.choice([0, 0, 2, 5, 10, 12, 15, 17, 20, 25, 27])
+        for resource in resources
+        for request in requests
+    }
+    return ReferenceAllocator(resources, groups), requests, resources, points
+
+
+def to_arrays(
+    reference: ReferenceAllocator,
+    requests: list[RequestRecord],
+    resources: list[ResourceRecord],
+    points: dict,
+) -> dict:
+    """
+    Convert a problem to the keyword arguments of the selection functions
+    """
+    return {
+        "points": np.array(
+            [[points[(request, resource)] for resource in resources] for request in requests],
+            dtype=np.int32,
+        ).reshape(len(requests), len(resources)),
+        "user_ids": np.array([request.user_id for request in requests]),
+        "requested_top_ids": np.array([
+            reference.requested_top_id(request)
+            for request in requests
+        ]),
+        "resource_top_ids": np.array([resource.top_resource_group_id for resource in resources]),
+        "capacities": np.array([resource.capacity for resource in resources], dtype=np.int64),
+    }
+
+
+def check_constraints(
+    testcase: unittest.TestCase,
+    requests: list[RequestRecord],
+    resources: list[ResourceRecord],
+    arrays: dict,
+    result: list[tuple[int, int, int]],
+) -> None:
+    """
+    Assert that a selection stays within the capacities, allocates each request once and each
+    user once per top resource group, and only uses pairs with points
+    """
+    rows = [row for row, _, _ in result]
+    user_tops = [
+        (requests[row].user_id, resources[column].top_resource_group_id)
+        for row, column, _ in result
+    ]
+    counts = np.bincount(
+        np.array([column for _, column, _ in result], dtype=np.int64),
+        minlength=len(resources),
+    )
+    testcase.assertTrue((counts <= arrays["capacities"]).all())
+    testcase.assertEqual(len(set(rows)), len(rows))
+    testcase.assertEqual(len(set(user_tops)), len(user_tops))
+    testcase.assertTrue(all(
+        arrays["points"][row, column] == value > 0
+        for row, column, value in result
+    ))
+
+
+class CandidatePoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = CandidatePool(
+            points=np.array([
+                [5, 0, 7],
+                [5, 2, 0],
+                [0, 9, 5],
+            ]),
+            user_ids=np.array([1, 2, 1]),
+            requested_top_ids=np.array([1, 1, 2]),
+        )
+
+    def test_order(self):
+        self.assertEqual(self.pool.size, 6)
+        self.assertEqual(self.pool.values.tolist(), [9, 7, 5, 5, 5, 2])
+        self.assertEqual(self.pool.columns.tolist(), [1, 2, 0, 0, 2, 1])
+        self.assertEqual(self.pool.rows.tolist(), [2, 0, 0, 1, 2, 1])
+
+    def test_remove(self):
+        self.pool.remove_resource(0)
+        self.assertEqual(self.pool.size, 4)
+        self.assertEqual(self.pool.alive.tolist(), [True, True, False, False, True, True])
+
+        #   Only requests for top group 2 of user 1 are removed
+        self.pool.remove_user(1, 2)
+        self.assertEqual(self.pool.size, 2)
+        self.assertEqual(self.pool.alive.tolist(), [False, True, False, False, False, True])
+
+        self.assertEqual(self.pool.pop(), 1)
+        self.pool.remove_resource(2)
+        self.assertEqual(self.pool.pop(), 5)
+        self.pool.remove_resource(1)
+        self.assertIsNone(self.pool.pop())
+
+
+class SelectGreedyTestCase(unittest.TestCase):
+    """
+    Compare greedy selection against the pair-by-pair reference on random inputs
+    """
+    def test_matches_reference(self):
+        rng = random.Random(0)
+        for index in range(500):
+            reference, requests, resources, points = make_problem(rng)
+            result = select_greedy(**to_arrays(reference, requests, resources, points))
+            with self.subTest(index=index):
+                self.assertEqual(
+                    [(requests[row], resources[column], value) for row, column, value in result],
+                    reference.select_greedy(points),
+                )
+
+    def test_capacity_matches_reference(self):
+        rng = random.Random(4)
+        for index in range(300):
+            reference, requests, resources, points = make_problem(rng, max_capacity=3)
+            result = select_greedy(**to_arrays(reference, requests, resources, points))
+            with self.subTest(index=index):
+                self.assertEqual(
+                    [(requests[row], resources[column], value) for row, column, value in result],
+                    reference.select_greedy(points),
+                )
+
+    def test_empty(self):
+        self.assertEqual(select_greedy(**to_arrays(ReferenceAllocator([], []), [], [], {})), [])
+
+
+class SelectOptimalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.reference = ReferenceAllocator(
+            resources=[],
+            groups=[GroupRecord(id=1, top_resource_group_id=1)],
+        )
+        self.resources = [ResourceRecord(id=id, top_resource_group_id=1) for id in (1, 2)]
+        self.requests = [
+            RequestRecord(
+                id=id,
+                user_id=id,
+                date=dt.date(2025, 1, 1),
+                requested_resource_group_id=1,
+            )
+            for id in (1, 2)
+        ]
+
+    def test_better_than_greedy(self):
+        points = {
+            (self.requests[0], self.resources[0]): 10,
+            (self.requests[1], self.resources[0]): 10,
+            (self.requests[0], self.resources[1]): 9,
+            (self.requests[1], self.resources[1]): 0,
+        }
+        arrays = to_arrays(self.reference, self.requests, self.resources, points)
+        greedy = select_greedy(**arrays)
+        optimal = select_optimal(**arrays)
+        self.assertEqual(sum(item[2] for item in greedy), 10)
+        self.assertEqual(sum(item[2] for item in optimal), 19)
+        self.assertEqual({(row, column) for row, column, _ in optimal}, {(0, 1), (1, 0)})
+
+    def test_same_user_and_top_group(self):
+        self.requests[1] = replace(self.requests[1], user_id=self.requests[0].user_id)
+        points = {
+            (request, resource): 5
+            for request in self.requests
+            for resource in self.resources
+        }
+        result = select_optimal(**to_arrays(self.reference, self.requests, self.resources, points))
+        self.assertEqual(len(result), 1)
+
+    def test_random_constraints(self):
+        rng = random.Random(1)
+        for index in range(200):
+            reference, requests, resources, points = make_problem(rng)
+            arrays = to_arrays(reference, requests, resources, points)
+            result = select_optimal(**arrays)
+            with self.subTest(index=index):
+                columns = [column for _, column, _ in result]
+                user_tops = [
+                    (requests[row].user_id, resources[column].top_resource_group_id)
+                    for row, column, _ in result
+                ]
+                self.assertEqual(len(set(columns)), len(columns))
+                self.assertEqual(len(set(user_tops)), len(user_tops))
+                self.assertTrue(all(
+                    arrays["points"][row, column] == value > 0
+                    for row, column, value in result
+                ))
+
+    def test_empty(self):
+        self.assertEqual(select_optimal(**to_arrays(self.reference, [], [], {})), [])
+
+
+class SelectFlowTestCase(unittest.TestCase):
+    def total(self, selection: list[tuple[int, int, int]]) -> int:
+        return sum(value for _, _, value in selection)
+
+    def test_capacity(self):
+        """
+        Both users fit on the resource with capacity 2 - the other resource is worth less
+        """
+        reference = ReferenceAllocator([], [GroupRecord(id=1, top_resource_group_id=1)])
+        resources = [
+            ResourceRecord(id=1, top_resource_group_id=1, capacity=2),
+            ResourceRecord(id=2, top_resource_group_id=1),
+        ]
+        requests = [
+            RequestRecord(
+                id=id,
+                user_id=id,
+                date=dt.date(2025, 1, 1),
+                requested_resource_group_id=1,
+            )
+            for id in (1, 2, 3)
+        ]
+        points = {
+            (request, resource): 10 if resource.id == 1 else 5
+            for request in requests
+            for resource in resources
+        }
+        arrays = to_arrays(reference, requests, resources, points)
+        result = select_flow(**arrays)
+        self.assertEqual(self.total(result), 25)
+        self.assertEqual(sorted(column for _, column, _ in result), [0, 0, 1])
+        self.assertEqual(select_optimal(**arrays), result)
+
+    def test_matches_optimal(self):
+        rng = random.Random(5)
+        for index in range(200):
+            reference, requests, resources, points = make_problem(rng)
+            arrays = to_arrays(reference, requests, resources, points)
+            result = select_flow(**arrays)
+            with self.subTest(index=index):
+                check_constraints(self, requests, resources, arrays, result)
+                self.assertEqual(self.total(result), self.total(select_optimal(**arrays)))
+
+    def test_random_capacity(self):
+        rng = random.Random(6)
+        for index in range(200):
+            reference, requests, resources, points = make_problem(rng, max_capacity=3)
+            arrays = to_arrays(reference, requests, resources, points)
+            arrays["points"][
+                arrays["requested_top_ids"][:, None] != arrays["resource_top_ids"][None, :]
+            ] = 0
+            result = select_flow(**arrays)
+            with self.subTest(index=index):
+                check_constraints(self, requests, resources, arrays, result)
+                self.assertLessEqual(self.total(select_greedy(**arrays)), self.total(result))
+
+    def test_empty(self):
+        reference = ReferenceAllocator([], [])
+        self.assertEqual(select_flow(**to_arrays(reference, [], [], {})), [])
+
+
+class ImproveSelectionTestCase(unittest.TestCase):
+    def total(self, selection: list[tuple[int, int, int]]) -> int:
+        return sum(value for _, _, value in selection)
+
+    def make_arrays(self, rng: random.Random, max_capacity: int = 1) -> tuple:
+        """
+        make_problem with points only within the requested top resource group - as scored
+        """
+        reference, requests, resources, points = make_problem(rng, max_capacity)
+        arrays = to_arrays(reference, requests, resources, points)
+        arrays["points"][
+            arrays["requested_top_ids"][:, None] != arrays["resource_top_ids"][None, :]
+        ] = 0
+        return reference, requests, resources, arrays
+
+    def test_better_than_greedy(self):
+        """
+        The waiting request takes the contested resource and the holder moves to the other one
+        """
+        requests = [
+            RequestRecord(
+                id=id,
+                user_id=id,
+                date=dt.date(2025, 1, 1),
+                requested_resource_group_id=1,
+            )
+            for id in (1, 2)
+        ]
+        resources = [ResourceRecord(id=id, top_resource_group_id=1) for id in (1, 2)]
+        reference = ReferenceAllocator([], [GroupRecord(id=1, top_resource_group_id=1)])
+        points = {
+            (requests[0], resources[0]): 10,
+            (requests[1], resources[0]): 10,
+            (requests[0], resources[1]): 9,
+            (requests[1], resources[1]): 0,
+        }
+        arrays = to_arrays(reference, requests, resources, points)
+        greedy = select_greedy(**arrays)
+        result, iterations = improve_selection(
+            **arrays, selection=greedy, deadline=float("inf"),
+        )
+        self.assertEqual(self.total(greedy), 10)
+        self.assertEqual(result, [(0, 1, 9), (1, 0, 10)])
+        self.assertEqual(iterations, 1)
+
+    def test_deadline(self):
+        _, _, _, arrays = self.make_arrays(random.Random(2))
+        greedy = select_greedy(**arrays)
+        result, iterations = improve_selection(**arrays, selection=greedy, deadline=0.0)
+        self.assertEqual(result, sorted(greedy))
+        self.assertEqual(iterations, 0)
+
+    def test_random_between_greedy_and_optimal(self):
+        rng = random.Random(3)
+        for index in range(200):
+            reference, requests, resources, arrays = self.make_arrays(rng)
+            greedy = select_greedy(**arrays)
+            result, _ = improve_selection(**arrays, selection=greedy, deadline=float("inf"))
+            with self.subTest(index=index):
+                rows = [row for row, _, _ in result]
+                columns = [column for _, column, _ in result]
+                user_tops = [
+                    (requests[row].user_id, resources[column].top_resource_group_id)
+                    for row, column, _ in result
+                ]
+                self.assertEqual(len(set(rows)), len(rows))
+                self.assertEqual(len(set(columns)), len(columns))
+                self.assertEqual(len(set(user_tops)), len(user_tops))
+                self.assertTrue(all(
+                    arrays["points"][row, column] == value > 0
+                    and reference.requested_top_id(requests[row])
+                    == resources[column].top_resource_group_id
+                    for row, column, value in result
+                ))
+                self.assertLessEqual(self.total(greedy), self.total(result))
+                self.assertLessEqual(self.total(result), self.total(select_optimal(**arrays)))
+
+    def test_random_capacity(self):
+        rng = random.Random(7)
+        for index in range(200):
+            reference, requests, resources, arrays = self.make_arrays(rng, max_capacity=3)
+            greedy = select_greedy(**arrays)
+            result, _ = improve_selection(**arrays, selection=greedy, deadline=float("inf"))
+            with self.subTest(index=index):
+                check_constraints(self, requests, resources, arrays, result)
+                self.assertLessEqual(self.total(greedy), self.total(result))
+                self.assertLessEqual(self.total(result), self.total(select_flow(**arrays)))
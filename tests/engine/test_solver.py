@@ -0,0 +1,266 @@
+"""
+Unit tests for engine.solver
+"""
+
+import datetime as dt
+import unittest
+
+import numpy as np
+
+from resource_allocator.engine.records import Allocation
+from resource_allocator.engine.selection import select_greedy
+from resource_allocator.engine.scoring import score_matrix
+from resource_allocator.engine.solver import (
+    Subproblem,
+    partition,
+    solve_subproblem,
+    solve_subproblems,
+)
+from resource_allocator.engine.topology import ResourceTopology
+
+
+def make_problems(
+    rng: np.random.Generator,
+    n_dates: int = 4,
+) -> tuple[ResourceTopology, dict]:
+    """
+    Random topology with two top resource groups and random requests for several dates. Returns
+    the keyword arguments of partition
+    """
+    n_resources = 30
+    topology = ResourceTopology.from_rows(
+        resource_rows=[
+            (id, 1 + id % 2, int(rng.integers(3, 8)))
+            for id in range(1, n_resources + 1)
+        ],
+        group_rows=[(1, 1), (2, 2)] + [(id, 1 + id % 2) for id in range(3, 8)],
+    )
+    n_requests = int(rng.integers(20, 150))
+    by_resource = rng.random(n_requests) < 0.5
+    dates = [dt.date(2020, 1, 1) + dt.timedelta(days=offset) for offset in range(n_dates)]
+    arrays = {
+        "dates": np.array([dates[index] for index in rng.integers(0, n_dates, n_requests)]),
+        "request_ids": np.arange(n_requests),
+        "user_ids": rng.integers(1, 25, n_requests),
+        "requested_resources": np.where(
+            by_resource, rng.integers(0, n_resources, n_requests), -1,
+        ),
+        "requested_groups": np.where(by_resource, -1, rng.integers(0, 7, n_requests)),
+        "allocated": {
+            date: rng.choice(topology.resource_ids, 6, replace=False).tolist()
+            for date in dates
+        },
+    }
+    return topology, arrays
+
+
+class PartitionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.topology, self.arrays = make_problems(np.random.default_rng(0))
+
+    def test_partition(self):
+        problems = partition(self.topology, **self.arrays)
+        self.assertEqual(
+            [problem.key for problem in problems],
+            sorted({
+                (problem.date, problem.top_resource_group_id)
+                for problem in problems
+            }),
+        )
+        self.assertEqual(
+            sorted(np.concatenate([problem.request_ids for problem in problems]).tolist()),
+            self.arrays["request_ids"].tolist(),
+        )
+        for problem in problems:
+            with self.subTest(key=problem.key):
+                self.assertTrue(
+                    (problem.requested_top_ids == problem.top_resource_group_id).all()
+                )
+                self.assertTrue(
+                    (self.topology.resource_top_ids[problem.resources]
+                        == problem.top_resource_group_id).all()
+                )
+                self.assertFalse(np.isin(
+                    self.topology.resource_ids[problem.resources],
+                    self.arrays["allocated"][problem.date],
+                ).any())
+
+    def test_skip_without_pending_requests(self):
+        pending = np.zeros(len(self.arrays["request_ids"]), dtype=bool)
+        self.assertEqual(partition(self.topology, **self.arrays, pending=pending), [])
+
+        pending[0] = True
+        problems = partition(self.topology, **self.arrays, pending=pending)
+        self.assertEqual(len(problems), 1)
+        self.assertIn(0, problems[0].request_ids.tolist())
+
+    def test_capacities(self):
+        """
+        A resource is free while it has capacity left - each allocation on the date uses one unit
+        """
+        topology = ResourceTopology.from_rows(
+            resource_rows=[(1, 1, None), (2, 1, None), (3, 1, None)],
+            group_rows=[(1, 1)],
+            capacities={1: 3, 2: 2},
+        )
+        problems = partition(
+            topology,
+            dates=np.array([dt.date(2020, 1, 1)]),
+            request_ids=np.array([1]),
+            user_ids=np.array([1]),
+            requested_resources=np.array([-1]),
+            requested_groups=np.array([0]),
+            allocated={dt.date(2020, 1, 1): [1, 2, 2, 3]},
+        )
+        self.assertEqual(problems[0].resources.tolist(), [0])
+        self.assertEqual(problems[0].capacities.tolist(), [2])
+
+        problems = partition(
+            topology,
+            dates=np.array([dt.date(2020, 1, 1)]),
+            request_ids=np.array([1]),
+            user_ids=np.array([1]),
+            requested_resources=np.array([-1]),
+            requested_groups=np.array([0]),
+            allocated={dt.date(2020, 1, 1): [1, 1, 2]},
+        )
+        self.assertEqual(problems[0].resources.tolist(), [0, 1, 2])
+        self.assertIsNone(problems[0].capacities)
+
+    def test_unknown_top_group(self):
+        self.arrays["requested_resources"][:] = -1
+        self.arrays["requested_groups"][:] = -1
+        self.assertEqual(partition(self.topology, **self.arrays), [])
+
+
+class SolveSubproblemsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.topology, self.arrays = make_problems(np.random.default_rng(0))
+        self.problems = partition(self.topology, **self.arrays)
+
+    def test_solve_subproblem(self):
+        problem: Subproblem = self.problems[0]
+        result = solve_subproblem(self.topology, problem)
+        self.assertTrue(result)
+        resource_ids = set(self.topology.resource_ids[problem.resources].tolist())
+        for request_id, resource_id, points in result:
+            self.assertIn(request_id, problem.request_ids.tolist())
+            self.assertIn(resource_id, resource_ids)
+            self.assertGreater(points, 0)
+
+    def test_matches_whole_date(self):
+        """
+        Solving the partitions of a date gives the same greedy result as solving the whole date
+        with pairs across top resource groups masked out
+        """
+        arrays = self.arrays
+        date = arrays["dates"][0]
+        partitioned = set()
+        for key, result in solve_subproblems(self.topology, self.problems).items():
+            if key[0] == date:
+                partitioned.update(result)
+
+        rows = np.flatnonzero(arrays["dates"] == date)
+        requested_top_ids = self.topology.requested_top_ids(
+            arrays["requested_resources"][rows], arrays["requested_groups"][rows],
+        )
+        resources = np.flatnonzero(
+            ~np.isin(self.topology.resource_ids, arrays["allocated"][date])
+        )
+        resource_top_ids = self.topology.resource_top_ids[resources]
+        points = score_matrix(
+            membership=self.topology.membership,
+            resource_top_ids=self.topology.resource_top_ids,
+            requested_resources=arrays["requested_resources"][rows],
+            requested_groups=arrays["requested_groups"][rows],
+            requested_top_ids=requested_top_ids,
+            resources=resources,
+        )
+        points[requested_top_ids[:, None] != resource_top_ids[None, :]] = 0
+        whole = select_greedy(
+            points,
+            user_ids=arrays["user_ids"][rows],
+            requested_top_ids=requested_top_ids,
+            resource_top_ids=resource_top_ids,
+        )
+        self.assertEqual(
+            partitioned,
+            {
+                (
+                    int(arrays["request_ids"][rows[row]]),
+                    int(self.topology.resource_ids[resources[column]]),
+                    value,
+                )
+                for row, column, value in whole
+            },
+        )
+
+    def test_timings(self):
+        timings = dict()
+        _ = solve_subproblems(self.topology, self.problems, timings=timings)
+        self.assertEqual(set(timings), {"score", "select"})
+        self.assertTrue(all(value >= 0 for value in timings.values()))
+
+    def test_time_budget(self):
+        timings = dict()
+        greedy = solve_subproblems(self.topology, self.problems)
+        improved = solve_subproblems(
+            self.topology, self.problems, timings=timings, time_budget=1.0,
+        )
+        self.assertIn("search_iterations", timings)
+        self.assertEqual(list(improved), list(greedy))
+        for key, result in improved.items():
+            with self.subTest(key=key):
+                self.assertGreaterEqual(
+                    sum(value for _, _, value in result),
+                    sum(value for _, _, value in greedy[key]),
+                )
+
+    def test_previous_day(self):
+        """
+        The resource a user had on the previous day wins ties - whether it was allocated before
+        the run or on the previous date of the same run
+        """
+        topology = ResourceTopology.from_rows(
+            resource_rows=[(1, 1, None), (2, 1, None)],
+            group_rows=[(1, 1)],
+        )
+        dates = [dt.date(2020, 1, 2), dt.date(2020, 1, 3)]
+        problems = partition(
+            topology,
+            dates=np.array(dates),
+            request_ids=np.array([1, 2]),
+            user_ids=np.array([1, 1]),
+            requested_resources=np.array([-1, -1]),
+            requested_groups=np.array([0, 0]),
+            allocated=dict(),
+        )
+        self.assertEqual(
+            solve_subproblems(topology, problems),
+            {(dates[0], 1): [(1, 1, 5)], (dates[1], 1): [(2, 1, 7)]},
+        )
+        previous = [Allocation(dt.date(2020, 1, 1), 0, 1, 2, 5)]
+        self.assertEqual(
+            solve_subproblems(topology, problems, previous=previous),
+            {(dates[0], 1): [(1, 2, 7)], (dates[1], 1): [(2, 2, 7)]},
+        )
+
+    def test_parallel_matches_serial(self):
+        rng = np.random.default_rng(1)
+        day_before = self.arrays["dates"].min() - dt.timedelta(days=1)
+        previous = [
+            Allocation(day_before, 0, user_id, resource_id, 0)
+            for user_id, resource_id in zip(
+                range(1, 25), rng.choice(self.topology.resource_ids, 24).tolist(),
+            )
+        ]
+        for strategy in ("greedy", "optimal", "flow"):
+            with self.subTest(strategy=strategy):
+                serial = solve_subproblems(
+                    self.topology, self.problems, strategy=strategy, previous=previous,
+                )
+                parallel = solve_subproblems(
+                    self.topology, self.problems, strategy=strategy, workers=2, previous=previous,
+                )
+                self.assertEqual(serial, parallel)
+                self.assertEqual(list(parallel), [problem.key for problem in self.problems])
@@ -0,0 +1,92 @@
+"""
+Unit tests for engine.topology
+"""
+
+import unittest
+
+import numpy as np
+
+from resource_allocator.engine.topology import ResourceTopology
+
+
+class ResourceTopologyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.topology = ResourceTopology.from_rows(
+            resource_rows=[
+                (3, 4, None),
+                (1, 1, 2),
+                (2, 1, 3),
+                (1, 1, 3),
+            ],
+            group_rows=[
+                (4, 4),
+                (1, 1),
+                (2, 1),
+                (3, 1),
+                (5, None),
+            ],
+        )
+
+    def test_from_rows(self):
+        self.assertEqual(self.topology.resource_ids.tolist(), [1, 2, 3])
+        self.assertEqual(self.topology.resource_top_ids.tolist(), [1, 1, 4])
+        self.assertEqual(self.topology.group_ids.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(self.topology.group_top_ids.tolist(), [1, 1, 1, 4, -1])
+        self.assertEqual(
+            self.topology.membership.tolist(),
+            [
+                [False, True, True, False, False],
+                [False, False, True, False, False],
+                [False, False, False, False, False],
+            ],
+        )
+
+    def test_capacities(self):
+        self.assertEqual(self.topology.resource_capacities.tolist(), [1, 1, 1])
+        topology = ResourceTopology.from_rows(
+            resource_rows=[(3, 4, None), (1, 1, 2)],
+            group_rows=[(4, 4), (2, 1)],
+            capacities={3: 4},
+        )
+        self.assertEqual(topology.resource_capacities.tolist(), [1, 4])
+
+    def test_near_resources(self):
+        topology = ResourceTopology.from_rows(
+            resource_rows=[(1, 1, None), (2, 1, None), (3, 1, None), (4, 2, None), (5, 1, None)],
+            group_rows=[(1, 1), (2, 2)],
+            locations={1: (0.0, 0.0), 2: (1.0, 1.0), 3: (5.0, 0.0), 4: (0.5, 0.0)},
+            proximity_radius=1.5,
+        )
+        result = topology.near_resources(
+            anchors=np.array([[0, -1], [-1, 2], [3, 4], [-1, -1]]),
+            resources=np.array([0, 1, 2, 3, 4]),
+        )
+        self.assertEqual(
+            result.tolist(),
+            [
+                [True, True, False, False, False],
+                [False, False, True, False, False],
+                [False, False, False, True, False],
+                [False, False, False, False, False],
+            ],
+        )
+
+        #   Only the given resources are columns
+        result = topology.near_resources(np.array([[1]]), np.array([1, 2]))
+        self.assertEqual(result.tolist(), [[True, False]])
+
+    def test_index(self):
+        self.assertEqual(self.topology.resource_index([3, None, 7, 1]).tolist(), [2, -1, -1, 0])
+        self.assertEqual(self.topology.group_index([5, 0, None]).tolist(), [4, -1, -1])
+
+    def test_requested_top_ids(self):
+        result = self.topology.requested_top_ids(
+            requested_resources=np.array([2, -1, -1, -1]),
+            requested_groups=np.array([-1, 1, 4, -1]),
+        )
+        self.assertEqual(result.tolist(), [4, 1, -1, -1])
+
+    def test_empty(self):
+        topology = ResourceTopology.from_rows([], [])
+        self.assertEqual(topology.membership.shape, (0, 0))
+        self.assertEqual(topology.resource_index([1, None]).tolist(), [-1, -1])
@@ -2,12 +2,22 @@
 Unit tests for managers.allocation
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import datetime as dt
+import time
 import unittest
 
+import numpy as np
+from sqlalchemy import event, func, insert, select
+
 from resource_allocator.config import Config
-from resource_allocator.db import get_session
+from resource_allocator.db import get_session, remove_session
+from resource_allocator.engine import Allocation, ResourceRecord, ResourceTopology
 from resource_allocator.managers.allocation import AllocationManager
+from resource_allocator.managers.allocation_cache import AllocationCacheManager
+from resource_allocator.managers.dirty_cell import DirtyCellManager
+from resource_allocator.managers.image import ImagePropertiesManager
 from resource_allocator.managers.iteration import IterationManager
 from resource_allocator.managers.request import RequestManager
 from resource_allocator.managers.resource import ResourceManager, ResourceGroupManager
@@ -15,12 +25,30 @@ from resource_allocator.managers.resource_to_group import ResourceToGroupManager
 from resource_allocator.managers.user import AuthManager, UserManager
 from resource_allocator.models import (
     metadata, populate_enums, AllocationModel, IterationModel, RequestStatusEnum, RequestModel,
+    ResourceModel,
 )
 from resource_allocator.utils.db import change_schema
 
 metadata = change_schema(metadata, schema="resource_allocator_test")
 
 
+@contextmanager
+def count_statements(engine):
+    """
+    Collect the SQL statements sent to the database within the block
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
 class AllocationManagerTestCase(unittest.TestCase):
     def setUp(self):
         self.config = Config.from_environment()
@@ -219,6 +247,549 @@ class AllocationManagerTestCase(unittest.TestCase):
         self.assertEqual(len(new), 0)
         self.assertEqual(len(AllocationManager.list_all_items()), len(result))
 
+    def test_automatic_allocation_skips_declined_partitions(self):
+        result = AllocationManager.automatic_allocation(self.allocation_args)
+
+        #   A deleted allocation declines its request - a full run leaves the partition alone
+        AllocationManager.delete_item(result[0].id)
+        new = AllocationManager.automatic_allocation(self.allocation_args)
+        self.assertEqual(new, [])
+        self.assertEqual(
+            self.sess.get(RequestModel, result[0].source_request_id)
+            .request_status.request_status,
+            RequestStatusEnum.declined.value,
+        )
+
+    def test_automatic_allocation_previous_day(self):
+        #   User 2 gets desk 2 on the first day - both desks of the top group tie on the second
+        request = RequestManager.create_item({
+            "iteration_id": 1,
+            "requested_date": dt.date(2020, 1, 2),
+            "user_id": 2,
+            "requested_resource_group_id": 1,
+        })
+        result = AllocationManager.automatic_allocation(self.allocation_args)
+        allocation = next(item for item in result if item.source_request_id == request.id)
+        self.assertEqual((allocation.allocated_resource_id, allocation.points), (2, 7))
+
+        #   Single requests get the points from the allocations in the database
+        request = RequestManager.create_item({
+            "iteration_id": 1,
+            "requested_date": dt.date(2020, 1, 3),
+            "user_id": 2,
+            "requested_resource_group_id": 1,
+        })
+        self.assertEqual(
+            (request.allocation.allocated_resource_id, request.allocation.points),
+            (2, 7),
+        )
+
+    def test_persist_allocations(self):
+        allocation = [
+            Allocation(
+                date=request.requested_date,
+                source_request_id=request.id,
+                user_id=request.user_id,
+                allocated_resource_id=resource.id,
+                points=2,
+            )
+            for request, resource in zip(self.requests[:2], self.resources[2:])
+        ]
+        with count_statements(self.engine) as statements:
+            result = AllocationManager._persist_allocations(
+                self.iteration.id, allocation, [self.requests[2].id],
+            )
+
+        #   Status lookup, insert, capacity lock and count and one update per status
+        self.assertEqual(len(statements), 6)
+        self.assertEqual(
+            [(item.source_request_id, item.allocated_resource_id) for item in result],
+            [(item.source_request_id, item.allocated_resource_id) for item in allocation],
+        )
+        self.sess.expire_all()
+        self.assertEqual(
+            [item.request_status.request_status for item in self.requests[:3]],
+            [
+                RequestStatusEnum.completed.value,
+                RequestStatusEnum.completed.value,
+                RequestStatusEnum.declined.value,
+            ],
+        )
+
+    def test_automatic_allocation_query_count(self):
+        self.sess.expire_all()
+        with count_statements(self.engine) as statements:
+            _ = AllocationManager.automatic_allocation(self.allocation_args)
+
+        #   A larger iteration with more dates, users and resources needs the same statements
+        iteration = IterationManager.create_item({
+            "start_date": dt.date(2020, 2, 1), "end_date": dt.date(2020, 2, 7),
+        })
+        _ = [
+            ResourceManager.create_item({"name": f"desk{id}", "top_resource_group_id": 4})
+            for id in range(5, 15)
+        ]
+        _ = [
+            RequestManager.create_item({
+                "iteration_id": iteration.id,
+                "requested_date": dt.date(2020, 2, 1 + index % 5),
+                "user_id": self.users[index % 3].id,
+                "requested_resource_group_id": 4 if index % 2 else 3,
+            })
+            for index in range(30)
+        ]
+        allocation_args = {"iteration_id": iteration.id}
+        self.sess.expire_all()
+        with count_statements(self.engine) as larger_statements:
+            result = AllocationManager.automatic_allocation(allocation_args)
+
+        #   Topology (2), requests, allocated resources, statuses, insert, capacity lock and count,
+        #   updates (2), iteration lookup and update and dirty cell cleanup
+        self.assertEqual(len(result), 15 + 5 * 2)
+        self.assertEqual(len(statements), 13)
+        self.assertEqual(len(larger_statements), len(statements))
+
+    def test_allocate_request(self):
+        _ = AllocationManager.automatic_allocation(self.allocation_args)
+        request = RequestManager.create_item({
+            "iteration_id": 1,
+            "requested_date": dt.date(2020, 1, 3),
+            "user_id": 2,
+            "requested_resource_id": 2,
+        })
+
+        #   Iteration is not marked as allocated, so the request is left alone on creation
+        self.sess.get(IterationModel, 1).is_allocated = False
+        request = RequestManager.create_item({
+            "iteration_id": 1,
+            "requested_date": dt.date(2020, 1, 1),
+            "user_id": 3,
+            "requested_resource_id": 2,
+        })
+        self.assertIsNone(request.allocation)
+
+        #   Request, candidates, status lookup and the decline update
+        with count_statements(self.engine) as statements:
+            result = AllocationManager.allocate_request(1, request.id)
+        self.assertEqual(len(statements), 4)
+
+        #   Requested resource and desk1 are taken on that date - no free resource left
+        self.assertEqual(result, [])
+        self.sess.refresh(request)
+        self.assertEqual(
+            request.request_status.request_status,
+            RequestStatusEnum.declined.value,
+        )
+
+        #   Same user and date in another top group gets the best free resource there
+        request = RequestManager.create_item({
+            "iteration_id": 1,
+            "requested_date": dt.date(2020, 1, 3),
+            "user_id": 3,
+            "requested_resource_group_id": 4,
+        })
+        result = AllocationManager.allocate_request(1, request.id)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].allocated_resource_id, 3)
+        self.assertEqual(result[0].points, 5)
+
+        #   The user already holds a resource in the top group
+        request = RequestManager.create_item({
+            "iteration_id": 1,
+            "requested_date": dt.date(2020, 1, 3),
+            "user_id": 3,
+            "requested_resource_id": 4,
+        })
+        self.assertEqual(AllocationManager.allocate_request(1, request.id), [])
+
+    def test_simulate_allocation(self):
+        config = Config.get_instance()
+        self.addCleanup(setattr, config, "ALLOCATION_CACHE_TABLE", config.ALLOCATION_CACHE_TABLE)
+        for cache_table in (False, True):
+            with self.subTest(cache_table=cache_table):
+                config.ALLOCATION_CACHE_TABLE = cache_table
+                AllocationManager._solution_cache = None
+                savepoint = self.sess.begin_nested()
+                _ = self.sess.connection()
+                with count_statements(self.engine) as statements:
+                    simulation = AllocationManager.simulate_allocation(self.allocation_args)
+
+                #   Nothing is written - not even to the cache table
+                self.assertTrue(all(item.lstrip().startswith("SELECT") for item in statements))
+                self.assertEqual(AllocationCacheManager.list_all_items(), [])
+                self.assertEqual(AllocationManager.list_all_items(), [])
+                self.assertFalse(self.sess.get(IterationModel, 1).is_allocated)
+                self.assertEqual(
+                    set(simulation["timings"]),
+                    {"load", "score", "select", "persist"},
+                )
+
+                #   The proposal matches a real run
+                result = AllocationManager.automatic_allocation(self.allocation_args)
+                self.assertEqual(
+                    [
+                        (item["source_request_id"], item["allocated_resource_id"], item["points"])
+                        for item in simulation["allocations"]
+                    ],
+                    [
+                        (item.source_request_id, item.allocated_resource_id, item.points)
+                        for item in result
+                    ],
+                )
+                self.assertEqual(simulation["total_points"], sum(item.points for item in result))
+                self.assertEqual(simulation["declined_request_ids"], [self.requests[2].id])
+                self.assertEqual(simulation["iterations"], 0)
+                savepoint.rollback()
+
+    def test_load_resources(self):
+        resources, groups = AllocationManager._load_resources()
+        self.assertEqual(
+            resources,
+            [
+                ResourceRecord(1, 1, (2,)),
+                ResourceRecord(2, 1, (3,), 1),
+                ResourceRecord(3, 4, ()),
+                ResourceRecord(4, 4, ()),
+            ],
+        )
+        topology = ResourceTopology.from_records(resources, groups)
+        self.assertEqual(topology.resource_ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(topology.resource_top_ids.tolist(), [1, 1, 4, 4])
+        self.assertEqual(topology.group_top_ids.tolist(), [1, 1, 1, 4])
+        self.assertEqual(
+            np.argwhere(topology.membership).tolist(),
+            [[0, 1], [1, 2]],
+        )
+
+    def test_automatic_allocation_optimal(self):
+        result = AllocationManager.automatic_allocation({
+            **self.allocation_args,
+            "strategy": "optimal",
+        })
+        self.assertEqual(len(result), 3)
+        self.assertEqual(sum(item.points for item in result), 17 + 15 + 5)
+        self.assertEqual(
+            len({(item.user_id, item.allocated_resource.top_resource_group_id) for item in result}),
+            len(result),
+        )
+
+        with self.assertRaises(ValueError):
+            AllocationManager.automatic_allocation({
+                **self.allocation_args,
+                "strategy": "bla",
+            })
+
+    def test_automatic_allocation_capacity(self):
+        ResourceManager.modify_item(2, {"capacity": 2})
+
+        #   Both requests for the back office share desk 2
+        simulation = AllocationManager.simulate_allocation(self.allocation_args)
+        result = AllocationManager.automatic_allocation({
+            **self.allocation_args,
+            "strategy": "flow",
+        })
+        self.assertEqual(simulation["total_points"], 17 + 15 + 15 + 5)
+        self.assertEqual(simulation["declined_request_ids"], [])
+        self.assertEqual(sum(item.points for item in result), 17 + 15 + 15 + 5)
+        self.assertEqual(
+            sorted(item.user_id for item in result if item.allocated_resource_id == 2),
+            [2, 3],
+        )
+
+        #   Single requests take desk 2 until it is full
+        requests = [
+            RequestManager.create_item({
+                "iteration_id": 1,
+                "requested_date": dt.date(2020, 1, 2),
+                "user_id": user_id,
+                "requested_resource_group_id": 3,
+            })
+            for user_id in (2, 3, 1)
+        ]
+        self.assertEqual(
+            [request.allocation.allocated_resource_id for request in requests],
+            [2, 2, 1],
+        )
+
+    def test_automatic_allocation_proximity(self):
+        config = Config.get_instance()
+        self.addCleanup(
+            setattr, config, "ALLOCATION_PROXIMITY_RADIUS", config.ALLOCATION_PROXIMITY_RADIUS,
+        )
+        ResourceManager.create_item({"name": "desk_other_3", "top_resource_group_id": 4})
+        for resource_id, box_x in ((3, 0.0), (4, 10.0), (5, 1.0)):
+            properties = ImagePropertiesManager.create_item({
+                "box_x": box_x,
+                "box_y": 0.0,
+                "box_width": 1.0,
+                "box_height": 1.0,
+                "box_rotation": 0.0,
+            })
+            ResourceManager.modify_item(resource_id, {"image_properties_id": properties.id})
+
+        requests = [
+            RequestManager.create_item({
+                "iteration_id": 1,
+                "requested_date": dt.date(2020, 1, 1),
+                "user_id": user_id,
+                "requested_resource_id": 3,
+            })
+            for user_id in (2, 3)
+        ]
+
+        def proposal() -> list[tuple[int, int]]:
+            simulation = AllocationManager.simulate_allocation(self.allocation_args)
+            return sorted(
+                (item["allocated_resource_id"], item["points"])
+                for item in simulation["allocations"]
+                if item["source_request_id"] in {request.id for request in requests}
+            )
+
+        #   Desk 5 is next to the requested desk 3 and scores a proximity point
+        config.ALLOCATION_PROXIMITY_RADIUS = None
+        self.assertEqual(proposal(), [(3, 7), (5, 5)])
+        config.ALLOCATION_PROXIMITY_RADIUS = 2.0
+        self.assertEqual(proposal(), [(3, 8), (5, 6)])
+
+        #   Single requests score proximity the same way
+        _ = AllocationManager.automatic_allocation(self.allocation_args)
+        requests = [
+            RequestManager.create_item({
+                "iteration_id": 1,
+                "requested_date": dt.date(2020, 1, 3),
+                "user_id": user_id,
+                "requested_resource_id": 3,
+            })
+            for user_id in (2, 3)
+        ]
+        self.assertEqual(
+            [
+                (request.allocation.allocated_resource_id, request.allocation.points)
+                for request in requests
+            ],
+            [(3, 8), (5, 6)],
+        )
+
+    def test_automatic_allocation_time_budget(self):
+        #   Greedy gives desk_a to the request for it - 17 points - which leaves the request for
+        #   group_b, which only has desk_a, with desk_b - 5 points. Swapping them makes 15 + 15
+        top = ResourceGroupManager.create_item({"name": "budget_top", "is_top_level": True})
+        groups = [
+            ResourceGroupManager.create_item({
+                "name": name, "is_top_level": False, "top_resource_group_id": top.id,
+            })
+            for name in ("group_a", "group_b")
+        ]
+        desks = [
+            ResourceManager.create_item({"name": name, "top_resource_group_id": top.id})
+            for name in ("desk_a", "desk_b")
+        ]
+        for resource, group in (
+            (desks[0], groups[0]), (desks[0], groups[1]), (desks[1], groups[0]),
+        ):
+            ResourceToGroupManager.create_item({
+                "resource_id": resource.id, "resource_group_id": group.id,
+            })
+
+        iteration = IterationManager.create_item({
+            "start_date": dt.date(2021, 1, 1), "end_date": dt.date(2021, 1, 7),
+        })
+        for data in (
+            {"user_id": self.users[0].id, "requested_resource_id": desks[0].id},
+            {"user_id": self.users[1].id, "requested_resource_group_id": groups[1].id},
+        ):
+            RequestManager.create_item(
+                {"iteration_id": iteration.id, "requested_date": dt.date(2021, 1, 1), **data},
+            )
+
+        def run(time_budget_ms: int | None) -> tuple[int, int]:
+            savepoint = self.sess.begin_nested()
+            stats = dict()
+            result = AllocationManager.automatic_allocation(
+                {"iteration_id": iteration.id, "time_budget_ms": time_budget_ms}, stats=stats,
+            )
+            self.assertNotIn("search_iterations", stats["timings"])
+            total_points = sum(item.points for item in result)
+            savepoint.rollback()
+            return total_points, stats["iterations"]
+
+        greedy_points, greedy_iterations = run(None)
+        self.assertEqual((greedy_points, greedy_iterations), (17 + 5, 0))
+
+        improved_points, iterations = run(1000)
+        self.assertGreater(improved_points, greedy_points)
+        self.assertEqual(improved_points, 15 + 15)
+        self.assertGreater(iterations, 0)
+
+        #   No time for a single move
+        self.assertEqual(run(0), (greedy_points, 0))
+
+    def test_automatic_allocation_cache(self):
+        config = Config.get_instance()
+        self.addCleanup(setattr, config, "ALLOCATION_CACHE_TABLE", config.ALLOCATION_CACHE_TABLE)
+        config.ALLOCATION_CACHE_TABLE = True
+        AllocationManager._solution_cache = None
+        savepoint = self.sess.begin_nested()
+        result = [
+            (item.source_request_id, item.allocated_resource_id, item.points)
+            for item in AllocationManager.automatic_allocation(self.allocation_args)
+        ]
+        self.assertEqual(len(AllocationCacheManager.list_all_items()), 2)
+
+        #   A dry run of a fresh process finds the solutions in the table and keeps them in memory
+        savepoint.rollback()
+        AllocationManager._solution_cache = None
+        simulation = AllocationManager.simulate_allocation(self.allocation_args)
+        self.assertEqual(len(AllocationManager._solution_cache), 2)
+        self.assertEqual(len(AllocationCacheManager.list_all_items()), 2)
+        self.assertEqual(
+            [
+                (item["source_request_id"], item["allocated_resource_id"], item["points"])
+                for item in simulation["allocations"]
+            ],
+            result,
+        )
+
+    def test_allocation_cache_table_size(self):
+        config = Config.get_instance()
+        self.addCleanup(
+            setattr, config, "ALLOCATION_CACHE_TABLE_SIZE", config.ALLOCATION_CACHE_TABLE_SIZE,
+        )
+        config.ALLOCATION_CACHE_TABLE_SIZE = 2
+        for key in "abc":
+            AllocationCacheManager.put(key, [(1, 1, 5)])
+
+        self.assertEqual(
+            [item.fingerprint for item in AllocationCacheManager.list_all_items()], ["b", "c"],
+        )
+        self.assertIsNone(AllocationCacheManager.get("a"))
+
+    def test_dirty_cells(self):
+        date = dt.date(2020, 1, 1)
+
+        #   Not tracked before the iteration is allocated
+        RequestManager.modify_item(self.requests[2].id, {"requested_resource_group_id": 2})
+        self.assertEqual(DirtyCellManager.list_cells(1), [])
+
+        _ = AllocationManager.automatic_allocation(self.allocation_args)
+        self.assertEqual(DirtyCellManager.list_cells(1), [])
+
+        ResourceManager.modify_item(3, {"name": "desk_other_renamed"})
+        self.assertEqual(DirtyCellManager.list_cells(1), [(date, 4)])
+
+        ResourceToGroupManager.create_item({"resource_id": 2, "resource_group_id": 2})
+        self.assertEqual(DirtyCellManager.list_cells(1), [(date, 1), (date, 4)])
+
+        DirtyCellManager.clear(1, [(date, 4)])
+        self.assertEqual(DirtyCellManager.list_cells(1), [(date, 1)])
+
+        #   Both the old and the new cell of a moved request
+        RequestManager.modify_item(self.requests[3].id, {"requested_date": dt.date(2020, 1, 2)})
+        self.assertEqual(
+            DirtyCellManager.list_cells(1),
+            [(date, 1), (date, 4), (dt.date(2020, 1, 2), 4)],
+        )
+
+    def test_capacity_under_concurrency(self):
+        date = dt.date(2020, 1, 2)
+        self.sess.commit()
+
+        def create(user_id: int) -> AllocationModel:
+            #   Like a request served by another thread with a session of its own
+            try:
+                return AllocationManager.create_item({
+                    "iteration_id": 1,
+                    "date": date,
+                    "user_id": user_id,
+                    "allocated_resource_id": 3,
+                })
+            finally:
+                remove_session()
+
+        #   Another transaction allocates desk_other_1 and has not committed yet
+        with self.engine.connect() as conn, ThreadPoolExecutor(max_workers=1) as executor:
+            conn.execute(
+                select(ResourceModel.id)
+                .where(ResourceModel.id == 3)
+                .with_for_update(key_share=True)
+            )
+            conn.execute(insert(AllocationModel).values(
+                iteration_id=1, date=date, user_id=1, allocated_resource_id=3,
+            ))
+            future = executor.submit(create, 2)
+            time.sleep(0.2)
+            self.assertFalse(future.done())
+
+            conn.commit()
+            with self.assertRaises(ValueError):
+                _ = future.result()
+
+        self.assertEqual(
+            self.sess.scalar(select(func.count()).select_from(AllocationModel)), 1,
+        )
+
+    def test_reallocate(self):
+        date = dt.date(2020, 1, 1)
+        result = AllocationManager.automatic_allocation(self.allocation_args)
+        other_allocation_id = next(
+            item.id for item in result if item.source_request_id == self.requests[3].id
+        )
+        self.assertEqual(AllocationManager.reallocate(self.allocation_args)["cells"], [])
+
+        #   Deleting request 2 frees desk2 for the declined request 3
+        RequestManager.delete_item(self.requests[1].id)
+        self.assertEqual(DirtyCellManager.list_cells(1), [(date, 1)])
+
+        result = AllocationManager.reallocate(self.allocation_args)
+        self.assertEqual(result["cells"], [(date, 1)])
+        self.assertEqual(result["declined_request_ids"], [])
+        self.assertEqual(
+            sorted(
+                (item.source_request_id, item.allocated_resource_id)
+                for item in result["allocations"]
+            ),
+            [(self.requests[0].id, 1), (self.requests[2].id, 2)],
+        )
+        self.assertEqual(DirtyCellManager.list_cells(1), [])
+
+        #   The clean cell is left as it is
+        allocations = AllocationManager.list_all_items()
+        self.assertEqual(len(allocations), 3)
+        self.assertIn(other_allocation_id, [item.id for item in allocations])
+        self.assertEqual(
+            self.sess.get(RequestModel, self.requests[2].id).request_status.request_status,
+            RequestStatusEnum.completed.value,
+        )
+
+    def test_reallocate_keeps_manual_allocations(self):
+        date = dt.date(2020, 1, 1)
+        _ = AllocationManager.automatic_allocation(self.allocation_args)
+
+        #   desk2 freed by request 2 is given to user 3 by hand rather than to request 3
+        RequestManager.delete_item(self.requests[1].id)
+        manual = AllocationManager.create_item({
+            "iteration_id": 1,
+            "date": date,
+            "user_id": 3,
+            "allocated_resource_id": 2,
+        })
+        self.assertEqual(DirtyCellManager.list_cells(1), [(date, 1)])
+
+        result = AllocationManager.reallocate(self.allocation_args)
+        self.assertEqual(
+            [
+                (item.source_request_id, item.allocated_resource_id)
+                for item in result["allocations"]
+            ],
+            [(self.requests[0].id, 1)],
+        )
+        self.assertEqual(result["declined_request_ids"], [self.requests[2].id])
+        self.assertIsNotNone(self.sess.get(AllocationModel, manual.id))
+        self.assertEqual(
+            self.sess.get(RequestModel, self.requests[2].id).request_status.request_status,
+            RequestStatusEnum.declined.value,
+        )
+
     def test_request_resource_after_allocation(self):
         _ = AllocationManager.automatic_allocation(self.allocation_args)
 
@@ -0,0 +1,181 @@
+"""
+Unit tests for managers.allocation_job
+"""
+
+import datetime as dt
+import time
+from types import SimpleNamespace
+import unittest
+
+from sqlalchemy import func, select, update
+
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.managers.allocation_job import AllocationJobManager
+from resource_allocator.managers.iteration import IterationManager
+from resource_allocator.managers.request import RequestManager
+from resource_allocator.managers.resource import ResourceManager, ResourceGroupManager
+from resource_allocator.managers.user import AuthManager, UserManager
+from resource_allocator.models import (
+    metadata, populate_enums, AllocationJobModel, AllocationModel, JobStatusEnum,
+)
+from resource_allocator.utils.db import change_schema
+
+metadata = change_schema(metadata, schema="resource_allocator_test")
+
+
+class AllocationJobManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.config = Config.from_environment()
+        self.sess = get_session()
+        self.engine = self.sess.bind
+
+        metadata.drop_all(self.engine)  # in case of errors during setUp
+        metadata.create_all(self.engine)
+        populate_enums(self.sess)
+
+        _ = [
+            AuthManager.register({
+                "email": f"user{index}@example.com",
+                "password": 123456,
+                "first_name": "bla",
+                "last_name": "bla",
+            })
+            for index in range(2)
+        ]
+        self.users = UserManager.list_all_items()
+        self.group = ResourceGroupManager.create_item({"name": "top_level", "is_top_level": True})
+        self.resources = [
+            ResourceManager.create_item({"name": name, "top_resource_group_id": self.group.id})
+            for name in ("desk1", "desk2")
+        ]
+        self.iteration = IterationManager.create_item({
+            "start_date": dt.date(2020, 1, 1), "end_date": dt.date(2020, 1, 7),
+        })
+        self.requests = [
+            RequestManager.create_item({
+                "iteration_id": self.iteration.id,
+                "requested_date": date,
+                "user_id": user.id,
+                "requested_resource_group_id": self.group.id,
+            })
+            for date in (dt.date(2020, 1, 1), dt.date(2020, 1, 2))
+            for user in self.users
+        ]
+
+    def tearDown(self):
+        self.sess.rollback()
+        metadata.drop_all(bind=self.engine)
+
+    def test_submit_and_run(self):
+        job = AllocationJobManager.submit({"iteration_id": self.iteration.id})
+        self.assertEqual(job.job_status.job_status, JobStatusEnum.queued.value)
+        self.sess.commit()
+
+        job = AllocationJobManager.claim()
+        self.assertEqual(job.job_status.job_status, JobStatusEnum.running.value)
+        self.assertIsNotNone(job.started_time)
+        self.assertIsNone(AllocationJobManager.claim())
+
+        job = AllocationJobManager.run(job)
+        self.assertEqual(job.job_status.job_status, JobStatusEnum.completed.value)
+        self.assertEqual((job.dates_done, job.dates_total, job.allocations_made), (2, 2, 4))
+        allocations = self.sess.scalars(select(AllocationModel).order_by(AllocationModel.id)).all()
+        self.assertEqual(job.result["allocation_ids"], [item.id for item in allocations])
+        self.assertEqual(job.result["total_points"], sum(item.points for item in allocations))
+        self.assertEqual(job.result["iterations"], 0)
+        self.assertTrue(self.sess.get(type(self.iteration), self.iteration.id).is_allocated)
+
+    def test_skip_locked(self):
+        jobs = [
+            AllocationJobManager.submit({"iteration_id": self.iteration.id})
+            for _ in range(2)
+        ]
+        job_ids = [job.id for job in jobs]
+        self.sess.commit()
+
+        #   Another worker holds the first job
+        with self.engine.connect() as conn:
+            conn.execute(
+                select(AllocationJobModel.id)
+                .where(AllocationJobModel.id == job_ids[0])
+                .with_for_update()
+            )
+            job = AllocationJobManager.claim()
+            self.assertEqual(job.id, job_ids[1])
+            self.assertIsNone(AllocationJobManager.claim())
+            conn.rollback()
+
+        self.assertEqual(AllocationJobManager.claim().id, job_ids[0])
+
+    def test_failed(self):
+        AllocationJobManager.submit({"iteration_id": self.iteration.id, "strategy": "bla"})
+        self.sess.commit()
+        self.assertEqual(AllocationJobManager.work(poll_interval=None), 1)
+
+        job = self.sess.scalars(select(AllocationJobModel)).one()
+        self.assertEqual(job.job_status.job_status, JobStatusEnum.failed.value)
+        self.assertIn("bla", job.error)
+        self.assertEqual(self.sess.scalars(select(AllocationModel)).all(), [])
+
+    def test_progress_callback(self):
+        job = AllocationJobManager.submit({"iteration_id": self.iteration.id})
+        self.sess.commit()
+
+        problems = [
+            SimpleNamespace(date=date, key=(date, top_id))
+            for date in (dt.date(2020, 1, 1), dt.date(2020, 1, 2))
+            for top_id in (1, 2)
+        ]
+        #   Progress is written on a separate connection and visible right away
+        progress = AllocationJobManager._progress_callback(job.id)
+
+        #   One of two top groups done on the first date
+        progress({problems[0].key: [(1, 1, 5)]}, problems)
+        self.sess.refresh(job)
+        self.assertEqual((job.dates_done, job.dates_total, job.allocations_made), (0, 2, 1))
+
+        progress({problems[0].key: [(1, 1, 5)], problems[1].key: [(2, 2, 5)]}, problems)
+        self.sess.refresh(job)
+        self.assertEqual((job.dates_done, job.dates_total, job.allocations_made), (1, 2, 2))
+
+    def test_fail_stale(self):
+        jobs = [
+            AllocationJobManager.submit({"iteration_id": self.iteration.id})
+            for _ in range(3)
+        ]
+        self.sess.commit()
+        stale, running = AllocationJobManager.claim(), AllocationJobManager.claim()
+
+        #   The worker of the first job stopped sending heartbeats
+        self.sess.execute(
+            update(AllocationJobModel)
+            .where(AllocationJobModel.id == stale.id)
+            .values(updated_time=func.now() - dt.timedelta(hours=1))
+        )
+        self.sess.commit()
+
+        self.assertEqual(AllocationJobManager.claim().id, jobs[2].id)
+        self.sess.refresh(stale)
+        self.sess.refresh(running)
+        self.assertEqual(stale.job_status.job_status, JobStatusEnum.failed.value)
+        self.assertIsNotNone(stale.error)
+        self.assertIsNotNone(stale.finished_time)
+        self.assertEqual(running.job_status.job_status, JobStatusEnum.running.value)
+
+    def test_heartbeat(self):
+        self.addCleanup(
+            setattr, self.config, "ALLOCATION_JOB_TIMEOUT", self.config.ALLOCATION_JOB_TIMEOUT,
+        )
+        self.config.ALLOCATION_JOB_TIMEOUT = 0.2
+        job = AllocationJobManager.submit({"iteration_id": self.iteration.id})
+        self.sess.commit()
+        job = AllocationJobManager.claim()
+        updated_time = job.updated_time
+
+        stop = AllocationJobManager._heartbeat(job.id)
+        time.sleep(0.3)
+        stop.set()
+        self.sess.refresh(job)
+        self.assertGreater(job.updated_time, updated_time)
+        self.assertEqual(AllocationJobManager.fail_stale(), [])
@@ -0,0 +1,85 @@
+"""
+Unit tests for resources.allocation
+"""
+
+import datetime as dt
+import unittest
+
+from resource_allocator.main import create_app
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.models import metadata, populate_enums, AllocationModel, JobStatusEnum
+from resource_allocator.resources.allocation import (
+    AllocationJobResource,
+    AutoAllocationResource,
+    ReallocationResource,
+)
+from resource_allocator.utils.db import change_schema
+from resource_allocator.managers import AuthManager, IterationManager
+
+
+metadata = change_schema(metadata, schema="resource_allocator_test")
+
+
+class AutoAllocationResourceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.config = Config.from_environment()
+        self.sess = get_session()
+        self.engine = self.sess.bind
+        self.app = create_app()
+        metadata.drop_all(self.engine)  # in case of errors during setUp
+        metadata.create_all(self.engine)
+        populate_enums(self.sess)
+
+        self.user = AuthManager.register({
+            "email": "test@example.com",
+            "password": "password",
+            "first_name": "first_name",
+            "last_name": "last_name",
+        })
+        self.headers = {"Authorization": f"Bearer {self.user['token']}"}
+        self.iteration = IterationManager.create_item({
+            "start_date": dt.date(2020, 1, 1), "end_date": dt.date(2020, 1, 7),
+        })
+
+    def tearDown(self):
+        self.sess.rollback()
+        metadata.drop_all(bind=self.engine)
+
+    def test_post_queues_job(self):
+        with self.app.test_request_context(
+            headers=self.headers,
+            json={"iteration_id": self.iteration.id},
+        ):
+            result, status = AutoAllocationResource().post()
+
+        self.assertEqual(status, 202)
+        self.assertEqual(result["job_status"], JobStatusEnum.queued.value)
+        self.assertEqual(result["iteration_id"], self.iteration.id)
+        self.assertEqual(self.sess.query(AllocationModel).count(), 0)
+
+        with self.app.test_request_context(headers=self.headers):
+            job = AllocationJobResource().get(result["id"])
+            jobs = AllocationJobResource().get()
+
+        self.assertEqual(job["id"], result["id"])
+        self.assertEqual(job["dates_done"], 0)
+        self.assertEqual([item["id"] for item in jobs], [result["id"]])
+
+    def test_dry_run(self):
+        with self.app.test_request_context(
+            headers=self.headers,
+            json={"iteration_id": self.iteration.id, "dry_run": True},
+        ):
+            result = AutoAllocationResource().post()
+
+        self.assertEqual(result["allocations"], [])
+
+    def test_reallocate(self):
+        with self.app.test_request_context(
+            headers=self.headers,
+            json={"iteration_id": self.iteration.id, "strategy": "optimal"},
+        ):
+            result = ReallocationResource().post()
+
+        self.assertEqual(result, {"cells": [], "allocations": [], "declined_request_ids": []})
@@ -18,6 +18,16 @@ class ConfigTestCase(unittest.TestCase):
         self.kwargs = {item.name: item.name for item in fields(Config) if item.init}
         self.kwargs["LOCAL_LOGIN_ENABLED"] = "yes"
         self.kwargs["DB_PORT"] = "12"
+        self.kwargs["DB_POOL_SIZE"] = "8"
+        self.kwargs["DB_MAX_OVERFLOW"] = "4"
+        self.kwargs["DB_POOL_TIMEOUT"] = "10"
+        self.kwargs["DB_REPLICA_STICKINESS"] = "1.5"
+        self.kwargs["ALLOCATION_WORKERS"] = "2"
+        self.kwargs["ALLOCATION_CACHE_SIZE"] = "16"
+        self.kwargs["ALLOCATION_CACHE_TABLE"] = "yes"
+        self.kwargs["ALLOCATION_CACHE_TABLE_SIZE"] = "100"
+        self.kwargs["ALLOCATION_PROXIMITY_RADIUS"] = "2.5"
+        self.kwargs["ALLOCATION_JOB_TIMEOUT"] = "60"
 
     def tearDown(self):
         Config.reset_instance()
@@ -43,6 +53,7 @@ class ConfigTestCase(unittest.TestCase):
         #   Check compounds
         self.assertTrue(config.AZURE_CONFIGURED)
         self.assertTrue(isinstance(config.URL, url.URL))
+        self.assertEqual(config.ASYNC_URL.drivername, "postgresql+asyncpg")
 
     @staticmethod
     def patch_environ(fun):
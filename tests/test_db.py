@@ -2,12 +2,35 @@
 Test for the db module
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import os
 import unittest
 
+from flask import Flask
 import sqlalchemy
+from sqlalchemy.schema import CreateSchema
 
 from resource_allocator.config import Config
-from resource_allocator.db import get_session
+from resource_allocator.db import (
+    create_engine,
+    get_session,
+    has_session,
+    remove_session,
+    RoutingSession,
+)
+from resource_allocator.main import create_app
+from resource_allocator.managers import AuthManager, ResourceGroupManager, ResourceManager
+from resource_allocator.models import (
+    metadata,
+    populate_enums,
+    ResourceGroupModel,
+    ResourceModel,
+    RoleModel,
+    UserModel,
+)
+from resource_allocator.utils.db import change_schema
+
+metadata = change_schema(metadata, "resource_allocator_test")
 
 
 class GetSessionTestCase(unittest.TestCase):
@@ -22,8 +45,223 @@ class GetSessionTestCase(unittest.TestCase):
 
         #   Test injection
         self.assertIsNotNone(self.config._sess)
-        self.assertTrue(sess is self.config._sess)
+        self.assertTrue(sess is self.config._sess())
 
         #   New session is the same session
         new_sess = get_session()
         self.assertTrue(sess is new_sess)
+
+    def test_pool(self):
+        pool = get_session().get_bind().pool
+        self.assertIsInstance(pool, sqlalchemy.pool.QueuePool)
+        self.assertEqual(pool.size(), self.config.DB_POOL_SIZE)
+        self.assertTrue(pool._pre_ping)
+
+    def test_thread_sessions(self):
+        sess = get_session()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            other = executor.submit(get_session).result()
+
+        #   Other threads get their own session on the same engine
+        self.assertIsNot(sess, other)
+        self.assertIs(sess.get_bind(), other.get_bind())
+
+    def test_remove_session(self):
+        sess = get_session()
+        self.assertTrue(has_session())
+        remove_session()
+        self.assertFalse(has_session())
+        self.assertIsNot(get_session(), sess)
+
+    def test_request_closes_own_session(self):
+        app = create_app()
+        sess = get_session()
+
+        def request_in_thread() -> bool:
+            _ = app.test_client().get("/resources/")
+            return has_session()
+
+        #   A request closes the session it opened but not one the thread already had
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertFalse(executor.submit(request_in_thread).result())
+
+        _ = app.test_client().get("/resources/")
+        self.assertIs(get_session(), sess)
+
+    def test_request_recovers_failed_session(self):
+        app = create_app()
+        sess = get_session()
+        metadata.create_all(sess.get_bind())
+        sess.add(ResourceGroupModel(name=None, is_top_level=True))
+        with self.assertRaises(sqlalchemy.exc.IntegrityError):
+            sess.flush()
+
+        #   The failed transaction is rolled back once when the next request starts
+        self.assertFalse(sess.is_active)
+        _ = app.test_client().get("/resources/")
+        self.assertTrue(sess.is_active)
+        self.assertIs(get_session(), sess)
+
+
+class ReplicaTestMixin:
+    """
+    Primary and replica for test cases of replica routing. The replica is DB_REPLICA_TEST_URL if
+    set, e.g. a second local server, or else a second database on the test server. Rows are copied
+    to it by the test
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.config = Config.from_environment()
+        replica_url = os.getenv("DB_REPLICA_TEST_URL") or cls.config.URL.set(
+            database=f"{cls.config.DB_DATABASE}_replica",
+        )
+        replica_url = sqlalchemy.make_url(replica_url)
+        server = create_engine(cls.config, url=replica_url.set(database="postgres"))
+        with server.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if not conn.scalar(
+                sqlalchemy.text("select 1 from pg_database where datname = :name"),
+                {"name": replica_url.database},
+            ):
+                conn.execute(sqlalchemy.text(f'create database "{replica_url.database}"'))
+
+        server.dispose()
+
+        #   A session registry of its own that knows about the replica
+        cls.registry = cls.config._sess
+        cls.config._sess = None
+        cls.config.DB_REPLICA_URLS = [replica_url]
+        cls.sess = get_session()
+        cls.primary = cls.sess.get_bind()
+        cls.replica = cls.sess.replicas[0]
+        with cls.replica.begin() as conn:
+            conn.execute(CreateSchema(metadata.schema, if_not_exists=True))
+
+        cls.app = create_app()
+
+    @classmethod
+    def tearDownClass(cls):
+        remove_session()
+        cls.primary.dispose()
+        cls.replica.dispose()
+        cls.config._sess = cls.registry
+        cls.config.DB_REPLICA_URLS = []
+
+    def setUp(self):
+        for engine in (self.primary, self.replica):
+            metadata.drop_all(engine)
+            metadata.create_all(engine)
+
+        populate_enums(self.sess)
+        self.admin = AuthManager.register({
+            "email": "admin@example.com",
+            "password": "password",
+            "first_name": "first_name",
+            "last_name": "last_name",
+        })
+        self.user = AuthManager.register({
+            "email": "user@example.com",
+            "password": "password",
+            "first_name": "first_name",
+            "last_name": "last_name",
+        })
+        group = ResourceGroupManager.create_item({"name": "top_level", "is_top_level": True})
+        self.resource = ResourceManager.create_item({
+            "name": "on primary",
+            "top_resource_group_id": group.id,
+        })
+        self.sess.commit()
+
+        #   Replicate the rows and tell the copy apart by the name of the resource
+        with self.primary.connect() as source, self.replica.begin() as target:
+            for model in (RoleModel, UserModel, ResourceGroupModel, ResourceModel):
+                rows = source.execute(sqlalchemy.select(model.__table__)).mappings().all()
+                target.execute(sqlalchemy.insert(model.__table__), [dict(row) for row in rows])
+
+            target.execute(sqlalchemy.update(ResourceModel.__table__).values(name="on replica"))
+
+    def tearDown(self):
+        self.sess.rollback()
+        self.config.DB_REPLICA_STICKINESS = 5.0
+        for engine in (self.primary, self.replica):
+            metadata.drop_all(engine)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        user: dict,
+        json: dict | None = None,
+        app: Flask | None = None,
+    ):
+        """
+        Send a request from a thread without a session, like a served request. Each request comes
+        from a new client that sends no cookies. Another app stands for another worker
+        """
+        client = (app or self.app).test_client()
+        headers = {"Authorization": f"Bearer {user['token']}"}
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(
+                client.open, path, method=method, headers=headers, json=json,
+            ).result()
+
+
+class ReplicaRoutingTestCase(ReplicaTestMixin, unittest.TestCase):
+    def test_get_bind(self):
+        sess = RoutingSession(bind=self.primary, replicas=[self.replica])
+        self.assertIs(sess.get_bind(), self.primary)
+        sess.use_replica = True
+        self.assertIs(sess.get_bind(), self.replica)
+
+        #   A transaction that has written reads from the primary until it ends
+        sess.execute(sqlalchemy.update(ResourceModel).values(name="renamed"))
+        self.assertTrue(sess.wrote)
+        self.assertIs(sess.get_bind(), self.primary)
+        sess.rollback()
+        self.assertFalse(sess.wrote)
+        self.assertIs(sess.get_bind(), self.replica)
+        sess.close()
+
+    def test_no_replicas(self):
+        sess = RoutingSession(bind=self.primary)
+        sess.use_replica = True
+        self.assertFalse(sess.use_replica)
+        self.assertIs(sess.get_bind(), self.primary)
+        sess.close()
+
+    def test_reads_from_replica(self):
+        response = self.request("GET", f"/resources/{self.resource.id}", self.user)
+        self.assertEqual(response.json["name"], "on replica")
+
+        #   Methods that may write use the primary
+        response = self.request(
+            "PUT", f"/resources/{self.resource.id}", self.admin, {"name": "renamed"},
+        )
+        self.assertEqual(response.status_code, 200)
+        query = sqlalchemy.select(ResourceModel.name).where(ResourceModel.id == self.resource.id)
+        with self.primary.connect() as primary, self.replica.connect() as replica:
+            self.assertEqual(primary.scalar(query), "renamed")
+            self.assertEqual(replica.scalar(query), "on replica")
+
+    def test_read_your_writes(self):
+        response = self.request(
+            "PUT", f"/resources/{self.resource.id}", self.admin, {"name": "renamed"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Set-Cookie", response.headers)
+
+        #   The writer reads from the primary for a while, other users from the replica
+        path = f"/resources/{self.resource.id}"
+        self.assertEqual(self.request("GET", path, self.admin).json["name"], "renamed")
+        self.assertEqual(self.request("GET", path, self.user).json["name"], "on replica")
+
+        #   Also on another worker - the write is recorded on the primary, not in the client
+        other_worker = create_app()
+        self.assertEqual(
+            self.request("GET", path, self.admin, app=other_worker).json["name"], "renamed",
+        )
+        self.assertEqual(
+            self.request("GET", path, self.user, app=other_worker).json["name"], "on replica",
+        )
+
+        self.config.DB_REPLICA_STICKINESS = 0.0
+        self.assertEqual(self.request("GET", path, self.admin).json["name"], "on replica")
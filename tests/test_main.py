@@ -0,0 +1,115 @@
+"""
+Tests for the request hooks of the main module
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+import sqlalchemy
+
+from resource_allocator.config import Config
+from resource_allocator.db import get_session
+from resource_allocator.main import create_app
+from resource_allocator.managers import AuthManager, ResourceGroupManager
+from resource_allocator.models import metadata, populate_enums, ResourceGroupModel
+from resource_allocator.utils.db import change_schema
+
+metadata = change_schema(metadata, "resource_allocator_test")
+
+
+class TransactionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.config = Config.from_environment()
+        self.sess = get_session()
+        self.engine = self.sess.get_bind()
+        metadata.drop_all(self.engine)
+        metadata.create_all(self.engine)
+        populate_enums(self.sess)
+
+        #   Requests are sent from threads with sessions of their own - the data has to be
+        #   committed
+        self.user = AuthManager.register({
+            "email": "test@example.com",
+            "password": "password",
+            "first_name": "first_name",
+            "last_name": "last_name",
+        })
+        self.group = ResourceGroupManager.create_item({"name": "top_level", "is_top_level": True})
+        self.sess.commit()
+        self.app = create_app()
+        self.headers = {"Authorization": f"Bearer {self.user['token']}"}
+
+        self.events = []
+        sqlalchemy.event.listen(self.engine, "commit", self.on_commit)
+        sqlalchemy.event.listen(self.engine, "rollback", self.on_rollback)
+        sqlalchemy.event.listen(self.engine, "before_cursor_execute", self.on_execute)
+
+    def tearDown(self):
+        sqlalchemy.event.remove(self.engine, "commit", self.on_commit)
+        sqlalchemy.event.remove(self.engine, "rollback", self.on_rollback)
+        sqlalchemy.event.remove(self.engine, "before_cursor_execute", self.on_execute)
+        self.sess.rollback()
+        metadata.drop_all(self.engine)
+
+    def on_commit(self, conn):
+        self.events.append("commit")
+
+    def on_rollback(self, conn):
+        self.events.append("rollback")
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.events.append(conn.get_execution_options().get("isolation_level", "transaction"))
+
+    def request(self, method: str, path: str, json: dict | None = None):
+        """
+        Send a request from a thread without a session, like a served request. Only the events of
+        the request are kept
+        """
+        self.events.clear()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(
+                self.app.test_client().open, path, method=method, headers=self.headers, json=json,
+            ).result()
+
+    def group_names(self) -> list[str]:
+        self.sess.rollback()
+        return self.sess.scalars(
+            sqlalchemy.select(ResourceGroupModel.name).order_by(ResourceGroupModel.id)
+        ).all()
+
+    def test_read_only_request(self):
+        response = self.request("GET", f"/resource_groups/{self.group.id}")
+        self.assertEqual(response.status_code, 200)
+
+        #   Statements run in autocommit mode and nothing is committed
+        self.assertNotIn("commit", self.events)
+        self.assertNotIn("transaction", self.events)
+        self.assertIn("AUTOCOMMIT", self.events)
+
+    def test_write_request(self):
+        response = self.request("POST", "/resource_groups/", {"name": "new", "is_top_level": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("commit", self.events)
+        self.assertNotIn("AUTOCOMMIT", self.events)
+        self.assertEqual(self.group_names(), ["top_level", "new"])
+
+    def test_failed_request(self):
+        #   Rejected by validation after the request has read from the database
+        response = self.request(
+            "POST", "/resource_groups/", {"name": "top_level", "is_top_level": True},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("commit", self.events)
+
+    def test_failed_request_rolls_back(self):
+        @self.app.route("/partial")
+        def partial():
+            get_session().add(ResourceGroupModel(name="partial", is_top_level=True))
+            get_session().flush()
+            return "Failed after a write", 500
+
+        response = self.request("GET", "/partial")
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn("commit", self.events)
+        self.assertIn("rollback", self.events)
+        self.assertEqual(self.group_names(), ["top_level"])
@@ -43,6 +43,19 @@ class ValidateTokenTestCase(unittest.TestCase):
         with self.assertRaises(auth.jwt.ExpiredSignatureError):
             _ = auth.parse_token(token=token, secret=self.secret)
 
+    def test_token_user_id(self):
+        token = auth.generate_token(id=self.id, secret=self.secret)
+        self.assertEqual(auth.token_user_id(token, secret=self.secret), self.id)
+        self.assertIsNone(auth.token_user_id(token, secret="other_secret"))
+        self.assertIsNone(auth.token_user_id("invalid", secret=self.secret))
+
+    def test_bearer_token(self):
+        self.assertEqual(auth.bearer_token("Bearer token"), "token")
+        self.assertEqual(auth.bearer_token("bearer token"), "token")
+        self.assertIsNone(auth.bearer_token("Basic token"))
+        self.assertIsNone(auth.bearer_token("Bearer"))
+        self.assertIsNone(auth.bearer_token(None))
+
 
 class AzureConfiguredTestCase(unittest.TestCase):
     def test_azure_configured_true(self):
@@ -1,5 +1,8 @@
 #!/bin/bash
 # $1 - iteration_id
+# $2 - strategy: greedy or optimal [default: greedy]
+# $3 - dry_run: true or false [default: false]
+# $4 - time_budget_ms: milliseconds of local search [default: null - no local search]
 
 if [[ $TOKEN == "" ]]
 then
@@ -11,5 +14,5 @@ curl -v \
 	-X POST \
 	-H "Content-Type: application/json" \
 	-H "Authorization: Bearer $TOKEN" \
-	-d "{\"iteration_id\": $1}"
+	-d "{\"iteration_id\": $1, \"strategy\": \"${2:-greedy}\", \"dry_run\": ${3:-false}, \"time_budget_ms\": ${4:-null}}"
 
@@ -7,3 +7,6 @@ fi
 
 echo "Starting server in the background"
 nohup python -m gunicorn "resource_allocator.main:create_app()" -b 0.0.0.0:5000 & disown
+
+echo "Starting allocation worker in the background"
+nohup python -m resource_allocator.worker & disown
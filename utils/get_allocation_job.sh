@@ -0,0 +1,13 @@
+#!/bin/bash
+# $1 - job_id; list all jobs if not given
+
+if [[ $TOKEN == "" ]]
+then
+	stop '$TOKEN not found. Run login.sh'
+fi
+
+curl -v \
+	http://localhost:5000/allocation/jobs/$1 \
+	-X GET \
+	-H "Content-Type: application/json" \
+	-H "Authorization: Bearer $TOKEN"
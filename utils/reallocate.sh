@@ -0,0 +1,15 @@
+#!/bin/bash
+# $1 - iteration_id
+# $2 - strategy: greedy or optimal [default: greedy]
+
+if [[ $TOKEN == "" ]]
+then
+	stop '$TOKEN not found. Run login.sh'
+fi
+
+curl -v \
+	http://localhost:5000/allocation/reallocate \
+	-X POST \
+	-H "Content-Type: application/json" \
+	-H "Authorization: Bearer $TOKEN" \
+	-d "{\"iteration_id\": $1, \"strategy\": \"${2:-greedy}\"}"